@@ -1,15 +1,9 @@
 import time
-from langchain_openai import ChatOpenAI
-from src.config import settings
+from src.utils.clients import get_chat_model
 
 def benchmark_latency(prompt="Hello, are you online?"):
-    print("Initializing ChatOpenAI with new API configuration...")
-    llm = ChatOpenAI(
-        model="gpt-oss-20b",
-        temperature=0.3,
-        api_key=settings.OPENAI_API_KEY_AI_GRID,
-        base_url=settings.OPENAI_API_BASE_URL
-    )
+    print("Initializing ChatOpenAI on the shared HTTP pool...")
+    llm = get_chat_model(temperature=0.3, model="gpt-oss-20b")
     
     print(f"Sending request: '{prompt}'")
     start_time = time.time()
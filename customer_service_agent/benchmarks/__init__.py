@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the customer service agent.
+Upstream services are replaced by local stubs (see benchmarks.stubs) so
+runs are repeatable and cost nothing.
+"""
@@ -0,0 +1,319 @@
+"""
+Load test for /ask against local upstream stubs.
+
+Starts the stub OpenAI-compatible/Tavily server, builds a FAISS index of
+data/docs with stub embeddings in a temporary directory, injects a stub
+MongoDB client, serves the real FastAPI app with uvicorn and drives /ask
+either closed-loop (fixed concurrency) or open-loop (fixed arrival rate,
+capped by concurrency). Reports time to first token, full-response
+latency percentiles, throughput and error rate per route, and saves the
+run as JSON for comparison.
+
+In open-loop mode latencies are measured from each request's scheduled
+arrival, so time spent waiting for a client slot counts.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 16 --requests 200
+    python -m benchmarks.load_test --rate 5 --duration 60 --chat-ttft 0.8 --output benchmarks/results/rate5.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import logging
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stubs import HashEmbeddings, StubConfig, StubMongoClient, StubServer, create_stub_app, sample_orders
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS = [
+    "What is the status of order ORD1003?",
+    "When will order ORD1042 be delivered?",
+    "Where is my package for order ORD1017?",
+    "What is the PAYE remittance deadline under the tax act?",
+    "How is the development levy computed for companies?",
+    "What rights do data subjects have under the data protection act?",
+    "How long is personal data retained under the privacy policy?",
+    "What is the refund policy for damaged items?",
+    "What are the latest tax news for 2025?",
+    "Search for current VAT rates in West Africa",
+    "Can you help me with my account?",
+]
+
+
+def load_questions(path: Optional[str]) -> List[str]:
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "mean": round(float(np.mean(values)), 4),
+    }
+
+
+def summarize(results: List[Dict], wall_seconds: float) -> Dict:
+    """
+    Aggregates per-request results overall and per route.
+
+    Each result has: route, status, error (None on success), ttft and latency in seconds.
+    """
+    def block(rows: List[Dict]) -> Dict:
+        ok = [r for r in rows if r["error"] is None]
+        return {
+            "requests": len(rows),
+            "errors": len(rows) - len(ok),
+            "error_rate": round((len(rows) - len(ok)) / len(rows), 4) if rows else 0.0,
+            "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+            "ttft": percentiles([r["ttft"] for r in ok if r["ttft"] is not None]),
+            "latency": percentiles([r["latency"] for r in ok]),
+            "status_codes": {str(code): sum(r["status"] == code for r in rows) for code in sorted({r["status"] for r in rows})},
+        }
+
+    routes: Dict[str, List[Dict]] = {}
+    for result in results:
+        routes.setdefault(result["route"] or "unknown", []).append(result)
+    return {
+        "overall": block(results),
+        "routes": {route: block(rows) for route, rows in sorted(routes.items())},
+    }
+
+
+async def ask(client: httpx.AsyncClient, url: str, question: str, started: float) -> Dict:
+    """Sends one question and times the SSE stream from started (a perf_counter value)."""
+    result = {"route": None, "status": None, "error": None, "ttft": None, "latency": None}
+    try:
+        async with client.stream("POST", f"{url}/ask", json={"question": question}) as response:
+            result["status"] = response.status_code
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}"
+                await response.aread()
+            else:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if event.get("type") == "metadata" and result["route"] is None:
+                        result["route"] = (event.get("content") or {}).get("route")
+                    elif event.get("type") == "token" and result["ttft"] is None:
+                        result["ttft"] = time.perf_counter() - started
+                    elif event.get("type") == "error":
+                        result["error"] = str(event.get("content"))
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+async def drive(
+    url: str,
+    questions: List[str],
+    concurrency: int,
+    rate: float,
+    requests: int,
+    duration: float,
+    timeout: float
+) -> List[Dict]:
+    """
+    Runs the load and returns per-request results.
+    rate > 0 sends requests at that arrival rate (open loop); otherwise
+    concurrency workers send back to back (closed loop).
+    """
+    limits = httpx.Limits(max_connections=concurrency + 8, max_keepalive_connections=concurrency + 8)
+    slots = asyncio.Semaphore(concurrency)
+    rng = random.Random(0)
+    results: List[Dict] = []
+    begin = time.perf_counter()
+
+    def more(sent: int) -> bool:
+        if duration:
+            return time.perf_counter() - begin < duration
+        return sent < requests
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def one(question: str, scheduled: float):
+            async with slots:
+                results.append(await ask(client, url, question, scheduled))
+
+        if rate > 0:
+            tasks = []
+            sent = 0
+            while more(sent):
+                scheduled = begin + sent / rate
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                tasks.append(asyncio.create_task(one(rng.choice(questions), scheduled)))
+                sent += 1
+            await asyncio.gather(*tasks)
+        else:
+            counter = {"sent": 0}
+
+            async def worker():
+                while more(counter["sent"]):
+                    counter["sent"] += 1
+                    await one(rng.choice(questions), time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def configure_environment(stub_url: str, args: argparse.Namespace):
+    """Points settings at the stubs; must run before anything imports src."""
+    forced = {
+        "OPENAI_API_BASE_URL": f"{stub_url}/v1",
+        "TAVILY_API_BASE_URL": stub_url,
+        "MEMORY_BACKEND": "memory",
+        "EMBEDDING_CACHE_PATH": "",
+        "LANGFUSE_PUBLIC_KEY": "",
+        "HTTP2_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": str(args.rate_limit).lower(),
+        "ANSWER_CACHE_ENABLED": str(args.answer_cache).lower(),
+    }
+    os.environ.update(forced)
+    for key in ("OPENAI_API_KEY", "OPENAI_API_KEY_AI_GRID", "TAVILY_API_KEY"):
+        os.environ[key] = "stub-key"
+    os.environ.setdefault("MONGO_URI", "mongodb://stub:27017")
+
+
+def build_index(persist_directory: str, docs_dir: str, stub: StubConfig):
+    """
+    VectorDB over docs_dir in persist_directory. Chunks are embedded
+    in-process with HashEmbeddings; queries go through the stub server via
+    the app's shared, governed HTTP clients, producing the same vectors.
+    """
+    from langchain_openai import OpenAIEmbeddings
+    from src.config import settings
+    from src.database.embedding_cache import CachedEmbeddings, EmbeddingCache
+    from src.database.vector_db import VectorDB
+    from src.scripts.ingest import load_documents
+    from src.utils.clients import EMBEDDING_MODEL, get_async_http_client, get_http_client
+
+    served = OpenAIEmbeddings(
+        model=EMBEDDING_MODEL,
+        api_key=settings.OPENAI_API_KEY_AI_GRID.get_secret_value(),
+        base_url=settings.OPENAI_API_BASE_URL,
+        # Send raw strings: no tokenizer download, and the stub hashes words
+        check_embedding_ctx_length=False,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client()
+    )
+    vector_db = VectorDB(
+        persist_directory=persist_directory,
+        embedding_function=CachedEmbeddings(served, EmbeddingCache.get_instance(), model=served.model)
+    )
+    documents = load_documents(docs_dir)
+    if not documents:
+        raise SystemExit(f"No documents found in {docs_dir}")
+    vectors = HashEmbeddings(stub.embedding_dim).embed_documents([d.page_content for d in documents])
+    vector_db.apply_changes(documents, embeddings=vectors)
+    logger.info(f"Indexed {len(documents)} chunks from {docs_dir}")
+    return vector_db
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /ask against local upstream stubs.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight.")
+    parser.add_argument("--rate", type=float, default=0.0, help="Arrivals per second (0 = closed loop).")
+    parser.add_argument("--requests", type=int, default=100, help="Requests to send (ignored with --duration).")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds to keep sending.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--questions", default=None, help="JSON Lines file of {question}.")
+    parser.add_argument("--docs-dir", default=os.path.join("data", "docs"))
+    parser.add_argument("--output", default=None, help="Result JSON path (default benchmarks/results/load-<time>.json).")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache on.")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep per-client rate limits on (all load comes from one address).")
+    stub_defaults = StubConfig()
+    for field, value in asdict(stub_defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value, help="Stub setting.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    stub = StubConfig(**{field: getattr(args, field) for field in asdict(stub_defaults)})
+    stub_server = StubServer(create_stub_app(stub)).start()
+    configure_environment(stub_server.url, args)
+
+    # Imported only now that settings point at the stubs
+    from src.database.mongo_client import AsyncMongoDBClient
+    from src.database.vector_db import VectorDB
+    import main as app_module
+
+    with tempfile.TemporaryDirectory(prefix="load-test-index-") as persist_directory:
+        vector_db = build_index(persist_directory, args.docs_dir, stub)
+        VectorDB._instances[vector_db.index_name] = vector_db
+        AsyncMongoDBClient._instance = StubMongoClient(sample_orders(), latency=stub.mongo_latency)
+
+        app_server = StubServer(app_module.app).start(timeout=60)
+        try:
+            questions = load_questions(args.questions)
+            started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            begin = time.perf_counter()
+            results = asyncio.run(drive(
+                app_server.url, questions, args.concurrency, args.rate, args.requests, args.duration, args.timeout
+            ))
+            wall = time.perf_counter() - begin
+            server_stats = httpx.get(f"{app_server.url}/stats").json()
+        finally:
+            app_server.stop()
+            stub_server.stop()
+
+    report = {
+        "started_at": started_at,
+        "git_commit": git_commit(),
+        "load": {
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "requests": len(results),
+            "duration": args.duration,
+            "questions": len(questions),
+            "answer_cache": args.answer_cache,
+            "rate_limit": args.rate_limit,
+        },
+        "stub": asdict(stub),
+        "wall_seconds": round(wall, 3),
+        **summarize(results, wall),
+        "server_stats": server_stats,
+    }
+
+    output = args.output or os.path.join("benchmarks", "results", f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    overall = report["overall"]
+    print(f"{overall['requests']} requests in {wall:.1f}s: {overall['throughput_rps']} req/s, error rate {overall['error_rate']}")
+    for route, stats in report["routes"].items():
+        print(f"  {route:16} n={stats['requests']:<4} ttft p50={stats['ttft']['p50']} p95={stats['ttft']['p95']}  "
+              f"latency p50={stats['latency']['p50']} p95={stats['latency']['p95']} p99={stats['latency']['p99']}")
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Retrieval benchmark over data/docs with a versioned golden query set.
+
+Chunks data/docs as ingestion does, embeds the chunks once and builds one
+VectorDB per configuration (search mode + FAISS index spec) in a temporary
+directory. Each golden question is searched against every configuration
+and scored on recall@k and MRR, alongside per-query embedding time,
+search time (excluding the query embedding) and the tokens of the context
+the generator would receive.
+
+The golden set is JSON Lines, one question per line:
+    {"id": "tax-006", "question": "...", "expected": [{"source": "Nigeria-Tax-Act-2025.pdf", "page": 87}]}
+A hit is relevant when its source file name matches and, if given, its
+0-based page matches. Any listed chunk counts as an answer. Edit a golden
+set by adding a new version (retrieval_v2.jsonl) so results stay comparable.
+
+Embeddings:
+    stub  HashEmbeddings in-process (default): offline, deterministic,
+          word-overlap similarity, so it measures the pipeline rather
+          than embedding quality.
+    live  The configured provider. Chunk and query vectors go through the
+          shared embedding cache, so reruns with EMBEDDING_CACHE_PATH set
+          make no remote calls.
+
+Usage:
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --k 1 5 10 hybrid/flat hybrid/hnsw:ef_search=16 vector/ivf:nprobe=1
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import logging
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.load_test import git_commit, percentiles
+from benchmarks.stubs import HashEmbeddings
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+DEFAULT_GOLDEN = os.path.join(GOLDEN_DIR, "retrieval_v1.jsonl")
+DEFAULT_K = [1, 3, 5, 10]
+DEFAULT_CONFIGS = [
+    "vector/flat",
+    "lexical/flat",
+    "hybrid/flat",
+    "hybrid/hnsw:ef_search=64",
+    "hybrid/ivf:nprobe=8",
+]
+
+
+def load_golden(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        if not row.get("expected"):
+            raise ValueError(f"Golden query {row.get('id')} has no expected chunks")
+    return rows
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def is_relevant(doc: Document, expected: Sequence[Dict]) -> bool:
+    source = os.path.basename(str(doc.metadata.get("source", "")))
+    page = doc.metadata.get("page")
+    return any(
+        source == item["source"] and ("page" not in item or page == item["page"])
+        for item in expected
+    )
+
+
+def first_relevant_rank(hits: List[Document], expected: Sequence[Dict]) -> Optional[int]:
+    """1-based rank of the first relevant hit, or None."""
+    for rank, doc in enumerate(hits, 1):
+        if is_relevant(doc, expected):
+            return rank
+    return None
+
+
+def score(ranks: List[Optional[int]], ks: Sequence[int]) -> Dict:
+    """
+    Recall@k (share of queries with a relevant hit in the top k) and MRR
+    over the retrieved depth.
+
+    Args:
+        ranks: First relevant rank per query (None when nothing relevant was retrieved).
+        ks: Cut-offs to report.
+    """
+    n = len(ranks) or 1
+    return {
+        "recall": {str(k): round(sum(r is not None and r <= k for r in ranks) / n, 4) for k in ks},
+        "mrr": round(sum(1.0 / r for r in ranks if r is not None) / n, 4),
+    }
+
+
+class TimedEmbeddings(Embeddings):
+    """Records how long each query embedding takes, so search time can exclude it."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", "unknown")
+        self.query_seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        try:
+            return self.embeddings.embed_query(text)
+        finally:
+            self.query_seconds += time.perf_counter() - started
+
+
+def make_embeddings(kind: str, dim: int) -> Embeddings:
+    if kind == "stub":
+        return HashEmbeddings(dim)
+    from src.database.embedding_cache import CachedEmbeddings, EmbeddingCache
+    from src.utils.clients import get_embeddings
+    embeddings = get_embeddings()
+    return CachedEmbeddings(embeddings, EmbeddingCache.get_instance(), model=embeddings.model)
+
+
+def embed_chunks(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Chunk vectors; with a cache, only uncached chunks reach the provider."""
+    cache = getattr(embeddings, "cache", None)
+    if cache is None:
+        return embeddings.embed_documents(texts)
+    vectors = [cache.get(embeddings.model, text) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        logger.info(f"Embedding {len(missing)} of {len(texts)} chunks")
+        fresh = embeddings.embed_documents([texts[i] for i in missing])
+        for i, vector in zip(missing, fresh):
+            cache.put(embeddings.model, texts[i], vector)
+            vectors[i] = vector
+    return vectors
+
+
+def evaluate(
+    spec: str,
+    documents: List[Document],
+    vectors: List[List[float]],
+    embeddings: Embeddings,
+    golden: List[Dict],
+    ks: Sequence[int],
+    context_k: int
+) -> Dict:
+    """Builds one configuration and runs every golden query against it."""
+    from src.agent.context import prepare_context
+    from src.database.faiss_index import IndexConfig
+    from src.database.vector_db import VectorDB
+    from src.utils.tokens import count_tokens
+
+    mode, _, index_spec = spec.partition("/")
+    index_config = IndexConfig.parse(index_spec or "flat")
+    timed = TimedEmbeddings(embeddings)
+    depth = max(max(ks), context_k)
+
+    with tempfile.TemporaryDirectory(prefix="retrieval-bench-") as persist_directory:
+        started = time.perf_counter()
+        VectorDB(
+            persist_directory=persist_directory, embedding_function=timed, index_config=index_config
+        ).apply_changes(documents, embeddings=vectors)
+        build_seconds = time.perf_counter() - started
+        # Reopen as the app serves it: memory-mapped vectors, SQLite docstore with BM25
+        vector_db = VectorDB(
+            persist_directory=persist_directory, embedding_function=timed, index_config=index_config
+        )
+
+        queries = []
+        for row in golden:
+            timed.query_seconds = 0.0
+            started = time.perf_counter()
+            hits = vector_db.search(row["question"], limit=depth, mode=mode)
+            elapsed = time.perf_counter() - started
+            queries.append({
+                "id": row["id"],
+                "rank": first_relevant_rank(hits[:max(ks)], row["expected"]),
+                "embed_ms": round(timed.query_seconds * 1000, 3),
+                "search_ms": round((elapsed - timed.query_seconds) * 1000, 3),
+                "context_tokens": count_tokens(prepare_context([], hits[:context_k])),
+                "top": [
+                    f"{os.path.basename(str(d.metadata.get('source', '')))}:{d.metadata.get('page', '-')}"
+                    for d in hits[:3]
+                ],
+            })
+
+    ranks = [q["rank"] for q in queries]
+    return {
+        "config": spec,
+        "mode": mode,
+        "index": index_config.label(),
+        "build_seconds": round(build_seconds, 3),
+        **score(ranks, ks),
+        "embed_ms": percentiles([q["embed_ms"] for q in queries]),
+        "search_ms": percentiles([q["search_ms"] for q in queries]),
+        "context_tokens": percentiles([q["context_tokens"] for q in queries]),
+        "misses": [q["id"] for q in queries if q["rank"] is None],
+        "queries": queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score VectorDB configurations against a golden query set.")
+    parser.add_argument("configs", nargs="*", default=DEFAULT_CONFIGS,
+                        help="mode/index specs, e.g. hybrid/hnsw:ef_search=64 (default: %(default)s).")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN, help="Golden set (JSON Lines).")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K, help="Recall cut-offs.")
+    parser.add_argument("--context-k", type=int, default=10, help="Hits packed into the measured context.")
+    parser.add_argument("--embeddings", choices=["stub", "live"], default="stub")
+    parser.add_argument("--dim", type=int, default=384, help="Stub embedding dimension.")
+    parser.add_argument("--docs-dir", default=os.path.join("data", "docs"))
+    parser.add_argument("--output", default=None, help="Result JSON path (default benchmarks/results/retrieval-<time>.json).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    if args.embeddings == "stub":
+        # Settings must load without real credentials or a reachable provider
+        for key in ("OPENAI_API_KEY", "OPENAI_API_KEY_AI_GRID", "TAVILY_API_KEY"):
+            os.environ.setdefault(key, "stub-key")
+        os.environ.setdefault("OPENAI_API_BASE_URL", "http://127.0.0.1:9/v1")
+        os.environ.setdefault("MONGO_URI", "mongodb://stub:27017")
+        os.environ["LANGFUSE_PUBLIC_KEY"] = ""
+
+    from src.scripts.ingest import load_documents
+
+    golden = load_golden(args.golden)
+    documents = load_documents(args.docs_dir)
+    if not documents:
+        raise SystemExit(f"No documents found in {args.docs_dir}")
+
+    embeddings = make_embeddings(args.embeddings, args.dim)
+    started = time.perf_counter()
+    vectors = embed_chunks(embeddings, [d.page_content for d in documents])
+    logger.info(f"Embedded {len(documents)} chunks in {time.perf_counter() - started:.1f}s")
+
+    results = []
+    for spec in args.configs:
+        result = evaluate(spec, documents, vectors, embeddings, golden, args.k, args.context_k)
+        results.append(result)
+        recall = " ".join(f"R@{k}={v}" for k, v in result["recall"].items())
+        print(f"{spec:28} {recall} MRR={result['mrr']}  embed p50={result['embed_ms']['p50']}ms  "
+              f"search p50={result['search_ms']['p50']}ms p95={result['search_ms']['p95']}ms  "
+              f"context={result['context_tokens']['mean']} tokens")
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "golden": {
+            "path": os.path.relpath(args.golden),
+            "sha256": file_digest(args.golden),
+            "queries": len(golden),
+        },
+        "embeddings": {"kind": args.embeddings, "model": getattr(embeddings, "model", None)},
+        "chunks": len(documents),
+        "k": args.k,
+        "context_k": args.context_k,
+        "results": results,
+    }
+
+    output = args.output or os.path.join("benchmarks", "results", f"retrieval-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
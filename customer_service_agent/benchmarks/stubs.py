@@ -0,0 +1,295 @@
+"""
+Local stand-ins for the agent's upstream services.
+
+- An OpenAI-compatible server (chat completions with streaming,
+  embeddings, models) and a Tavily search endpoint, served by one FastAPI
+  app with configurable latency, token rate and error rate.
+- An in-process MongoDB client exposing the subset of the async driver
+  used by the agent (ping, find_one, close), with configurable latency.
+- HashEmbeddings: deterministic bag-of-words vectors, shared by the stub
+  embeddings endpoint and offline retrieval benchmarks, so questions that
+  share words with a chunk land near it.
+
+This module does not import src, so it can start before settings load.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+import zlib
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain_core.embeddings import Embeddings
+
+_WORD = re.compile(r"\w+")
+
+# Words emitted by the stub chat model
+_ANSWER_WORDS = (
+    "Dear Valued Client, thank you for your inquiry. Under the applicable provisions "
+    "the obligation applies from the stated date and remittance is due monthly. "
+    "Respectfully yours, Customer Service Division"
+).split()
+
+
+def hash_embedding(text: str, dim: int = 384) -> List[float]:
+    """Unit-length hashed bag-of-words vector for text."""
+    vector = np.zeros(dim, dtype="float32")
+    for word in _WORD.findall(text.lower()):
+        bucket = zlib.crc32(word.encode("utf-8"))
+        vector[bucket % dim] += 1.0 if bucket & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector.tolist()
+
+
+class HashEmbeddings(Embeddings):
+    """LangChain embeddings backed by hash_embedding; no network access."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.model = f"hash-{dim}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [hash_embedding(text, self.dim) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return hash_embedding(text, self.dim)
+
+
+@dataclass
+class StubConfig:
+    chat_ttft: float = 0.3  # Seconds before the first completion token
+    chat_tokens_per_second: float = 50.0
+    completion_tokens: int = 120
+    embedding_latency: float = 0.02  # Seconds per embeddings request
+    embedding_dim: int = 384
+    tavily_latency: float = 0.8
+    mongo_latency: float = 0.005
+    error_rate: float = 0.0  # Share of model calls answered with 429
+
+
+def _jitter(seconds: float) -> float:
+    return max(0.0, random.gauss(seconds, seconds * 0.1))
+
+
+def _completion_text(body: Dict[str, Any], tokens: int) -> List[str]:
+    """Completion pieces shaped for the prompt that asked for them."""
+    system = " ".join(
+        str(m.get("content", "")) for m in body.get("messages", []) if m.get("role") == "system"
+    )
+    if "ONLY 'YES' or 'NO'" in system:
+        return ["YES"]
+    if "search query optimizer" in system:
+        user = next((str(m.get("content", "")) for m in body.get("messages", []) if m.get("role") == "user"), "")
+        return [" ".join(_WORD.findall(user)[:8])]
+    pieces = [(_ANSWER_WORDS[i % len(_ANSWER_WORDS)] + " ") for i in range(tokens)]
+    if "[[SUFFICIENT]]" in system:
+        pieces.insert(0, "[[SUFFICIENT]] ")
+    return pieces
+
+
+def create_stub_app(config: StubConfig) -> FastAPI:
+    """OpenAI-compatible and Tavily endpoints with the configured behaviour."""
+    app = FastAPI(title="Upstream stubs")
+
+    def rate_limited() -> Optional[JSONResponse]:
+        if config.error_rate and random.random() < config.error_rate:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"retry-after": "1"}
+            )
+        return None
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        limited = rate_limited()
+        if limited is not None:
+            return limited
+        body = await request.json()
+        pieces = _completion_text(body, config.completion_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub")
+        interval = 1.0 / config.chat_tokens_per_second if config.chat_tokens_per_second > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(_jitter(config.chat_ttft) + interval * len(pieces))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(pieces)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(pieces), "total_tokens": len(pieces)}
+            }
+
+        async def stream():
+            def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            await asyncio.sleep(_jitter(config.chat_ttft))
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in pieces:
+                yield chunk({"content": piece})
+                if interval:
+                    await asyncio.sleep(interval)
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        limited = rate_limited()
+        if limited is not None:
+            return limited
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        await asyncio.sleep(_jitter(config.embedding_latency))
+        data = [
+            {
+                "object": "embedding",
+                "index": i,
+                # Token-id inputs are hashed as space-separated ids
+                "embedding": hash_embedding(
+                    text if isinstance(text, str) else " ".join(map(str, text)), config.embedding_dim
+                )
+            }
+            for i, text in enumerate(inputs)
+        ]
+        return {"object": "list", "data": data, "model": body.get("model", "stub"), "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+    @app.post("/search")
+    async def tavily_search(request: Request):
+        body = await request.json()
+        await asyncio.sleep(_jitter(config.tavily_latency))
+        query = body.get("query", "")
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i} for {query[:40]}",
+                    "url": f"https://example.com/{i}",
+                    "content": f"Background information about {query}. " * 3,
+                    "score": round(0.9 - i * 0.1, 2)
+                }
+                for i in range(body.get("max_results", 3))
+            ],
+            "response_time": config.tavily_latency
+        }
+
+    return app
+
+
+class StubServer:
+    """Runs an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port or free_port(host)
+        self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> "StubServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class _StubCollection:
+    def __init__(self, documents: Dict[str, Dict[str, Any]], latency: float):
+        self._documents = documents
+        self._latency = latency
+
+    async def find_one(self, query: Dict[str, Any]):
+        await asyncio.sleep(_jitter(self._latency))
+        document = self._documents.get(query.get("order_id"))
+        return dict(document) if document else None
+
+
+class _StubDatabase:
+    def __init__(self, collections: Dict[str, _StubCollection], latency: float):
+        self._collections = collections
+        self._latency = latency
+
+    def __getitem__(self, name: str) -> _StubCollection:
+        return self._collections.setdefault(name, _StubCollection({}, self._latency))
+
+    async def command(self, name: str):
+        await asyncio.sleep(self._latency)
+        return {"ok": 1}
+
+
+class StubMongoClient:
+    """The parts of pymongo's AsyncMongoClient the agent uses, backed by a dict."""
+
+    def __init__(self, orders: Dict[str, Dict[str, Any]], latency: float = 0.005):
+        self._latency = latency
+        self._orders = _StubCollection(orders, latency)
+        self.admin = _StubDatabase({}, latency)
+
+    def __getitem__(self, db_name: str) -> _StubDatabase:
+        return _StubDatabase({"orders": self._orders}, self._latency)
+
+    async def close(self):
+        pass
+
+
+def sample_orders(count: int = 100) -> Dict[str, Dict[str, Any]]:
+    """Orders ORD1000 .. ORD<1000+count-1> in the shape of the orders collection."""
+    statuses = ["processing", "shipped", "delivered", "cancelled"]
+    return {
+        f"ORD{1000 + i}": {
+            "_id": f"{i:024x}",
+            "order_id": f"ORD{1000 + i}",
+            "status": statuses[i % len(statuses)],
+            "items": [{"sku": f"SKU-{i % 7}", "qty": 1 + i % 3}],
+            "total_amount": round(25 + i * 3.5, 2)
+        }
+        for i in range(count)
+    }
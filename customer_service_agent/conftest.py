@@ -0,0 +1,31 @@
+"""
+Pytest configuration.
+Provides placeholder credentials so modules that read settings at import
+time can be loaded without a .env file, and keeps the caches and
+checkpoints that tests write out of the repository's data directory.
+"""
+import os
+
+import pytest
+
+for key, value in {
+    "OPENAI_API_KEY": "test-key",
+    "OPENAI_API_BASE_URL": "http://localhost:9/v1",
+    "OPENAI_API_KEY_AI_GRID": "test-key",
+    "MONGO_URI": "mongodb://localhost:27017",
+    "TAVILY_API_KEY": "test-key",
+    "MEMORY_BACKEND": "memory",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dirs(tmp_path, monkeypatch):
+    from src.config import settings
+    from src.database.embedding_cache import EmbeddingCache
+
+    monkeypatch.setattr(settings, "INGEST_PAGE_CACHE_DIR", str(tmp_path / "cache" / "pages"))
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", str(tmp_path / "embedding_cache.sqlite3"))
+    monkeypatch.setattr(settings, "INGEST_CHECKPOINT_DIR", str(tmp_path))
+    # The shared cache is opened on first use, so each test gets its own file
+    monkeypatch.setattr(EmbeddingCache, "_instance", None)
@@ -5,6 +5,10 @@ import ChatHeader from './ChatHeader';
 import MessageList from './MessageList';
 import ChatInput from './ChatInput';
 import { askAgent } from '../api';
+import { createTypewriter } from '../utils';
+
+// Client-side typing effect for streamed answers; set VITE_TYPING_EFFECT=false to render tokens as they arrive
+const TYPING_EFFECT = import.meta.env.VITE_TYPING_EFFECT !== 'false';
 
 const ChatWidget = () => {
     const [isOpen, setIsOpen] = useState(false);
@@ -39,6 +43,13 @@ const ChatWidget = () => {
 
         let fullContent = '';
         let metadata = null;
+        const typewriter = createTypewriter((visible) => {
+            setMessages(prev => prev.map(msg =>
+                msg.id === assistantMessageId
+                    ? { ...msg, content: visible, isThinking: false }
+                    : msg
+            ));
+        }, { enabled: TYPING_EFFECT });
 
         try {
             const chatHistory = messages.map(msg => ({
@@ -50,11 +61,7 @@ const ChatWidget = () => {
                 if (chunk.type === 'token') {
                     setIsThinking(false);
                     fullContent += chunk.content;
-                    setMessages(prev => prev.map(msg =>
-                        msg.id === assistantMessageId
-                            ? { ...msg, content: fullContent, isThinking: false }
-                            : msg
-                    ));
+                    typewriter.push(fullContent);
                 } else if (chunk.type === 'metadata') {
                     metadata = chunk.content;
                     setMessages(prev => prev.map(msg =>
@@ -74,7 +81,10 @@ const ChatWidget = () => {
                 }
             });
 
+            await typewriter.drain();
+
         } catch (error) {
+            typewriter.cancel();
             console.error("Error sending message:", error);
             setMessages(prev => prev.map(msg =>
                 msg.id === assistantMessageId
@@ -4,3 +4,58 @@ import { twMerge } from 'tailwind-merge';
 export function cn(...inputs) {
     return twMerge(clsx(inputs));
 }
+
+/**
+ * Reveals streamed text progressively, one animation frame at a time.
+ * The server sends text as fast as it is generated; this restores a
+ * typing effect on the client and speeds up when it falls behind.
+ *
+ * @param {(text: string) => void} onUpdate Called with the visible text.
+ * @param {{ enabled?: boolean, charsPerFrame?: number }} options
+ */
+export function createTypewriter(onUpdate, { enabled = true, charsPerFrame = 2 } = {}) {
+    let target = '';
+    let shown = 0;
+    let frame = null;
+    let resolveDrain = null;
+
+    const tick = () => {
+        const backlog = target.length - shown;
+        // Catch up within ~20 frames when a large chunk arrives
+        shown += Math.max(charsPerFrame, Math.ceil(backlog / 20));
+        shown = Math.min(shown, target.length);
+        onUpdate(target.slice(0, shown));
+
+        if (shown < target.length) {
+            frame = requestAnimationFrame(tick);
+        } else {
+            frame = null;
+            if (resolveDrain) {
+                resolveDrain();
+                resolveDrain = null;
+            }
+        }
+    };
+
+    return {
+        push(text) {
+            target = text;
+            if (!enabled || typeof requestAnimationFrame === 'undefined') {
+                shown = target.length;
+                onUpdate(target);
+            } else if (frame === null && shown < target.length) {
+                frame = requestAnimationFrame(tick);
+            }
+        },
+        drain() {
+            if (shown >= target.length) return Promise.resolve();
+            return new Promise(resolve => { resolveDrain = resolve; });
+        },
+        cancel() {
+            if (frame !== null) cancelAnimationFrame(frame);
+            frame = null;
+            if (resolveDrain) resolveDrain();
+            resolveDrain = null;
+        },
+    };
+}
@@ -2,23 +2,78 @@
 FastAPI application for the Customer Service Agent.
 Exposes an /ask endpoint to interact with the agent graph.
 """
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from starlette.background import BackgroundTasks
 from pydantic import BaseModel, Field
 
-from langfuse.callback import CallbackHandler
-from src.agent.graph import graph
+from src.agent.answer_cache import AnswerCache
+from src.agent.graph import get_session_graph, graph
+from src.agent.memory import compact_history, open_checkpointer, turn_input
+from src.agent.nodes.orchestrator import classify_question
 from src.config import settings
+from src.database.mongo_client import AsyncMongoDBClient
+from src.database.vector_db import VectorDB
+from src.utils.admission import AdmissionController, AdmissionRejected, client_address
+from src.utils.clients import warm_up
+from src.utils.governor import UpstreamGovernor
+from src.utils.langfuse_logger import LangfuseTracer
+from src.utils.metrics import REQUEST_DURATION, record_cache, render_metrics, start_request
+from src.utils.sse import coalesce_tokens, sse_frame
+from src.utils.tokens import load_encoding
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Loads shared resources once per worker at startup and releases them on shutdown.
+    """
+    try:
+        vector_db = VectorDB.get_instance()
+        vector_db.start_watcher()
+    except Exception as e:
+        # Searches will retry loading on first use
+        logger.error(f"Failed to load VectorDB at startup: {e}")
+
+    # Open pooled connections to the model and search APIs before the first request
+    await warm_up()
+
+    # The first token count would otherwise fetch tiktoken's BPE file inside a request
+    await asyncio.to_thread(load_encoding)
+
+    try:
+        await AsyncMongoDBClient.connect()
+    except Exception as e:
+        # Order lookups report the error per request until MongoDB is reachable
+        logger.error(f"Failed to connect to MongoDB at startup: {e}")
+
+    try:
+        await open_checkpointer()
+    except Exception as e:
+        # Stateless requests still work; requests with a session_id get 503
+        logger.error(f"Failed to open session memory ({settings.MEMORY_BACKEND}) at startup: {e}")
+
+    # Create the shared tracing handler before the first request
+    tracer = LangfuseTracer.get_instance()
+
+    yield
+
+    VectorDB.reset_instances()
+    await AsyncMongoDBClient.close()
+    await asyncio.to_thread(tracer.flush)
+
 app = FastAPI(
     title="Customer Service Agent",
     description="A formal tax advisory customer service agent",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- Pydantic Models ---
@@ -28,7 +83,11 @@ class QueryRequest(BaseModel):
     question: str = Field(..., description="The user's question")
     chat_history: Optional[List[Dict[str, str]]] = Field(
         default=[], 
-        description="Previous chat history (optional)"
+        description="Previous chat history (optional, ignored when session_id is set)"
+    )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Conversation id; history is kept server-side across requests (optional)"
     )
 
 class QueryResponse(BaseModel):
@@ -45,48 +104,189 @@ async def root():
     return {"message": "Customer Service Agent is running"}
 
 from fastapi.responses import StreamingResponse
-import json
+
+async def _answer_cache_key(
+    question: str,
+    chat_history: Optional[List[Dict[str, str]]],
+    session_id: Optional[str] = None
+):
+    """
+    Returns (route, question embedding, index generation) for the answer
+    cache, or None if this question should not be served from cache.
+    """
+    # Answers depending on conversation context are never shared
+    if not settings.ANSWER_CACHE_ENABLED or chat_history or session_id:
+        return None
+
+    route = (await classify_question(question))["route"]
+    if route not in settings.ANSWER_CACHE_ROUTES:
+        return None
+
+    try:
+        vector_db = VectorDB.get_instance()
+        vector = await vector_db.embedding_function.aembed_query(question)
+    except Exception as e:
+        logger.warning(f"Answer cache unavailable: {e}")
+        return None
+
+    return route, vector, vector_db.generation
+
+@app.get("/stats")
+async def stats():
+    """Admission control and upstream governor load."""
+    return {
+        "admission": AdmissionController.get_instance().stats(),
+        "upstream": UpstreamGovernor.get_instance().stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Latency, retry and cache metrics in Prometheus format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.post("/ask")
-async def ask_agent(request: QueryRequest):
+async def ask_agent(request: QueryRequest, http_request: Request):
     """
     Process a user query through the agent graph with real-time streaming results.
+    Rejects with 429 (client rate limit) or 503 (server busy) and a
+    Retry-After header when the request cannot be admitted.
     """
+    session_graph = None
+    if request.session_id:
+        try:
+            session_graph = get_session_graph()
+        except RuntimeError as e:
+            logger.error(f"Rejected session query: {e}")
+            raise HTTPException(status_code=503, detail="Session memory is unavailable")
+
+    ticket = None
+    if settings.ADMISSION_ENABLED:
+        client = client_address(
+            http_request.client.host if http_request.client else None,
+            http_request.headers.get("x-forwarded-for"),
+            settings.TRUSTED_PROXIES
+        )
+        try:
+            ticket = await AdmissionController.get_instance().acquire(client)
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected query ({e.status_code}): {e.reason}")
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=e.reason,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
     async def event_generator():
+        # Full traces for a sampled share of requests; errors and slow requests get a summary
+        tracer = LangfuseTracer.get_instance()
+        sampled = tracer.sample()
+        started = time.monotonic()
+        timing = start_request()
+        final_state = {}
+        error = None
         try:
             logger.info(f"Received query: {request.question}")
             
-            # Initialize state
-            initial_state = {
-                "question": request.question,
-                "chat_history": request.chat_history,
-                "documents": [],
-                "mongo_data": [],
-                "final_answer": None,
-                "feedback_score": None
-            }
-            
-            # Initialize Langfuse CallbackHandler
-            langfuse_handler = CallbackHandler(
-                secret_key=settings.LANGFUSE_SECRET_KEY.get_secret_value() if settings.LANGFUSE_SECRET_KEY else None,
-                public_key=settings.LANGFUSE_PUBLIC_KEY,
-                host=settings.LANGFUSE_HOST
+            # Serve near-identical recent questions from the answer cache
+            cache_key = await _answer_cache_key(
+                request.question, request.chat_history, request.session_id
             )
+            if cache_key is not None:
+                cached = AnswerCache.get_instance().lookup(*cache_key)
+                record_cache("answer", cached is not None)
+                if cached is not None:
+                    final_state = {"route": cache_key[0]}
+                    for event in cached.events:
+                        yield sse_frame(event)
+                    if settings.SSE_TIMING_EVENT:
+                        yield sse_frame({"type": "timing", "content": timing.summary()})
+                    return
+            
+            config = {"callbacks": tracer.callbacks(sampled)}
+            if session_graph is not None:
+                # History and summary come from the session's checkpoint
+                run_graph = session_graph
+                initial_state = turn_input(request.question)
+                config["configurable"] = {"thread_id": request.session_id}
+            else:
+                run_graph = graph
+                initial_state = {
+                    "question": request.question,
+                    "chat_history": request.chat_history or [],
+                    "documents": [],
+                    "mongo_data": [],
+                    "final_answer": None,
+                    "feedback_score": None
+                }
+            
+            # Stream custom events; "values" tracks the final state for the answer cache
+            async def custom_events():
+                nonlocal final_state
+                async for mode, chunk in run_graph.astream(
+                    initial_state,
+                    stream_mode=["custom", "values"],
+                    config=config
+                ):
+                    if mode == "values":
+                        final_state = chunk
+                        continue
+                    # 'chunk' is exactly what we passed to writer() in the nodes
+                    yield chunk
 
-            # Use graph.astream with stream_mode="custom"
-            async for chunk in graph.astream(
-                initial_state,
-                stream_mode="custom",
-                config={"callbacks": [langfuse_handler]}
+            events = []
+            async for event in coalesce_tokens(
+                custom_events(),
+                window=settings.SSE_COALESCE_WINDOW_MS / 1000,
+                max_chars=settings.SSE_COALESCE_MAX_CHARS
+            ):
+                events.append(event)
+                yield sse_frame(event)
+            
+            if settings.SSE_TIMING_EVENT:
+                yield sse_frame({"type": "timing", "content": timing.summary()})
+            
+            # Only cache answers grounded in the knowledge base, not reroutes or fallbacks
+            if (
+                cache_key is not None
+                and final_state.get("context_sufficient")
+                and final_state.get("final_answer")
+                and final_state.get("route") == cache_key[0]
             ):
-                # 'chunk' is exactly what we passed to writer() in the nodes
-                yield f"data: {json.dumps(chunk)}\n\n"
+                AnswerCache.get_instance().store(*cache_key, events)
 
         except Exception as e:
             logger.error(f"Error in stream: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            error = str(e)
+            yield sse_frame({"type": "error", "content": str(e)})
+        finally:
+            if ticket is not None:
+                ticket.release()
+            REQUEST_DURATION.labels(final_state.get("route") or "unknown").observe(time.monotonic() - started)
+            tracer.record_request(
+                sampled,
+                time.monotonic() - started,
+                request.question,
+                route=final_state.get("route"),
+                error=error
+            )
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    background = BackgroundTasks()
+    if ticket is not None:
+        # Frees the slot if the client disconnects before streaming starts
+        background.add_task(ticket.release)
+    if session_graph is not None:
+        # Summarizing older turns runs after the answer has been sent and the slot freed
+        background.add_task(
+            compact_history, session_graph, {"configurable": {"thread_id": request.session_id}}
+        )
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        background=background
+    )
 
 if __name__ == "__main__":
     import uvicorn
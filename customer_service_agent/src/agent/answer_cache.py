@@ -0,0 +1,128 @@
+"""
+Semantic answer cache.
+Serves answers to questions that are near-identical to recently answered
+ones, keyed on route plus question embedding. Entries expire after a TTL,
+are bounded by an LRU size limit and are dropped when the FAISS index
+generation changes.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from src.config import settings
+import itertools
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    route: str
+    vector: np.ndarray
+    # Stream events of the original run, replayed verbatim on a hit
+    events: List[Dict]
+    created_at: float
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype="float32")
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class AnswerCache:
+    _instance: Optional["AnswerCache"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_size: int = 512, ttl: float = 3600.0, threshold: float = 0.95):
+        """
+        Args:
+            max_size: Maximum number of cached answers.
+            ttl: Seconds an answer stays valid.
+            threshold: Minimum cosine similarity between questions for a hit.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.generation: Optional[str] = None
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls) -> "AnswerCache":
+        """
+        Returns the process-wide cache configured from settings.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        max_size=settings.ANSWER_CACHE_SIZE,
+                        ttl=settings.ANSWER_CACHE_TTL,
+                        threshold=settings.ANSWER_CACHE_THRESHOLD
+                    )
+        return cls._instance
+
+    def _check_generation(self, generation: Optional[str]):
+        # Answers were built from a specific index generation
+        if generation != self.generation:
+            if self._entries:
+                logger.info(f"Index generation changed; dropping {len(self._entries)} cached answers.")
+            self._entries.clear()
+            self.generation = generation
+
+    def lookup(self, route: str, vector: List[float], generation: Optional[str]) -> Optional[CachedAnswer]:
+        """
+        Returns the most similar live answer on the same route, if above threshold.
+        """
+        query = _normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            self._check_generation(generation)
+
+            best_key, best_score = None, self.threshold
+            for key, entry in list(self._entries.items()):
+                if now - entry.created_at > self.ttl:
+                    del self._entries[key]
+                    continue
+                if entry.route != route:
+                    continue
+                score = float(np.dot(query, entry.vector))
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            logger.info(f"Answer cache hit on route '{route}' (similarity {best_score:.3f}).")
+            return self._entries[best_key]
+
+    def store(self, route: str, vector: List[float], generation: Optional[str], events: List[Dict]):
+        """
+        Caches the stream events of a completed answer.
+        """
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[next(self._ids)] = CachedAnswer(
+                route=route,
+                vector=_normalize(vector),
+                events=list(events),
+                created_at=time.monotonic()
+            )
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
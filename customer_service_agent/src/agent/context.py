@@ -0,0 +1,109 @@
+"""
+Token-budgeted context packing.
+Retrieved chunks are packed into a prompt budget measured with the
+model's tokenizer, in retrieval order: search already ranks hits best
+first (vector similarity, or reciprocal rank fusion with BM25 in hybrid
+mode), so that order is the relevance order. The lowest-ranked chunks are
+dropped first, and only the last chunk that fits is trimmed, so the best
+evidence always reaches the LLM intact.
+"""
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from src.config import settings
+from src.utils.tokens import count_tokens, truncate_tokens
+import logging
+
+logger = logging.getLogger(__name__)
+
+NO_DATA_MESSAGE = "NO DATA FOUND. The system could not retrieve any order details or policy documents."
+TRIMMED_MARKER = " [...]"
+
+
+def _render_document(index: int, doc: Document, content: str) -> str:
+    source = doc.metadata.get("source", "Unknown Source")
+    return f"Document {index} (Source: {source}):\n{content}"
+
+
+def _render_orders(mongo_data: List[dict]) -> List[str]:
+    parts = []
+    for data in mongo_data or []:
+        if "error" in data:
+            parts.append(f"ORDER SYSTEM ERROR: {data['error']}")
+        elif "result" in data:
+            parts.append(f"ORDER DATA:\n{data['result']}")
+    return parts
+
+
+def pack_documents(
+    documents: List[Document],
+    budget: int,
+    min_chunk_tokens: Optional[int] = None
+) -> Tuple[List[str], int]:
+    """
+    Packs documents into a token budget in the order given.
+
+    Args:
+        documents: Retrieved documents, best first
+        budget: Tokens available for the rendered documents
+        min_chunk_tokens: A chunk trimmed below this many tokens is dropped
+
+    Returns:
+        (rendered document blocks, tokens used)
+    """
+    if min_chunk_tokens is None:
+        min_chunk_tokens = settings.CONTEXT_MIN_CHUNK_TOKENS
+
+    parts: List[str] = []
+    used = 0
+    for doc in documents:
+        block = _render_document(len(parts) + 1, doc, doc.page_content)
+        tokens = count_tokens(block) + 2  # Separator between blocks
+        if used + tokens <= budget:
+            parts.append(block)
+            used += tokens
+            continue
+
+        # Trim the best chunk that does not fit, then stop: everything after it ranks lower
+        header_tokens = count_tokens(_render_document(len(parts) + 1, doc, "")) + count_tokens(TRIMMED_MARKER) + 2
+        room = budget - used - header_tokens
+        if room >= min_chunk_tokens:
+            content = truncate_tokens(doc.page_content, room)
+            if content:
+                block = _render_document(len(parts) + 1, doc, content + TRIMMED_MARKER)
+                parts.append(block)
+                used += count_tokens(block) + 2
+        break
+
+    if len(parts) < len(documents):
+        logger.info(f"Context packing kept {len(parts)} of {len(documents)} documents ({used}/{budget} tokens)")
+    return parts, used
+
+
+def prepare_context(mongo_data: List[dict], documents: List[Document], budget: Optional[int] = None) -> str:
+    """
+    Formats retrieved data into a single context string for the LLM.
+    Order data is always included; policy documents fill the remaining
+    token budget in retrieval order.
+
+    Args:
+        mongo_data: Order lookup results
+        documents: Retrieved documents
+        budget: Token budget for the whole context (default CONTEXT_TOKEN_BUDGET)
+    """
+    if budget is None:
+        budget = settings.CONTEXT_TOKEN_BUDGET
+
+    context_parts = _render_orders(mongo_data)
+
+    if documents:
+        heading = "POLICY DOCUMENTS:"
+        remaining = budget - sum(count_tokens(part) + 2 for part in context_parts) - count_tokens(heading) - 2
+        blocks, _ = pack_documents(documents, remaining)
+        if blocks:
+            context_parts.append(heading)
+            context_parts.extend(blocks)
+
+    if not context_parts:
+        return NO_DATA_MESSAGE
+
+    return "\n\n".join(context_parts)
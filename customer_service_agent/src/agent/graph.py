@@ -5,15 +5,25 @@ Defines conditional execution flow with rerouting capability.
 Flow:
   START → Orchestrator → Tool Node → Generate → [Context Sufficient?]
                                                     ↓
-                                              Yes → END
+                                              Yes → Memory → END
                                               No (retry=0) → Orchestrator (web search)
-                                              No (retry≥1) → END (ask user)
+                                              No (retry≥1) → Memory → END (ask user)
+
+Memory records the turn for sessions (see get_session_graph); older turns
+are summarized after the response is sent (memory.compact_history).
+Every node's duration is recorded in src.utils.metrics.
+
+Sufficiency is judged by Generate, by default inline within the answer
+call itself, so a turn costs one LLM call unless it is rerouted.
 """
 from langgraph.graph import StateGraph, END
+import threading
 from src.agent.state import AgentState
 from src.agent.nodes.orchestrator import orchestrator
 from src.agent.nodes.tool_node import tool_node
 from src.agent.nodes.generate import generate
+from src.agent.memory import get_checkpointer, update_memory
+from src.utils.metrics import timed_node
 
 
 def should_reroute(state: AgentState) -> str:
@@ -38,10 +48,11 @@ def should_reroute(state: AgentState) -> str:
 # Initialize the graph with AgentState
 workflow = StateGraph(AgentState)
 
-# Add nodes
-workflow.add_node("orchestrator", orchestrator)
-workflow.add_node("tool_node", tool_node)
-workflow.add_node("generate", generate)
+# Add nodes, each timed for /metrics
+workflow.add_node("orchestrator", timed_node("orchestrator", orchestrator))
+workflow.add_node("tool_node", timed_node("tool_node", tool_node))
+workflow.add_node("generate", timed_node("generate", generate))
+workflow.add_node("memory", timed_node("memory", update_memory))
 
 # Define edges
 # 1. Start → Orchestrator
@@ -53,16 +64,39 @@ workflow.add_edge("orchestrator", "tool_node")
 # 3. Tool Node → Generate
 workflow.add_edge("tool_node", "generate")
 
-# 4. Generate → Conditional (reroute or end)
+# 4. Generate → Conditional (reroute or finish the turn)
 workflow.add_conditional_edges(
     "generate",
     should_reroute,
     {
         "orchestrator": "orchestrator",
-        END: END
+        END: "memory"
     }
 )
 
-# Compile the graph
+# 5. Memory → End
+workflow.add_edge("memory", END)
+
+# Compile the graph (stateless: history comes from the request)
 graph = workflow.compile()
 
+_session_graph = None
+_session_graph_lock = threading.Lock()
+
+
+def get_session_graph():
+    """
+    The graph compiled with the conversation checkpointer. Run it with
+    config {"configurable": {"thread_id": session_id}} so chat_history and
+    summary persist across turns.
+
+    Raises:
+        RuntimeError: If the MongoDB checkpointer could not be opened at startup.
+    """
+    global _session_graph
+    if _session_graph is None:
+        with _session_graph_lock:
+            if _session_graph is None:
+                _session_graph = workflow.compile(checkpointer=get_checkpointer())
+    return _session_graph
+
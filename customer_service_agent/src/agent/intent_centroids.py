@@ -0,0 +1,112 @@
+"""
+Embedding-centroid route classifier.
+Compares a question embedding with per-route centroid vectors stored next
+to the FAISS index ({index}.centroids.npz), giving the orchestrator a
+second opinion when keyword routing finds nothing or ties, without an LLM call.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def compute_centroids(vectors: Sequence[Sequence[float]], labels: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Mean of the normalized example vectors per label, normalized again.
+
+    Returns:
+        (labels, centroids) with one row per distinct label, sorted by label.
+    """
+    array = _normalize_rows(np.asarray(vectors, dtype="float32"))
+    names = sorted(set(labels))
+    label_array = np.asarray(labels)
+    centroids = np.stack([array[label_array == name].mean(axis=0) for name in names])
+    return names, _normalize_rows(centroids).astype("float32")
+
+
+def save_centroids(path: str, labels: List[str], centroids: np.ndarray, counts: Dict[str, int]):
+    """Writes centroids atomically so a serving process never reads a partial file."""
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        labels=np.asarray(labels),
+        centroids=centroids,
+        counts=np.asarray([counts.get(label, 0) for label in labels])
+    )
+    os.replace(tmp_path, path)
+
+
+class IntentCentroids:
+    """
+    Route centroids loaded from an .npz file, reloaded when the file changes.
+    """
+    _instances: Dict[str, "IntentCentroids"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.labels: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, path: str) -> "IntentCentroids":
+        """
+        Returns the shared classifier for a centroid file.
+        """
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def _refresh(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self.labels, self.centroids, self._mtime = [], None, None
+            return False
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with np.load(self.path) as data:
+                            self.labels = [str(label) for label in data["labels"]]
+                            self.centroids = data["centroids"].astype("float32")
+                        self._mtime = mtime
+                        logger.info(f"Loaded {len(self.labels)} route centroids from {self.path}")
+                    except Exception as e:
+                        logger.error(f"Failed to load route centroids from {self.path}: {e}")
+                        return False
+        return self.centroids is not None
+
+    @property
+    def available(self) -> bool:
+        return self._refresh()
+
+    def classify(self, vector: Sequence[float]) -> Optional[Tuple[str, float, float]]:
+        """
+        Nearest centroid for a question embedding.
+
+        Returns:
+            (label, cosine similarity, margin over the runner-up), or None
+            if no centroids are available.
+        """
+        if not self._refresh():
+            return None
+        query = _normalize_rows(np.asarray(vector, dtype="float32"))
+        scores = self.centroids @ query
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        return self.labels[order[0]], best, best - runner_up
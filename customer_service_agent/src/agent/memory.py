@@ -0,0 +1,224 @@
+"""
+Server-side conversation memory.
+Sessions are LangGraph threads persisted by a checkpointer (MongoDB, or in
+memory for tests). History is kept within a token budget: when it grows
+past MEMORY_HISTORY_TOKENS, older turns are folded into a running summary
+after the response is sent, so the prompt stays a constant size on long
+conversations without delaying answers.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
+from src.agent.state import AgentState
+from src.config import settings
+from src.utils.governor import Priority, upstream_priority
+from src.utils.tokens import count_tokens
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You maintain a concise running summary of a customer service conversation. Merge the earlier summary with the new messages. Keep names, order numbers, dates, amounts and open questions; drop pleasantries. Return ONLY the updated summary."),
+    ("user", "Earlier summary:\n{summary}\n\nNew messages:\n{messages}")
+])
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+# Sessions with a compaction in progress (per process)
+_compacting: Set[str] = set()
+
+
+async def open_checkpointer():
+    """
+    Creates the process-wide checkpointer for MEMORY_BACKEND at startup.
+    The MongoDB saver is built on the sync client (its async methods run
+    in a thread pool), so connecting and pinging happen off the event loop.
+
+    Raises:
+        Exception: If MongoDB cannot be reached; sessions are then unavailable.
+    """
+    global _checkpointer
+    checkpointer = await asyncio.to_thread(_create_checkpointer, settings.MEMORY_BACKEND)
+    with _checkpointer_lock:
+        _checkpointer = checkpointer
+    return checkpointer
+
+
+def get_checkpointer():
+    """
+    Returns the process-wide checkpointer.
+    The in-memory backend is created on first use; the MongoDB one must
+    have been opened by open_checkpointer, so a worker that could not
+    connect fails session requests instead of keeping history per process.
+
+    Raises:
+        RuntimeError: If the MongoDB checkpointer is not open.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                if settings.MEMORY_BACKEND == "mongodb":
+                    raise RuntimeError("Session memory is unavailable: the MongoDB checkpointer is not open.")
+                _checkpointer = _create_checkpointer(settings.MEMORY_BACKEND)
+    return _checkpointer
+
+
+def _create_checkpointer(backend: str):
+    if backend == "mongodb":
+        from langgraph.checkpoint.mongodb import MongoDBSaver
+        from src.database.mongo_client import MongoDBClient
+
+        # get_client pings, so an unreachable server fails here
+        return MongoDBSaver(
+            MongoDBClient.get_client(),
+            db_name=settings.MONGO_DB_NAME,
+            checkpoint_collection_name=settings.MEMORY_CHECKPOINT_COLLECTION,
+            writes_collection_name=f"{settings.MEMORY_CHECKPOINT_COLLECTION}_writes"
+        )
+
+    from langgraph.checkpoint.memory import InMemorySaver
+    return InMemorySaver()
+
+
+def turn_input(question: str) -> Dict[str, Any]:
+    """
+    Graph input for a new turn in a session.
+    Resets every per-turn field so nothing from the previous turn's
+    retrieval or routing leaks in; chat_history and summary persist.
+    """
+    return {
+        "question": question,
+        "documents": [],
+        "mongo_data": [],
+        "final_answer": None,
+        "feedback_score": None,
+        "route": None,
+        "intent": None,
+        "needed_sources": [],
+        "retry_count": 0,
+        "needs_web_search": False,
+        "context_sufficient": False
+    }
+
+
+def message_tokens(message: BaseMessage) -> int:
+    # A few tokens of per-message framing on top of the content
+    return count_tokens(str(message.content)) + 4
+
+
+def split_history(messages: List[BaseMessage], budget: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Splits messages into (older, recent) where recent is the longest
+    suffix that fits the token budget.
+    """
+    used = 0
+    start = len(messages)
+    for message in reversed(messages):
+        used += message_tokens(message)
+        if used > budget:
+            break
+        start -= 1
+    return messages[:start], messages[start:]
+
+
+def render_messages(messages: List[BaseMessage]) -> List[str]:
+    return [
+        f"{'Client' if message.type == 'human' else 'Assistant'}: {message.content}"
+        for message in messages
+    ]
+
+
+def format_history(summary: Optional[str], messages: List[BaseMessage], budget: int) -> str:
+    """
+    Conversation context for the generation prompt: the running summary
+    plus the most recent messages that fit the token budget.
+    """
+    _, recent = split_history(messages, budget)
+    parts = [f"Summary of earlier conversation: {summary}"] if summary else []
+    parts.extend(render_messages(recent))
+    return "\n".join(parts) if parts else "None"
+
+
+async def update_memory(state: AgentState, config: RunnableConfig) -> Dict:
+    """
+    Records the finished turn in chat_history. Does nothing for stateless
+    runs, whose state is discarded. Summarizing older turns happens after
+    the response has been sent (compact_history).
+
+    Args:
+        state: Current agent state
+        config: Run config; sessions carry a thread_id
+
+    Returns:
+        Dictionary with chat_history updates
+    """
+    if not config.get("configurable", {}).get("thread_id"):
+        return {}
+
+    final_answer = state.get("final_answer")
+    if not final_answer:
+        return {"chat_history": []}
+    return {"chat_history": [HumanMessage(content=state.get("question", "")), AIMessage(content=final_answer)]}
+
+
+async def compact_history(graph, config: RunnableConfig) -> bool:
+    """
+    Folds a session's older turns into its running summary once history
+    exceeds MEMORY_HISTORY_TOKENS, keeping MEMORY_RECENT_TOKENS of recent
+    messages (and always the latest exchange) verbatim. Runs as a
+    background task after the stream completes, so the summarization call
+    never holds the response or its admission slot.
+
+    Args:
+        graph: The session graph (compiled with the checkpointer)
+        config: Run config with the session's thread_id
+
+    Returns:
+        bool: True if history was compacted.
+    """
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if not thread_id or thread_id in _compacting:
+        return False
+
+    _compacting.add(thread_id)
+    try:
+        snapshot = await graph.aget_state(config)
+        history = list(snapshot.values.get("chat_history") or [])
+        total = sum(message_tokens(m) for m in history)
+        if total <= settings.MEMORY_HISTORY_TOKENS:
+            return False
+
+        older, _ = split_history(history, settings.MEMORY_RECENT_TOKENS)
+        older = older[:max(0, len(history) - 2)]
+        if not older:
+            return False
+
+        from src.utils.clients import get_chat_model
+
+        summarizer = summary_prompt | get_chat_model(temperature=0) | StrOutputParser()
+        with upstream_priority(Priority.BACKGROUND):
+            summary = await summarizer.ainvoke({
+                "summary": snapshot.values.get("summary") or "None",
+                "messages": "\n".join(render_messages(older))
+            })
+
+        # Turns added meanwhile are kept: only the summarized messages are removed
+        await graph.aupdate_state(
+            config,
+            {"chat_history": [RemoveMessage(id=m.id) for m in older if m.id], "summary": summary.strip()},
+            as_node="memory"
+        )
+        logger.info(f"Folded {len(older)} messages ({total} history tokens) into the conversation summary")
+        return True
+
+    except Exception as e:
+        # History stays complete; generate still windows it to the budget
+        logger.error(f"Failed to compact conversation history: {e}")
+        return False
+    finally:
+        _compacting.discard(thread_id)
@@ -4,25 +4,24 @@ Uses formal tax advisory tone with LLM-based response generation.
 Includes context sufficiency detection and rerouting capability.
 """
 import logging
-from typing import Dict, List
-from langchain_openai import ChatOpenAI
+from contextlib import aclosing
+from typing import Dict, List, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from src.agent.context import prepare_context
+from src.agent.memory import format_history
 from src.agent.state import AgentState
+from src.agent.sufficiency import score_gate
 from src.config import settings
+from src.utils.clients import get_chat_model
+from src.utils.governor import Priority, prioritized
+from src.utils.metrics import LLMStreamTimer, record_retry, step_timer
 from langgraph.config import get_stream_writer
-import asyncio
 
 logger = logging.getLogger(__name__)
 
 # Initialize LLM
-llm = ChatOpenAI(
-    model="openai/gpt-oss-20b",
-    temperature=0.3,
-    api_key=settings.OPENAI_API_KEY_AI_GRID,
-    base_url=settings.OPENAI_API_BASE_URL,
-    streaming=True
-)
+llm = get_chat_model(temperature=0.3, streaming=True)
 
 # System prompt for the Tax Advisory persona
 SYSTEM_PROMPT = """
@@ -47,12 +46,13 @@ Your tone is formal, precise, and respectful. You communicate as a senior tax co
 
 ### DELIMITER PROTOCOL
 Treat the content between '### CONTEXT START ###' and '### CONTEXT END ###' as your search results. 
+Treat the content under '### CONVERSATION SO FAR ###' as earlier turns with this client, for reference only.
 Treat the content after '### USER QUESTION ###' as the user's inquiry.
 """
 
 prompt = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT),
-    ("user", "### CONTEXT START ###\n{context}\n### CONTEXT END ###\n\n### USER QUESTION ###\n{question}")
+    ("user", "### CONVERSATION SO FAR ###\n{history}\n\n### CONTEXT START ###\n{context}\n### CONTEXT END ###\n\n### USER QUESTION ###\n{question}")
 ])
 
 chain = (prompt | llm | StrOutputParser()).with_config({"tags": ["final_answer"]})
@@ -65,11 +65,49 @@ sufficiency_prompt = ChatPromptTemplate.from_messages([
 
 sufficiency_chain = sufficiency_prompt | llm | StrOutputParser()
 
+# Inline mode: the generation call itself opens with a sufficiency verdict
+SUFFICIENT_MARKER = "[[SUFFICIENT]]"
+INSUFFICIENT_MARKER = "[[INSUFFICIENT]]"
 
+INLINE_VERDICT_INSTRUCTIONS = f"""
+### RESPONSE FORMAT (MANDATORY)
+Begin your response with exactly one verdict marker on its own:
+- {SUFFICIENT_MARKER} if the context contains enough information to answer the question, followed by your answer.
+- {INSUFFICIENT_MARKER} if it does not. In that case output nothing else.
+The marker is removed before your response is shown.
+"""
+
+inline_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT + INLINE_VERDICT_INSTRUCTIONS),
+    ("user", "### CONVERSATION SO FAR ###\n{history}\n\n### CONTEXT START ###\n{context}\n### CONTEXT END ###\n\n### USER QUESTION ###\n{question}")
+])
+
+inline_chain = (inline_prompt | llm | StrOutputParser()).with_config({"tags": ["final_answer"]})
+
+ASK_USER_RESPONSE = """Dear Valued Client,
+
+Thank you for your inquiry. Unfortunately, I was unable to find sufficient information in our knowledge base or through web search to fully address your question.
+
+Could you please provide more specific details about your query? For example:
+- If this is about a specific order, please provide the order number
+- If this is about a policy or regulation, please specify the topic area
+- Any additional context that might help me assist you better
+
+Alternatively, I can connect you with one of our human specialists who may be able to assist you directly.
+
+Respectfully yours,
+Customer Service Division"""
+
+ERROR_RESPONSE = "Dear Valued Client,\n\nWe regret to inform you that we are currently experiencing a technical issue processing your request. Please try again later.\n\nRespectfully yours,\nCustomer Service Division"
+
+
+@prioritized(Priority.INTERACTIVE)
 async def generate(state: AgentState) -> Dict:
     """
     Generates final answer using LLM with formal tax advisory tone.
-    Includes context sufficiency detection and rerouting logic.
+    Includes context sufficiency detection and rerouting logic: either a
+    separate check before generation or, in inline mode, a verdict marker
+    at the start of the generated response (GENERATION_SUFFICIENCY_MODE).
     
     Args:
         state: Current agent state
@@ -82,72 +120,44 @@ async def generate(state: AgentState) -> Dict:
     documents = state.get("documents", [])
     retry_count = state.get("retry_count", 0)
     
-    # Prepare context string
-    context_str = _prepare_context(mongo_data, documents)
+    # Pack the most relevant context into the prompt budget
+    context_str = prepare_context(mongo_data, documents)
+    history = format_history(
+        state.get("summary"), state.get("chat_history") or [], settings.MEMORY_HISTORY_TOKENS
+    )
+    
+    if settings.GENERATION_SUFFICIENCY_MODE == "inline":
+        return await _generate_inline(question, context_str, mongo_data, documents, retry_count, history)
     
     # --- Context Sufficiency Check ---
     is_context_sufficient = await _check_context_sufficiency(
-        question, context_str, mongo_data, documents, retry_count
+        question, mongo_data, documents, retry_count
     )
     
     if not is_context_sufficient:
-        if retry_count == 0:
-            # First time insufficient - trigger web search
-            logger.info("Context insufficient, triggering web search fallback")
-            try:
-                writer = get_stream_writer()
-                writer({"type": "status", "content": "Searching for more information..."})
-            except Exception:
-                pass
-            
-            return {
-                "needs_web_search": True,
-                "retry_count": 1,
-                "context_sufficient": False
-            }
-        else:
-            # Already retried - ask user for more details
-            logger.info("Context still insufficient after retry, asking user for details")
-            ask_user_response = """Dear Valued Client,
-
-Thank you for your inquiry. Unfortunately, I was unable to find sufficient information in our knowledge base or through web search to fully address your question.
-
-Could you please provide more specific details about your query? For example:
-- If this is about a specific order, please provide the order number
-- If this is about a policy or regulation, please specify the topic area
-- Any additional context that might help me assist you better
+        return _insufficient_context(retry_count)
+    
+    return await _generate_answer(question, context_str, history)
 
-Alternatively, I can connect you with one of our human specialists who may be able to assist you directly.
 
-Respectfully yours,
-Customer Service Division"""
-            
-            try:
-                writer = get_stream_writer()
-                # Stream the ask-user response token by token
-                for char in ask_user_response:
-                    writer({"type": "token", "content": char})
-                    await asyncio.sleep(0.02)
-            except Exception:
-                pass
-            
-            return {
-                "final_answer": ask_user_response,
-                "context_sufficient": False
-            }
-    
-    # --- Generate Response ---
+async def _generate_answer(question: str, context_str: str, history: str = "None") -> Dict:
+    """
+    Streams the answer for context already judged sufficient.
+    """
     try:
         writer = get_stream_writer()
         
+        timer = LLMStreamTimer("generate")
         full_response = ""
         async for chunk in chain.astream({
+            "history": history,
             "context": context_str,
             "question": question
         }):
+            timer.chunk()
             full_response += chunk
             writer({"type": "token", "content": chunk})
-            await asyncio.sleep(0.06)
+        timer.finish()
         
         return {
             "final_answer": full_response,
@@ -157,39 +167,196 @@ Customer Service Division"""
     except Exception as e:
         logger.error(f"Error generating response: {e}")
         return {
-            "final_answer": "Dear Valued Client,\n\nWe regret to inform you that we are currently experiencing a technical issue processing your request. Please try again later.\n\nRespectfully yours,\nCustomer Service Division"
+            "final_answer": ERROR_RESPONSE
         }
 
 
-async def _check_context_sufficiency(
-    question: str, 
-    context_str: str, 
-    mongo_data: List[dict], 
+async def _generate_inline(
+    question: str,
+    context_str: str,
+    mongo_data: List[dict],
     documents: List,
-    retry_count: int
-) -> bool:
+    retry_count: int,
+    history: str = "None"
+) -> Dict:
     """
-    Checks if the retrieved context is sufficient to answer the question.
-    Uses heuristic check first, then LLM confirmation.
+    Generates the answer and judges sufficiency in a single LLM call.
+    The response opens with a verdict marker, which is stripped before
+    streaming; an insufficient verdict stops generation immediately.
     """
-    # Heuristic check: if no data at all, definitely insufficient
+    if not _has_usable_data(mongo_data, documents):
+        logger.info("Heuristic: No valid data found, context insufficient")
+        return _insufficient_context(retry_count)
+    
+    # Clear-cut retrieval scores need no verdict from the model
+    verdict = score_gate(mongo_data, documents)
+    if verdict is False:
+        return _insufficient_context(retry_count)
+    if verdict is True:
+        return await _generate_answer(question, context_str, history)
+    
+    try:
+        writer = get_stream_writer()
+        
+        parser = VerdictParser()
+        timer = LLMStreamTimer("generate_inline")
+        full_response = ""
+        stream = inline_chain.astream({
+            "history": history,
+            "context": context_str,
+            "question": question
+        })
+        # Closing the stream on exit cancels the rest of the generation after a break
+        async with aclosing(stream):
+            async for chunk in stream:
+                timer.chunk()
+                text = parser.feed(chunk)
+                if parser.verdict is False:
+                    logger.info("Inline verdict: context insufficient")
+                    break
+                if text:
+                    full_response += text
+                    writer({"type": "token", "content": text})
+            else:
+                text = parser.finish()
+                if text:
+                    full_response += text
+                    writer({"type": "token", "content": text})
+        timer.finish()
+        
+        if parser.verdict is False:
+            return _insufficient_context(retry_count)
+        
+        if parser.verdict is None:
+            logger.warning("Inline verdict marker missing; treating context as sufficient")
+        
+        return {
+            "final_answer": full_response,
+            "context_sufficient": True
+        }
+        
+    except Exception as e:
+        logger.error(f"Error generating response: {e}")
+        return {
+            "final_answer": ERROR_RESPONSE
+        }
+
+
+class VerdictParser:
+    """
+    Strips the leading verdict marker from a streamed response.
+    
+    Text is held back until the marker has been read, then passed through.
+    verdict is True/False once a marker is seen, or None if the response
+    did not start with one (all text is then passed through unchanged).
+    """
+    
+    def __init__(self):
+        self.verdict: Optional[bool] = None
+        self._buffer = ""
+        self._decided = False
+    
+    def feed(self, chunk: str) -> str:
+        if self._decided:
+            return chunk
+        
+        self._buffer += chunk
+        head = self._buffer.lstrip()
+        for marker, verdict in ((SUFFICIENT_MARKER, True), (INSUFFICIENT_MARKER, False)):
+            if head.startswith(marker):
+                self.verdict = verdict
+                self._decided = True
+                return head[len(marker):].lstrip()
+        
+        # Still a possible prefix of a marker: keep buffering
+        if any(marker.startswith(head) for marker in (SUFFICIENT_MARKER, INSUFFICIENT_MARKER)):
+            return ""
+        
+        return self.finish()
+    
+    def finish(self) -> str:
+        """Releases any held-back text when the stream ends without a marker."""
+        if self._decided:
+            return ""
+        self._decided = True
+        return self._buffer
+
+
+def _has_usable_data(mongo_data: List[dict], documents: List) -> bool:
     has_mongo_data = bool(mongo_data) and not any("error" in d for d in mongo_data)
     has_documents = bool(documents) and not any(
         "No relevant documents found" in doc.page_content or 
         "Error:" in doc.page_content 
         for doc in documents
     )
+    return has_mongo_data or has_documents
+
+
+def _insufficient_context(retry_count: int) -> Dict:
+    """
+    Reroutes to web search on the first insufficient attempt, otherwise
+    asks the user for more details.
+    """
+    if retry_count == 0:
+        # First time insufficient - trigger web search
+        logger.info("Context insufficient, triggering web search fallback")
+        record_retry("web_search_reroute")
+        try:
+            writer = get_stream_writer()
+            writer({"type": "status", "content": "Searching for more information..."})
+        except Exception:
+            pass
+        
+        return {
+            "needs_web_search": True,
+            "retry_count": 1,
+            "context_sufficient": False
+        }
     
-    if not has_mongo_data and not has_documents:
+    # Already retried - ask user for more details
+    logger.info("Context still insufficient after retry, asking user for details")
+    try:
+        writer = get_stream_writer()
+        # Sent in one event; the client renders the typing effect
+        writer({"type": "token", "content": ASK_USER_RESPONSE})
+    except Exception:
+        pass
+    
+    return {
+        "final_answer": ASK_USER_RESPONSE,
+        "context_sufficient": False
+    }
+
+
+async def _check_context_sufficiency(
+    question: str, 
+    mongo_data: List[dict], 
+    documents: List,
+    retry_count: int
+) -> bool:
+    """
+    Checks if the retrieved context is sufficient to answer the question.
+    Uses heuristic check first, then the retrieval score gate, then LLM
+    confirmation for the ambiguous band.
+    """
+    # Heuristic check: if no data at all, definitely insufficient
+    if not _has_usable_data(mongo_data, documents):
         logger.info("Heuristic: No valid data found, context insufficient")
         return False
     
+    # Decide locally when retrieval confidence is clearly high or low
+    verdict = score_gate(mongo_data, documents)
+    if verdict is not None:
+        return verdict
+    
     # If we have some data, use LLM to confirm sufficiency
     try:
-        result = await sufficiency_chain.ainvoke({
-            "question": question,
-            "context": context_str[:2000]  # Limit context length for efficiency
-        })
+        with step_timer("sufficiency_check"):
+            result = await sufficiency_chain.ainvoke({
+                "question": question,
+                # A smaller packing of the same ranked evidence keeps the check cheap
+                "context": prepare_context(mongo_data, documents, settings.SUFFICIENCY_CONTEXT_TOKENS)
+            })
         
         is_sufficient = "YES" in result.upper()
         logger.info(f"LLM sufficiency check: {result} -> {is_sufficient}")
@@ -199,32 +366,3 @@ async def _check_context_sufficiency(
         logger.error(f"Sufficiency check failed: {e}")
         # If LLM check fails, assume we have enough if heuristic passed
         return True
-
-
-def _prepare_context(mongo_data: List[dict], documents: List) -> str:
-    """
-    Format retrieved data into a single context string for the LLM.
-    """
-    context_parts = []
-    
-    # Format Order Data
-    if mongo_data:
-        for data in mongo_data:
-            if "error" in data:
-                context_parts.append(f"ORDER SYSTEM ERROR: {data['error']}")
-            elif "result" in data:
-                context_parts.append(f"ORDER DATA:\n{data['result']}")
-    
-    # Format Policy Documents
-    if documents:
-        context_parts.append("POLICY DOCUMENTS:")
-        for i, doc in enumerate(documents, 1):
-            content = doc.page_content
-            source = doc.metadata.get("source", "Unknown Source")
-            context_parts.append(f"Document {i} (Source: {source}):\n{content}")
-            
-    if not context_parts:
-        return "NO DATA FOUND. The system could not retrieve any order details or policy documents."
-        
-    return "\n\n".join(context_parts)
-
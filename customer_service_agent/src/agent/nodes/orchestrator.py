@@ -1,13 +1,79 @@
 """
 Orchestrator node for routing customer service queries.
-Performs keyword-based routing and intent classification.
+Performs keyword-based routing and intent classification, with an optional
+embedding-centroid classifier for questions the keywords cannot place.
 """
-from typing import Dict, List
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import re
+import logging
 from src.agent.state import AgentState
+from src.agent.intent_centroids import IntentCentroids
+from src.config import settings
 
 
 from langgraph.config import get_stream_writer
 
+logger = logging.getLogger(__name__)
+
+# Keyword sets for routing
+ORDER_KEYWORDS = frozenset({
+    "order", "status", "shipping", "delivery", "track", "package",
+    "shipment", "tracking", "delivered", "ship", "shipped", "arrive", "when"
+})
+
+LEGAL_KEYWORDS = frozenset({
+    "legal", "terms", "privacy", "policy", "policies", "agreement",
+    "terms of service", "tos", "gdpr", "data", "rights", "refund policy",
+    "tax", "act", "taxation", "education", "levy"
+})
+
+# Web search keywords (for keyword-triggered web search)
+WEB_SEARCH_KEYWORDS = frozenset({
+    "search", "lookup", "google", "latest", "news", "current",
+    "find online", "recent", "today", "2024", "2025", "2026"
+})
+
+
+def _compile_matcher(phrases) -> "re.Pattern":
+    """
+    One word-boundary regex for a set of phrases, longest first, allowing
+    plural and verb suffixes ("orders", "taxes", "ordered", "arrived",
+    "tracking") but not matches inside other words ("act" in "contact",
+    "ship" in "relationship"). Forms that double the last letter
+    ("shipped") must be listed.
+    """
+    alternation = "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"\b({alternation})(?:s|es|d|ed|ing)?\b")
+
+
+_KEYWORD_MATCHER = _compile_matcher(ORDER_KEYWORDS | LEGAL_KEYWORDS | WEB_SEARCH_KEYWORDS)
+
+# A matched phrase also counts the keywords inside it ("terms of service" -> "terms")
+_CONTAINED_KEYWORDS: Dict[str, FrozenSet[str]] = {
+    phrase: frozenset(
+        keyword for keyword in ORDER_KEYWORDS | LEGAL_KEYWORDS | WEB_SEARCH_KEYWORDS
+        if re.search(rf"\b{re.escape(keyword)}\b", phrase)
+    )
+    for phrase in ORDER_KEYWORDS | LEGAL_KEYWORDS | WEB_SEARCH_KEYWORDS
+}
+
+# "canceled"/"canceling" match "cancel" plus a suffix; the doubled-l forms are listed
+CANCEL_WORDS = frozenset({"cancel", "cancelled", "cancelling", "cancellation"})
+
+# Words used to pick an intent within a route
+_INTENT_MATCHER = _compile_matcher(CANCEL_WORDS | {
+    "status", "track", "where", "delivery", "arrive", "when",
+    "privacy", "data", "gdpr", "terms", "tos", "agreement", "refund"
+})
+
+# Sources queried for each route
+ROUTE_SOURCES = {
+    "order_inquiry": ["mongo_db"],  # Orders are in MongoDB
+    "legal_inquiry": ["vector_db"],  # Legal docs are in vector DB
+    "web_search": ["web"],
+    "general_inquiry": ["vector_db"],  # Default to vector DB for general questions
+}
+
 async def orchestrator(state: AgentState) -> Dict:
     """
     Routes queries based on keyword matching and updates state with:
@@ -23,7 +89,7 @@ async def orchestrator(state: AgentState) -> Dict:
     Returns:
         Dictionary with route, intent, and needed_sources updates
     """
-    question = state.get("question", "").lower()
+    question = state.get("question", "")
     needs_web_search = state.get("needs_web_search", False)
     
     # Stream "thinking" status for frontend spinner
@@ -52,85 +118,157 @@ async def orchestrator(state: AgentState) -> Dict:
             
         return result
     
-    # Keyword sets for routing
-    order_keywords = {
-        "order", "status", "shipping", "delivery", "track", "package",
-        "shipment", "tracking", "delivered", "ship", "arrive", "when"
-    }
+    result = await classify_question(question)
     
-    legal_keywords = {
-        "legal", "terms", "privacy", "policy", "policies", "agreement",
-        "terms of service", "tos", "gdpr", "data", "rights", "refund policy",
-        "tax", "act", "taxation", "education", "levy"
-    }
+    # Stream metadata in custom mode
+    try:
+        writer = get_stream_writer()
+        writer({"type": "metadata", "content": result})
+    except Exception:
+        pass # Fallback for non-streaming calls
+        
+    return result
+
+
+def match_keywords(question: str) -> FrozenSet[str]:
+    """Distinct routing keywords present in the question, matched on word boundaries."""
+    found = set()
+    for phrase in _KEYWORD_MATCHER.findall(question.lower()):
+        found |= _CONTAINED_KEYWORDS[phrase]
+    return frozenset(found)
+
+
+def _classify_intent(route: str, question: str) -> str:
+    """Intent within a route from its trigger words."""
+    words = set(_INTENT_MATCHER.findall(question))
+    
+    if route == "web_search":
+        return "web_query"
+    
+    if route == "order_inquiry":
+        # Classify order-related intents
+        if words & {"status", "track", "where"}:
+            return "check_order_status"
+        elif words & {"delivery", "arrive", "when"}:
+            return "check_delivery_time"
+        elif words & CANCEL_WORDS:
+            return "cancel_order"
+        return "general_order_inquiry"
+    
+    if route == "legal_inquiry":
+        # Classify legal-related intents
+        if words & {"privacy", "data", "gdpr"}:
+            return "privacy_policy_query"
+        elif words & {"terms", "tos", "agreement"}:
+            return "terms_of_service_query"
+        elif "refund" in words:
+            return "refund_policy_query"
+        return "general_legal_query"
     
-    # Web search keywords (for keyword-triggered web search)
-    web_search_keywords = {
-        "search", "lookup", "google", "latest", "news", "current",
-        "find online", "recent", "today", "2024", "2025", "2026"
+    return "general_question"
+
+
+def _build_route(route: str, question: str) -> Dict:
+    return {
+        "route": route,
+        "intent": _classify_intent(route, question),
+        "needed_sources": list(ROUTE_SOURCES[route])
     }
+
+
+def _route_by_keywords(question: str) -> Tuple[Dict, bool]:
+    """
+    Keyword routing.
     
-    # Determine route based on keyword presence
-    route = "general_inquiry"  # default
-    intent = "unknown"
-    needed_sources = []
+    Returns:
+        (route result, ambiguous) where ambiguous means no keyword matched
+        or order and legal keywords tied.
+    """
+    question = question.lower()
+    matched = match_keywords(question)
     
     # Count keyword matches
-    order_matches = sum(1 for keyword in order_keywords if keyword in question)
-    legal_matches = sum(1 for keyword in legal_keywords if keyword in question)
-    web_matches = sum(1 for keyword in web_search_keywords if keyword in question)
+    order_matches = len(matched & ORDER_KEYWORDS)
+    legal_matches = len(matched & LEGAL_KEYWORDS)
+    web_matches = len(matched & WEB_SEARCH_KEYWORDS)
     
     # Route to the category with more matches
     # Web search has higher priority if explicitly requested
     if web_matches > 0 and web_matches >= max(order_matches, legal_matches):
         route = "web_search"
-        needed_sources = ["web"]
-        intent = "web_query"
-        
     elif order_matches > legal_matches and order_matches > 0:
         route = "order_inquiry"
-        needed_sources = ["mongo_db"]  # Orders are in MongoDB
-        
-        # Classify order-related intents
-        if any(word in question for word in ["status", "track", "where"]):
-            intent = "check_order_status"
-        elif any(word in question for word in ["delivery", "arrive", "when"]):
-            intent = "check_delivery_time"
-        elif "cancel" in question:
-            intent = "cancel_order"
-        else:
-            intent = "general_order_inquiry"
-            
     elif legal_matches > 0:
         route = "legal_inquiry"
-        needed_sources = ["vector_db"]  # Legal docs are in vector DB
-        
-        # Classify legal-related intents
-        if any(word in question for word in ["privacy", "data", "gdpr"]):
-            intent = "privacy_policy_query"
-        elif any(word in question for word in ["terms", "tos", "agreement"]):
-            intent = "terms_of_service_query"
-        elif "refund" in question:
-            intent = "refund_policy_query"
-        else:
-            intent = "general_legal_query"
     else:
         # General inquiry - might need both sources
         route = "general_inquiry"
-        intent = "general_question"
-        needed_sources = ["vector_db"]  # Default to vector DB for general questions
     
-    result = {
-        "route": route,
-        "intent": intent,
-        "needed_sources": needed_sources
-    }
+    ambiguous = not matched or (route == "legal_inquiry" and order_matches == legal_matches)
+    return _build_route(route, question), ambiguous
+
+
+def route_question(question: str) -> Dict:
+    """
+    Keyword-based routing and intent classification for a question.
+    Pure and cheap, so it can also be used ahead of the graph.
+    
+    Args:
+        question: The user's question
+        
+    Returns:
+        Dictionary with route, intent, and needed_sources
+    """
+    return _route_by_keywords(question)[0]
+
+
+def _centroids() -> Optional[IntentCentroids]:
+    if not settings.ROUTER_CENTROIDS_ENABLED:
+        return None
+    from src.database.vector_db import VectorDB
+    return IntentCentroids.get_instance(VectorDB.get_instance().centroids_path)
+
+
+async def classify_question(question: str) -> Dict:
+    """
+    Routes a question by keywords, falling back to the embedding-centroid
+    classifier when keywords find nothing or tie.
+    
+    The question embedding goes through the cached embedding client, so
+    it is shared with the answer cache and retrieval for the same question.
+    
+    Args:
+        question: The user's question
+        
+    Returns:
+        Dictionary with route, intent, and needed_sources
+    """
+    result, ambiguous = _route_by_keywords(question)
+    if not ambiguous:
+        return result
     
-    # Stream metadata in custom mode
     try:
-        writer = get_stream_writer()
-        writer({"type": "metadata", "content": result})
-    except Exception:
-        pass # Fallback for non-streaming calls
+        centroids = _centroids()
+        if centroids is None or not centroids.available:
+            return result
         
+        from src.database.vector_db import VectorDB
+        vector = await VectorDB.get_instance().embedding_function.aembed_query(question)
+        match = centroids.classify(vector)
+    except Exception as e:
+        logger.warning(f"Centroid routing unavailable: {e}")
+        return result
+    
+    if match is None:
+        return result
+    
+    route, score, margin = match
+    if (
+        route in ROUTE_SOURCES
+        and score >= settings.ROUTER_CENTROID_MIN_SCORE
+        and margin >= settings.ROUTER_CENTROID_MARGIN
+    ):
+        logger.info(f"Centroid routing: {route} (similarity {score:.3f}, margin {margin:.3f})")
+        return _build_route(route, question.lower())
+    
     return result
@@ -2,28 +2,32 @@
 Tool node for executing tools based on state flags.
 Handles conditional tool execution, parameter extraction, and error handling.
 """
+import asyncio
 import logging
 import re
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from langchain_core.documents import Document
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from src.agent.state import AgentState
-from src.agent.tools import query_order_tool, search_legal_docs_tool
+from src.agent.tools import (
+    aquery_order_tool,
+    aweb_search_tool,
+    search_legal_docs,
+    merge_search_results,
+    format_search_results
+)
 from src.config import settings
+from src.utils.clients import get_chat_model
+from src.utils.governor import Priority, prioritized
+from src.utils.metrics import timed_step
 from langgraph.config import get_stream_writer
 
 logger = logging.getLogger(__name__)
 
 # Initialize LLM for query refinement
-llm = ChatOpenAI(
-    model="openai/gpt-oss-20b",
-    temperature=0,
-    api_key=settings.OPENAI_API_KEY_AI_GRID,
-    base_url=settings.OPENAI_API_BASE_URL
-)
+llm = get_chat_model(temperature=0)
 
 refine_prompt = ChatPromptTemplate.from_messages([
     ("system", "You are an expert search query optimizer. Your goal is to extract the core search keywords and phrases from a user's question to retrieve relevant legal/tax documents. Remove generic context (e.g., 'I am a CEO', 'my company', '5 billion revenue'). Return ONLY the search terms."),
@@ -32,6 +36,8 @@ refine_prompt = ChatPromptTemplate.from_messages([
 
 query_refiner = refine_prompt | llm | StrOutputParser()
 
+@timed_step("refine_query")
+@prioritized(Priority.BACKGROUND)
 async def refine_query(question: str) -> str:
     """Extracts core search keywords from the user question."""
     try:
@@ -43,6 +49,40 @@ async def refine_query(question: str) -> str:
         return question
 
 
+async def search_knowledge_base(question: str, limit: int = 10) -> Tuple[List[Document], str]:
+    """
+    Retrieves knowledge-base chunks for a question.
+    
+    In speculative mode, retrieval on the raw question starts immediately,
+    in parallel with query refinement, taking the refinement LLM call off
+    the critical path. The refined query is searched as well and both hit
+    sets are merged. Refinement is cancelled if it exceeds its latency budget.
+    
+    Returns:
+        Tuple of (hits, query used for display)
+    """
+    if not settings.SPECULATIVE_RETRIEVAL:
+        refined_query = await refine_query(question)
+        return await asyncio.to_thread(search_legal_docs, refined_query, limit), refined_query
+    
+    raw_search = asyncio.create_task(asyncio.to_thread(search_legal_docs, question, limit))
+    refinement = asyncio.create_task(refine_query(question))
+    
+    budget = settings.REFINE_LATENCY_BUDGET
+    try:
+        refined_query = await asyncio.wait_for(refinement, timeout=budget if budget > 0 else None)
+    except asyncio.TimeoutError:
+        logger.info(f"Query refinement exceeded {budget}s budget; using raw-question results")
+        refined_query = None
+    
+    raw_hits = await raw_search
+    if not refined_query or " ".join(refined_query.split()).lower() == " ".join(question.split()).lower():
+        return raw_hits, question
+    
+    refined_hits = await asyncio.to_thread(search_legal_docs, refined_query, limit)
+    return merge_search_results(refined_hits, raw_hits, limit=limit), refined_query
+
+
 def extract_order_id(question: str) -> str:
     """
     Extract order ID from a question using regex patterns.
@@ -71,13 +111,165 @@ def extract_order_id(question: str) -> str:
     return ""
 
 
+def _emit_status(content: str):
+    # Stream a status event; outside a graph run there is no writer
+    try:
+        writer = get_stream_writer()
+        writer({"type": "status", "content": content})
+    except Exception:
+        pass
+
+
+def _error_document(message: str, question: str) -> Document:
+    return Document(
+        page_content=message,
+        metadata={
+            "source": "error",
+            "query": question
+        }
+    )
+
+
+async def _query_order(question: str) -> Dict:
+    """Looks up the order referenced in the question."""
+    try:
+        logger.info("Executing aquery_order_tool")
+        
+        # Extract order ID from question
+        order_id = extract_order_id(question)
+        
+        if not order_id:
+            logger.warning("Could not extract order ID from question")
+            return {"mongo_data": [{
+                "error": "Could not extract order ID from your question. Please provide a valid order number."
+            }]}
+        
+        result = await aquery_order_tool(order_id)
+        
+        logger.info(f"Successfully queried order {order_id}")
+        return {"mongo_data": [{
+            "order_id": order_id,
+            "result": result,
+            "success": "Error:" not in result
+        }]}
+        
+    except Exception as e:
+        logger.error(f"Error executing aquery_order_tool: {e}")
+        return {"mongo_data": [{
+            "error": f"Failed to query order: {str(e)}"
+        }]}
+
+
+async def _search_vector_db(question: str) -> Dict:
+    """Searches the knowledge base."""
+    try:
+        logger.info("Executing search_legal_docs_tool")
+        
+        # Retrieve, refining the query in parallel when speculative
+        results, refined_query = await search_knowledge_base(question)
+        
+        # One document per hit, keeping retrieval scores for the sufficiency gate
+        if results:
+            docs = [
+                Document(
+                    id=hit.id,
+                    page_content=hit.page_content,
+                    metadata={**hit.metadata, "retrieval": "vector_db_search", "query": question}
+                )
+                for hit in results
+            ]
+        else:
+            docs = [Document(
+                page_content=format_search_results(results),
+                metadata={
+                    "source": "vector_db_search",
+                    "query": question
+                }
+            )]
+        
+        _emit_status(f"Searched knowledge base using: {refined_query}")
+        logger.info(f"Successfully searched knowledge base ({len(results)} hits)")
+        return {"documents": docs}
+        
+    except Exception as e:
+        logger.error(f"Error executing search_legal_docs_tool: {e}")
+        return {"documents": [_error_document(f"Error: Failed to search knowledge base. {str(e)}", question)]}
+
+
+async def _search_web(question: str) -> Dict:
+    """Searches the web with Tavily."""
+    try:
+        logger.info("Executing aweb_search_tool")
+        
+        result = await aweb_search_tool(question)
+        
+        # Wrap result in a Document
+        doc = Document(
+            page_content=result,
+            metadata={
+                "source": "web_search",
+                "query": question
+            }
+        )
+        
+        _emit_status("Web search completed")
+        
+        # Only log success if result doesn't contain error
+        if "Error:" not in result:
+            logger.info("Successfully completed web search")
+        else:
+            logger.warning(f"Web search returned error: {result[:100]}")
+        return {"documents": [doc]}
+        
+    except Exception as e:
+        logger.error(f"Error executing aweb_search_tool: {e}")
+        return {"documents": [_error_document(f"Error: Web search failed. {str(e)}", question)]}
+
+
+# Source runners in merge order: documents from the knowledge base come before web results
+SOURCE_RUNNERS = {
+    "mongo_db": _query_order,
+    "vector_db": _search_vector_db,
+    "web": _search_web
+}
+
+SOURCE_LABELS = {
+    "mongo_db": "Order lookup",
+    "vector_db": "Knowledge base search",
+    "web": "Web search"
+}
+
+
+def _timeout_result(source: str, question: str, timeout: float) -> Dict:
+    message = f"{SOURCE_LABELS[source]} timed out after {timeout:g}s."
+    _emit_status(message)
+    if source == "mongo_db":
+        return {"mongo_data": [{"error": f"Failed to query order: {message}"}]}
+    return {"documents": [_error_document(f"Error: {message}", question)]}
+
+
+async def _run_source(source: str, question: str) -> Tuple[str, Dict]:
+    """Runs one source under its timeout, turning a timeout into an error result."""
+    timeout = settings.SOURCE_TIMEOUTS.get(source, 0)
+    try:
+        result = await asyncio.wait_for(
+            SOURCE_RUNNERS[source](question), timeout=timeout if timeout > 0 else None
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"{SOURCE_LABELS[source]} timed out after {timeout}s")
+        result = _timeout_result(source, question, timeout)
+    return source, result
+
+
 async def tool_node(state: AgentState) -> Dict:
     """
     Executes tools based on needed_sources in state.
     
-    Conditionally calls:
-    - query_order_tool if 'mongo_db' in needed_sources
+    Selected sources run concurrently, each under its own timeout from
+    SOURCE_TIMEOUTS, so a slow or failing source does not delay the others:
+    - aquery_order_tool if 'mongo_db' in needed_sources
     - search_legal_docs_tool if 'vector_db' in needed_sources
+    - aweb_search_tool if 'web' in needed_sources
     
     Args:
         state: Current agent state
@@ -88,134 +280,24 @@ async def tool_node(state: AgentState) -> Dict:
     needed_sources = state.get("needed_sources", [])
     question = state.get("question", "")
     
-    updates = {}
-    
-    # Execute MongoDB tool for order queries
-    if "mongo_db" in needed_sources:
-        try:
-            logger.info("Executing query_order_tool")
-            
-            # Extract order ID from question
-            order_id = extract_order_id(question)
-            
-            if not order_id:
-                logger.warning("Could not extract order ID from question")
-                updates["mongo_data"] = [{
-                    "error": "Could not extract order ID from your question. Please provide a valid order number."
-                }]
-            else:
-                # Call the tool
-                result = query_order_tool(order_id)
-                
-                # Store result in mongo_data
-                updates["mongo_data"] = [{
-                    "order_id": order_id,
-                    "result": result,
-                    "success": "Error:" not in result
-                }]
-                
-                logger.info(f"Successfully queried order {order_id}")
-                
-        except Exception as e:
-            logger.error(f"Error executing query_order_tool: {e}")
-            updates["mongo_data"] = [{
-                "error": f"Failed to query order: {str(e)}"
-            }]
-    
-    # Execute VectorDB tool for legal/knowledge base queries
-    if "vector_db" in needed_sources:
-        try:
-            logger.info("Executing search_legal_docs_tool")
-            
-            # Refine query for better retrieval
-            refined_query = await refine_query(question)
-            
-            # Call the tool with refined query
-            result = search_legal_docs_tool(refined_query)
-            
-            # Wrap the result in a Document object to match state type
-            # The search_legal_docs_tool returns a formatted string,
-            # so we store it as a single document
-            doc = Document(
-                page_content=result,
-                metadata={
-                    "source": "vector_db_search",
-                    "query": question
-                }
-            )
-            
-            updates["documents"] = [doc]
-            
-            # Stream search status
-            try:
-                writer = get_stream_writer()
-                writer({"type": "status", "content": f"Searched knowledge base using: {refined_query}"})
-            except Exception:
-                pass
-                
-            logger.info("Successfully searched knowledge base")
-            
-        except Exception as e:
-            logger.error(f"Error executing search_legal_docs_tool: {e}")
-            
-            # Store error as a document
-            error_doc = Document(
-                page_content=f"Error: Failed to search knowledge base. {str(e)}",
-                metadata={
-                    "source": "error",
-                    "query": question
-                }
-            )
-            updates["documents"] = [error_doc]
-    
-    # Execute Web Search tool for web queries
-    if "web" in needed_sources:
-        try:
-            from src.agent.tools import web_search_tool
-            
-            logger.info("Executing web_search_tool")
-            
-            # Call the web search tool
-            result = web_search_tool(question)
-            
-            # Wrap result in a Document
-            doc = Document(
-                page_content=result,
-                metadata={
-                    "source": "web_search",
-                    "query": question
-                }
-            )
-            
-            # Append to existing documents or create new list
-            existing_docs = updates.get("documents", [])
-            updates["documents"] = existing_docs + [doc]
-            
-            # Stream search status
-            try:
-                writer = get_stream_writer()
-                writer({"type": "status", "content": "Web search completed"})
-            except Exception:
-                pass
-            
-            # Only log success if result doesn't contain error
-            if "Error:" not in result:
-                logger.info("Successfully completed web search")
-            else:
-                logger.warning(f"Web search returned error: {result[:100]}")
-            
-        except Exception as e:
-            logger.error(f"Error executing web_search_tool: {e}")
-            
-            # Store error as a document
-            error_doc = Document(
-                page_content=f"Error: Web search failed. {str(e)}",
-                metadata={
-                    "source": "error",
-                    "query": question
-                }
-            )
-            existing_docs = updates.get("documents", [])
-            updates["documents"] = existing_docs + [error_doc]
+    sources = [source for source in SOURCE_RUNNERS if source in needed_sources]
+    tasks = [asyncio.create_task(_run_source(source, question)) for source in sources]
+    
+    # Collect results as each source finishes (status events stream in completion order)
+    results: Dict[str, Dict] = {}
+    try:
+        for finished in asyncio.as_completed(tasks):
+            source, result = await finished
+            results[source] = result
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    # Merge in a fixed source order so the context is deterministic
+    updates: Dict[str, List] = {}
+    for source in sources:
+        for key, values in results[source].items():
+            updates[key] = updates.get(key, []) + values
     
     return updates
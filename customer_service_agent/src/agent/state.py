@@ -14,6 +14,9 @@ class AgentState(TypedDict):
     # add_messages reducer handles appending new messages to the list
     chat_history: Annotated[List[BaseMessage], add_messages]
     
+    # Running summary of turns folded out of chat_history (session memory)
+    summary: Optional[str]
+    
     # Retrieved documents from Vector DB
     documents: List[Document]
     
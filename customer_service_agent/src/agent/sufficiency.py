@@ -0,0 +1,48 @@
+"""
+Score-based context sufficiency gate.
+Decides sufficiency locally from retrieval similarity when confidence is
+clearly high or clearly low, leaving only the ambiguous band to the LLM
+judge. Thresholds are fitted offline with src.scripts.calibrate_sufficiency.
+"""
+from typing import List, Optional
+from langchain_core.documents import Document
+from src.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def retrieval_confidence(documents: List[Document]) -> Optional[float]:
+    """
+    Best cosine similarity among knowledge-base hits, or None when no hit
+    carries a vector score (e.g. lexical-only results).
+    """
+    scores = [doc.metadata["score"] for doc in documents if "score" in doc.metadata]
+    return max(scores) if scores else None
+
+
+def score_gate(mongo_data: List[dict], documents: List[Document]) -> Optional[bool]:
+    """
+    Local sufficiency verdict from retrieval scores.
+
+    Returns:
+        True or False when the best score is above SUFFICIENCY_HIGH_SCORE or
+        below SUFFICIENCY_LOW_SCORE, None when the LLM should decide. Context
+        that includes order data or web results is always left to the LLM.
+    """
+    if not settings.SUFFICIENCY_GATE_ENABLED or mongo_data:
+        return None
+    if any(doc.metadata.get("retrieval") != "vector_db_search" for doc in documents):
+        return None
+
+    confidence = retrieval_confidence(documents)
+    if confidence is None:
+        return None
+
+    if confidence >= settings.SUFFICIENCY_HIGH_SCORE:
+        logger.info(f"Score gate: best similarity {confidence:.3f}, context sufficient")
+        return True
+    if confidence < settings.SUFFICIENCY_LOW_SCORE:
+        logger.info(f"Score gate: best similarity {confidence:.3f}, context insufficient")
+        return False
+    return None
@@ -1,10 +1,19 @@
-from src.database.mongo_client import query_order
+from src.database.mongo_client import query_order, aquery_order
 from src.database.vector_db import VectorDB
-from typing import Dict, Callable, Any
+from src.database.lexical import reciprocal_rank_fusion
+from src.utils.metrics import timed_step
+from langchain_core.documents import Document
+from typing import Dict, Callable, Any, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _format_order(order: Dict[str, Any], order_id: str) -> str:
+    if order:
+        return f"Order Found:\nID: {order.get('order_id')}\nStatus: {order.get('status')}\nItems: {order.get('items')}\nTotal: {order.get('total_amount')}"
+    return f"Error: Order with ID '{order_id}' not found."
+
+@timed_step("query_order")
 def query_order_tool(order_id: str) -> str:
     """
     Fetches order details from the database.
@@ -20,16 +29,78 @@ def query_order_tool(order_id: str) -> str:
         clean_order_id = order_id.strip()
         
         order = query_order(clean_order_id)
-        
-        if order:
-            return f"Order Found:\nID: {order.get('order_id')}\nStatus: {order.get('status')}\nItems: {order.get('items')}\nTotal: {order.get('total_amount')}"
-        else:
-            return f"Error: Order with ID '{clean_order_id}' not found."
+        return _format_order(order, clean_order_id)
             
     except Exception as e:
         logger.error(f"Error in query_order_tool: {e}")
         return f"Error: Failed to fetch order details. System error: {str(e)}"
 
+@timed_step("query_order")
+async def aquery_order_tool(order_id: str) -> str:
+    """
+    Async version of query_order_tool, using the async MongoDB client.
+    
+    Args:
+        order_id (str): The ID of the order to query.
+        
+    Returns:
+        str: A formatted string containing the order details or an error message.
+    """
+    try:
+        clean_order_id = order_id.strip()
+        
+        order = await aquery_order(clean_order_id)
+        return _format_order(order, clean_order_id)
+            
+    except Exception as e:
+        logger.error(f"Error in aquery_order_tool: {e}")
+        return f"Error: Failed to fetch order details. System error: {str(e)}"
+
+@timed_step("search_legal_docs")
+def search_legal_docs(query: str, limit: int = 10) -> List[Document]:
+    """
+    Searches the knowledge base and returns the matching chunks.
+    
+    Args:
+        query (str): The search query.
+        limit (int): Maximum number of chunks to return.
+        
+    Returns:
+        List[Document]: Matching chunks, best first.
+    """
+    # Shared per-process instance, kept current by its reload watcher
+    vdb = VectorDB.get_instance()
+    return vdb.search(query, limit=limit)
+
+def merge_search_results(*result_lists: List[Document], limit: int = 10) -> List[Document]:
+    """
+    Merges several ranked hit lists with reciprocal rank fusion, dropping duplicates.
+    Earlier lists win ties; a duplicate keeps its best similarity score.
+    """
+    key = lambda doc: doc.id or doc.page_content
+    by_key = {}
+    for results in result_lists:
+        for doc in results:
+            kept = by_key.setdefault(key(doc), doc)
+            if doc.metadata.get("score", float("-inf")) > kept.metadata.get("score", float("-inf")):
+                kept.metadata["score"] = doc.metadata["score"]
+    fused = reciprocal_rank_fusion([[key(doc) for doc in results] for results in result_lists])
+    return [by_key[k] for k, _ in fused[:limit]]
+
+def format_search_results(results: List[Document]) -> str:
+    """
+    Formats search hits as the text block passed to the LLM.
+    """
+    if not results:
+        return "No relevant documents found."
+        
+    formatted_results = "Found the following relevant information:\n"
+    for i, doc in enumerate(results, 1):
+        source = doc.metadata.get('source', 'Unknown Source')
+        formatted_results += f"\n{i}. From {source}:\n   \"{doc.page_content}\"\n"
+        
+    return formatted_results
+
 def search_legal_docs_tool(query: str) -> str:
     """
     Searches the knowledge base for relevant legal documents and policies.
@@ -41,23 +112,9 @@ def search_legal_docs_tool(query: str) -> str:
         str: A formatted string containing relevant document snippets.
     """
     try:
-        print("DEBUG: Initializing VectorDB...", flush=True)
-        # Initialize VectorDB (singleton-like usage for now)
-        vdb = VectorDB()
-        
-        print("DEBUG: Performing search...", flush=True)
-        results = vdb.search(query, limit=10)
-        print(f"DEBUG: Search returned {len(results)} results.", flush=True)
-        
-        if not results:
-            return "No relevant documents found."
-            
-        formatted_results = "Found the following relevant information:\n"
-        for i, doc in enumerate(results, 1):
-            source = doc.metadata.get('source', 'Unknown Source')
-            formatted_results += f"\n{i}. From {source}:\n   \"{doc.page_content}\"\n"
-            
-        return formatted_results
+        results = search_legal_docs(query, limit=10)
+        logger.info(f"Search returned {len(results)} results.")
+        return format_search_results(results)
         
     except Exception as e:
         logger.error(f"Error in search_legal_docs_tool: {e}")
@@ -70,6 +127,38 @@ tools_map: Dict[str, Callable[[str], str]] = {
 }
 
 
+WEB_SEARCH_OPTIONS = {
+    "search_depth": "advanced",
+    "max_results": 5,
+    "include_answer": True,
+    "exclude_domains": [
+        "malware.com", "phishing.com",  # Placeholder malicious domains
+    ]
+}
+
+def _format_web_results(response: Dict[str, Any]) -> str:
+    formatted_results = ""
+    
+    # Include AI-generated answer if available
+    if response.get("answer"):
+        formatted_results += f"Summary: {response['answer']}\n\n"
+    
+    # Include search results
+    if response.get("results"):
+        formatted_results += "Sources:\n"
+        for i, result in enumerate(response["results"], 1):
+            title = result.get("title", "No title")
+            url = result.get("url", "")
+            content = result.get("content", "")[:300]  # Limit content length
+            formatted_results += f"\n{i}. {title}\n   URL: {url}\n   {content}...\n"
+    
+    if not formatted_results:
+        return "No web search results found."
+        
+    return formatted_results
+
+
+@timed_step("web_search")
 def web_search_tool(query: str) -> str:
     """
     Searches the web for relevant information using Tavily.
@@ -81,49 +170,42 @@ def web_search_tool(query: str) -> str:
         str: A formatted string containing web search results.
     """
     try:
-        from tavily import TavilyClient
-        from src.config import settings
+        from src.utils.clients import get_tavily_client
         
         logger.info(f"Executing web search for: {query}")
         
-        client = TavilyClient(api_key=settings.TAVILY_API_KEY.get_secret_value())
-        
         # Perform search with safe settings
-        response = client.search(
-            query=query,
-            search_depth="advanced",
-            max_results=5,
-            include_answer=True,
-            exclude_domains=[
-                "malware.com", "phishing.com",  # Placeholder malicious domains
-            ]
-        )
-        
-        # Format results
-        formatted_results = ""
-        
-        # Include AI-generated answer if available
-        if response.get("answer"):
-            formatted_results += f"Summary: {response['answer']}\n\n"
-        
-        # Include search results
-        if response.get("results"):
-            formatted_results += "Sources:\n"
-            for i, result in enumerate(response["results"], 1):
-                title = result.get("title", "No title")
-                url = result.get("url", "")
-                content = result.get("content", "")[:300]  # Limit content length
-                formatted_results += f"\n{i}. {title}\n   URL: {url}\n   {content}...\n"
-        
-        if not formatted_results:
-            return "No web search results found."
-            
-        return formatted_results
+        response = get_tavily_client().search(query=query, **WEB_SEARCH_OPTIONS)
+        return _format_web_results(response)
         
     except Exception as e:
         logger.error(f"Error in web_search_tool: {e}")
         return f"Error: Web search failed. {str(e)}"
 
 
+@timed_step("web_search")
+async def aweb_search_tool(query: str) -> str:
+    """
+    Async version of web_search_tool, on the shared async HTTP pool.
+    
+    Args:
+        query (str): The search query.
+        
+    Returns:
+        str: A formatted string containing web search results.
+    """
+    try:
+        from src.utils.clients import get_async_tavily_client
+        
+        logger.info(f"Executing web search for: {query}")
+        
+        response = await get_async_tavily_client().search(query=query, **WEB_SEARCH_OPTIONS)
+        return _format_web_results(response)
+        
+    except Exception as e:
+        logger.error(f"Error in aweb_search_tool: {e}")
+        return f"Error: Web search failed. {str(e)}"
+
+
 # Update tool registry to include web search
 tools_map["web_search"] = web_search_tool
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr, MongoDsn, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class Settings(BaseSettings):
     """
@@ -20,15 +20,133 @@ class Settings(BaseSettings):
     OPENAI_API_KEY_AI_GRID: SecretStr
     MONGO_URI: str # Changed from MongoDsn because Pydantic adds port 27017 which breaks SRV
     TAVILY_API_KEY: SecretStr  # Required for web search
+    TAVILY_API_BASE_URL: str = "https://api.tavily.com"
     
     # Optional fields with defaults
     LANGFUSE_PUBLIC_KEY: Optional[str] = None
     LANGFUSE_SECRET_KEY: Optional[SecretStr] = None
     LANGFUSE_HOST: str = "https://cloud.langfuse.com"
+    LANGFUSE_SAMPLE_RATE: float = Field(default=0.05, ge=0.0, le=1.0)  # Share of requests traced in full
+    LANGFUSE_SLOW_REQUEST_SECONDS: float = 10.0  # Unsampled requests slower than this get a summary trace
+    LANGFUSE_FLUSH_AT: int = 50  # Events per export batch
+    LANGFUSE_FLUSH_INTERVAL: float = 5.0  # Seconds between background exports
     
     # App configuration
     ENVIRONMENT: str = Field(default="development", pattern="^(development|staging|production)$")
     DEBUG: bool = False
 
+    # Shared HTTP pool for model and search APIs
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept open
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 60.0
+    HTTP_POOL_TIMEOUT: float = 5.0  # Maximum wait for a free pooled connection
+    HTTP2_ENABLED: bool = True  # Needs the 'h2' package; falls back to HTTP/1.1 without it
+
+    # MongoDB connection pool
+    MONGO_DB_NAME: str = "customer_service"
+    MONGO_MAX_POOL_SIZE: int = 50  # Connections per worker process
+    MONGO_MIN_POOL_SIZE: int = 5  # Connections kept open when idle
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 3000  # Fail fast when no server is reachable
+    MONGO_CONNECT_TIMEOUT_MS: int = 3000
+    MONGO_SOCKET_TIMEOUT_MS: int = 5000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000  # Maximum wait for a free pooled connection
+
+    # Vector DB
+    VECTOR_DB_RELOAD_INTERVAL: float = 5.0  # Seconds between checks for a new index generation (0 disables)
+    VECTOR_DB_MMAP: bool = True  # Memory-map vectors when serving so workers share the page cache
+    VECTOR_INDEX_TYPE: str = Field(default="flat", pattern="^(flat|hnsw|ivf)$")  # Default ANN index type
+    # Per-index overrides, e.g. {"legal_docs_index": {"type": "hnsw", "m": 32, "ef_search": 64}}
+    VECTOR_INDEX_CONFIGS: Dict[str, Dict[str, Any]] = {}
+    VECTOR_SEARCH_MODE: str = Field(default="hybrid", pattern="^(vector|lexical|hybrid)$")
+    HYBRID_CANDIDATES: int = 20  # Hits taken from each ranker before fusion
+    RRF_K: int = 60  # Reciprocal rank fusion constant
+    LEXICAL_FAST_PATH: bool = True  # Skip the embedding call when BM25 finds a strong match
+    LEXICAL_STRONG_SCORE: float = 10.0  # Minimum BM25 score for the fast path
+    EMBEDDING_CACHE_SIZE: int = 4096  # Query embeddings kept in memory
+    EMBEDDING_CACHE_PATH: Optional[str] = "data/embedding_cache.sqlite3"  # Persistent tier; empty disables
+
+    # Routing: embedding-centroid fallback when keyword routing finds nothing or ties
+    ROUTER_CENTROIDS_ENABLED: bool = True  # Used only when {index}.centroids.npz exists
+    ROUTER_CENTROID_MIN_SCORE: float = 0.5  # Minimum cosine similarity to the nearest route centroid
+    ROUTER_CENTROID_MARGIN: float = 0.05  # Minimum lead over the runner-up route
+
+    # Retrieval
+    SPECULATIVE_RETRIEVAL: bool = True  # Search the raw question while the query is being refined
+    REFINE_LATENCY_BUDGET: float = 1.5  # Seconds before refinement is cancelled (0 waits indefinitely)
+
+    # Per-source tool timeouts in seconds (0 disables the timeout)
+    SOURCE_TIMEOUTS: Dict[str, float] = {"mongo_db": 5.0, "vector_db": 15.0, "web": 15.0}
+
+    # Generation
+    # 'inline' judges context sufficiency within the answer call via a leading marker;
+    # 'separate' makes an extra LLM call before generating
+    GENERATION_SUFFICIENCY_MODE: str = Field(default="inline", pattern="^(inline|separate)$")
+    CONTEXT_TOKEN_BUDGET: int = 3000  # Retrieved context packed into the answer prompt
+    SUFFICIENCY_CONTEXT_TOKENS: int = 1000  # Retrieved context packed into the separate sufficiency check
+    CONTEXT_MIN_CHUNK_TOKENS: int = 64  # A chunk that would be trimmed below this is dropped instead
+
+    # Score gate: best retrieval cosine similarity at or above HIGH is sufficient, below LOW is not;
+    # the LLM judges the band in between. Fit with src.scripts.calibrate_sufficiency
+    SUFFICIENCY_GATE_ENABLED: bool = True
+    SUFFICIENCY_HIGH_SCORE: float = 0.85
+    SUFFICIENCY_LOW_SCORE: float = 0.30
+
+    # Upstream governor for model API calls (per worker process)
+    GOVERNOR_ENABLED: bool = True
+    GOVERNOR_INITIAL_CONCURRENCY: int = 8  # Starting in-flight limit, adapted by AIMD
+    GOVERNOR_MIN_CONCURRENCY: int = 1
+    GOVERNOR_MAX_CONCURRENCY: int = 64
+    GOVERNOR_LATENCY_TARGET: float = 10.0  # Seconds to first byte above which the limit halves (0 disables)
+    GOVERNOR_TOKENS_PER_MINUTE: int = 0  # Provider token budget (0 disables)
+    GOVERNOR_COMPLETION_TOKENS: int = 512  # Completion tokens charged per chat request
+    GOVERNOR_BACKGROUND_SHARE: float = Field(default=0.5, gt=0, le=1)  # Share of the limit for background calls
+    GOVERNOR_MAX_WAIT: float = 30.0  # Seconds a call may wait for admission
+
+    # Admission control for /ask (per worker process)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 16  # Graph runs allowed at once
+    ADMISSION_MAX_QUEUE: int = 64  # Requests waiting for a slot; beyond this they get 503
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0  # Queue time before a waiting request gets 503
+    RATE_LIMIT_ENABLED: bool = True  # Per-client token bucket, keyed by client address
+    TRUSTED_PROXIES: List[str] = []  # Proxy addresses/CIDRs whose X-Forwarded-For names the client
+    RATE_LIMIT_PER_MINUTE: float = 30.0
+    RATE_LIMIT_BURST: int = 10
+    RATE_LIMIT_MAX_CLIENTS: int = 10000  # Buckets kept in memory; least recently seen are evicted
+
+    # SSE streaming
+    SSE_COALESCE_WINDOW_MS: float = 30.0  # Maximum time a token is held back for batching (0 sends every token)
+    SSE_COALESCE_MAX_CHARS: int = 256  # Buffered characters that force a flush
+    SSE_TIMING_EVENT: bool = False  # End each stream with a "timing" event (per-node breakdown)
+
+    # Metrics
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics on /metrics
+
+    # Conversation memory
+    MEMORY_BACKEND: str = Field(default="mongodb", pattern="^(mongodb|memory)$")  # Session checkpointer
+    MEMORY_CHECKPOINT_COLLECTION: str = "checkpoints"
+    MEMORY_HISTORY_TOKENS: int = 2000  # History above this is compacted into the running summary
+    MEMORY_RECENT_TOKENS: int = 1000  # Recent history kept verbatim when compacting
+
+    # Answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 512  # Maximum cached answers (LRU)
+    ANSWER_CACHE_TTL: float = 3600.0  # Seconds an answer stays valid
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # Minimum question cosine similarity for a hit
+    ANSWER_CACHE_ROUTES: List[str] = ["legal_inquiry", "general_inquiry"]  # Order and web answers are never cached
+
+    # Ingestion
+    INGEST_WORKERS: int = 0  # Parser processes (0 = all cores, 1 = no pool)
+    INGEST_PAGES_PER_TASK: int = 20  # PDF pages parsed per task
+    INGEST_PAGE_CACHE_DIR: Optional[str] = "data/cache/pages"  # Extracted page text by file hash; empty disables
+    INGEST_CHECKPOINT_DIR: Optional[str] = None  # Embedding checkpoints of interrupted runs; defaults to the index directory
+    EMBED_MAX_IN_FLIGHT: int = 4  # Concurrent embedding batches
+    EMBED_BATCH_SIZE: int = 64  # Initial texts per embedding request
+    EMBED_MIN_BATCH_SIZE: int = 8
+    EMBED_MAX_BATCH_SIZE: int = 100
+    EMBED_MAX_RETRIES: int = 6  # Attempts per batch on 429s and timeouts
+    EMBED_MAX_RETRY_DELAY: float = 60.0  # Longest backoff, including provider Retry-After
+
 # Singleton instance
 settings = Settings()
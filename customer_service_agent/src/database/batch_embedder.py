@@ -0,0 +1,197 @@
+"""
+Concurrent batch embedding for ingestion.
+Keeps a configurable number of embedding batches in flight, adapts the
+batch size to provider behaviour, retries rate limits and timeouts with
+capped backoff (splitting the failed batch to the reduced size), and
+checkpoints completed batches so an interrupted build resumes
+where it stopped.
+"""
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+from langchain_core.embeddings import Embeddings
+import asyncio
+import random
+import sqlite3
+import time
+import logging
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: rate limits, timeouts and transient provider failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    httpx.TimeoutException,
+    asyncio.TimeoutError,
+)
+
+
+class EmbeddingCheckpoint:
+    """
+    Embeddings of completed batches, keyed by embedding model and vector id,
+    in a SQLite file. Vectors from another model are never resumed.
+    """
+
+    def __init__(self, path: str, model: str = ""):
+        self.path = path
+        self.model = model
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint ("
+            "model TEXT NOT NULL, id TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, id))"
+        )
+        self._conn.commit()
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = list(ids[start:start + 500])
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT id, vector FROM checkpoint WHERE model = ? AND id IN ({placeholders})",
+                [self.model, *batch]
+            ).fetchall()
+            found.update({row[0]: array("f", row[1]).tolist() for row in rows})
+        return found
+
+    def put_many(self, ids: Sequence[str], vectors: Sequence[List[float]]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO checkpoint (model, id, vector) VALUES (?, ?, ?)",
+            [(self.model, i, array("f", v).tobytes()) for i, v in zip(ids, vectors)]
+        )
+        self._conn.commit()
+
+    def clear(self):
+        self._conn.execute("DELETE FROM checkpoint")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class BatchEmbedder:
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_in_flight: int = 4,
+        batch_size: int = 64,
+        min_batch_size: int = 8,
+        max_batch_size: int = 100,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        checkpoint: Optional[EmbeddingCheckpoint] = None
+    ):
+        """
+        Args:
+            embeddings: Embeddings client; its aembed_documents is called per batch.
+            max_in_flight: Batches sent concurrently.
+            batch_size: Initial texts per batch.
+            min_batch_size: Smallest batch size after backing off.
+            max_batch_size: Largest batch size after growing.
+            max_retries: Attempts per batch before giving up.
+            base_delay: First backoff delay in seconds, doubled per retry.
+            max_delay: Longest wait before a retry, including provider Retry-After values.
+            checkpoint: Store for completed batches, enabling resume.
+        """
+        self.embeddings = embeddings
+        self.max_in_flight = max(1, max_in_flight)
+        self.batch_size = max(min_batch_size, min(batch_size, max_batch_size))
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.checkpoint = checkpoint
+
+    def _shrink(self):
+        self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+
+    def _grow(self):
+        self.batch_size = min(self.max_batch_size, self.batch_size + self.min_batch_size)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        # Honour Retry-After on 429s when the provider sends it, up to max_delay
+        delay = self.base_delay * (2 ** attempt) * (0.5 + random.random())
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                delay = max(0.0, float(response.headers.get("retry-after")))
+            except (TypeError, ValueError):
+                pass
+        return min(delay, self.max_delay)
+
+    async def _embed_batch(self, texts: List[str], attempt: int = 0) -> List[List[float]]:
+        try:
+            return await self.embeddings.aembed_documents(texts)
+        except RETRYABLE_ERRORS as e:
+            if attempt >= self.max_retries - 1:
+                raise
+            self._shrink()
+            delay = self._retry_delay(e, attempt)
+            logger.warning(
+                f"Embedding batch of {len(texts)} failed ({type(e).__name__}); "
+                f"retrying in {delay:.1f}s with batch size {self.batch_size}."
+            )
+            await asyncio.sleep(delay)
+
+        # Retry at the reduced size; each part keeps the attempt count
+        size = self.batch_size
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), size):
+            vectors.extend(await self._embed_batch(texts[start:start + size], attempt + 1))
+        return vectors
+
+    async def embed(self, texts: Sequence[str], ids: Sequence[str]) -> List[List[float]]:
+        """
+        Embeds texts, returning vectors in input order.
+        Vectors already in the checkpoint are reused without a request.
+        """
+        vectors: Dict[int, List[float]] = {}
+        if self.checkpoint is not None:
+            done = self.checkpoint.get_many(ids)
+            for position, vid in enumerate(ids):
+                if vid in done:
+                    vectors[position] = done[vid]
+            if vectors:
+                logger.info(f"Resuming embedding: {len(vectors)}/{len(texts)} chunks already embedded.")
+
+        pending = deque(i for i in range(len(texts)) if i not in vectors)
+        total = len(pending)
+        completed = 0
+        started = time.monotonic()
+
+        async def worker():
+            nonlocal completed
+            while pending:
+                batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                result = await self._embed_batch([texts[i] for i in batch])
+                for position, vector in zip(batch, result):
+                    vectors[position] = vector
+                if self.checkpoint is not None:
+                    self.checkpoint.put_many([ids[i] for i in batch], result)
+                self._grow()
+
+                completed += len(batch)
+                elapsed = max(time.monotonic() - started, 1e-9)
+                logger.info(f"Embedded {completed}/{total} chunks ({completed / elapsed:.1f} chunks/sec).")
+
+        if pending:
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_in_flight)]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for task in workers:
+                    task.cancel()
+                raise
+
+            elapsed = max(time.monotonic() - started, 1e-9)
+            logger.info(f"Embedded {total} chunks in {elapsed:.1f}s ({total / elapsed:.1f} chunks/sec).")
+
+        return [vectors[i] for i in range(len(texts))]
@@ -0,0 +1,149 @@
+"""
+SQLite-backed docstore for the FAISS index.
+Chunk text and metadata live in an indexed SQLite file next to the
+memory-mapped vectors and are read only for the top-k hits, so workers
+share the OS page cache instead of each unpickling the whole corpus.
+The same file carries an FTS5 (BM25) index over the chunks for lexical
+and hybrid search.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+import json
+import os
+import sqlite3
+import threading
+import logging
+
+from src.database.lexical import fts_query
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE chunks (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    page_content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+)
+"""
+
+# External-content FTS5 table: the BM25 index references chunks rather than copying the text
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE chunks_fts USING fts5(
+    page_content,
+    content='chunks',
+    content_rowid='position',
+    tokenize='porter unicode61'
+)
+"""
+
+
+def write_docstore(path: str, index_to_docstore_id: Dict[int, str], docstore: Docstore):
+    """
+    Writes every chunk in index position order to a new SQLite file.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(SCHEMA)
+        rows = []
+        for position, doc_id in sorted(index_to_docstore_id.items()):
+            doc = docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+            rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata, default=str)))
+        conn.executemany(
+            "INSERT INTO chunks (position, id, page_content, metadata) VALUES (?, ?, ?, ?)", rows
+        )
+        conn.execute(FTS_SCHEMA)
+        conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _connect_read_only(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+
+def read_ids(path: str) -> List[str]:
+    """Vector ids in index position order."""
+    conn = _connect_read_only(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM chunks ORDER BY position")]
+    finally:
+        conn.close()
+
+
+def load_in_memory(path: str) -> InMemoryDocstore:
+    """Loads every chunk, for processes that modify the index (ingestion)."""
+    conn = _connect_read_only(path)
+    try:
+        return InMemoryDocstore({
+            doc_id: Document(id=doc_id, page_content=content, metadata=json.loads(metadata))
+            for doc_id, content, metadata in conn.execute("SELECT id, page_content, metadata FROM chunks")
+        })
+    finally:
+        conn.close()
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore that fetches chunks from SQLite on demand.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; searches run in a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect_read_only(self.path)
+            self._local.conn = conn
+        return conn
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._conn().execute(
+            "SELECT page_content, metadata FROM chunks WHERE id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def lexical_search(self, query: str, limit: int = 10) -> Optional[List[Tuple[Document, float]]]:
+        """
+        BM25 search over the chunks.
+
+        Returns:
+            (document, score) pairs, higher score is better, or None if
+            this docstore has no FTS index.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        try:
+            rows = self._conn().execute(
+                "SELECT c.id, c.page_content, c.metadata, bm25(chunks_fts) AS rank "
+                "FROM chunks_fts JOIN chunks c ON c.position = chunks_fts.rowid "
+                "WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Lexical search unavailable: {e}")
+            return None
+        # FTS5 bm25() is negative, lower is better
+        return [
+            (Document(id=doc_id, page_content=content, metadata=json.loads(metadata)), -rank)
+            for doc_id, content, metadata, rank in rows
+        ]
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        raise NotImplementedError("SQLiteDocstore is read-only; load the index writable to modify it.")
+
+    def delete(self, ids: Iterable[str]) -> None:
+        raise NotImplementedError("SQLiteDocstore is read-only; load the index writable to modify it.")
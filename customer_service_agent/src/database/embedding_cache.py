@@ -0,0 +1,218 @@
+"""
+Query embedding cache.
+Keeps recently used query embeddings in a bounded in-memory LRU, backed by
+an optional SQLite file so the cache survives restarts. The async methods
+read and write the SQLite tier on a worker thread.
+"""
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from src.config import settings
+from src.utils.metrics import record_cache, step_timer
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes query text so trivially different spellings share a cache entry.
+    """
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    _instance: Optional["EmbeddingCache"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_size: int = 4096, db_path: Optional[str] = None):
+        """
+        Args:
+            max_size: Maximum number of embeddings held in memory.
+            db_path: SQLite file for the persistent tier, or None for memory only.
+        """
+        self.max_size = max_size
+        self.db_path = db_path
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Disk I/O has its own lock so memory hits never wait on SQLite
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                # Fall back to the memory tier rather than failing searches
+                logger.error(f"Failed to open embedding cache at {db_path}: {e}")
+                self._conn = None
+
+    @classmethod
+    def get_instance(cls) -> "EmbeddingCache":
+        """
+        Returns the process-wide cache configured from settings.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        max_size=settings.EMBEDDING_CACHE_SIZE,
+                        db_path=settings.EMBEDDING_CACHE_PATH or None
+                    )
+        return cls._instance
+
+    @staticmethod
+    def _disk_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Returns the cached embedding for the model and query, or None.
+        """
+        key = (model, normalize_query(text))
+        vector = self._get_memory(key)
+        return vector if vector is not None else self._get_disk(key)
+
+    async def aget(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Async get; a memory miss is looked up on disk in a worker thread.
+        """
+        key = (model, normalize_query(text))
+        vector = self._get_memory(key)
+        if vector is not None:
+            return vector
+        if self._conn is None:
+            return self._get_disk(key)
+        return await asyncio.to_thread(self._get_disk, key)
+
+    def put(self, model: str, text: str, vector: List[float]):
+        """
+        Stores an embedding in both tiers.
+        """
+        key = (model, normalize_query(text))
+        vector = list(vector)
+        with self._lock:
+            self._remember(key, vector)
+        self._write_disk(key, vector)
+
+    async def aput(self, model: str, text: str, vector: List[float]):
+        """
+        Async put; the disk write runs in a worker thread.
+        """
+        key = (model, normalize_query(text))
+        vector = list(vector)
+        with self._lock:
+            self._remember(key, vector)
+        if self._conn is not None:
+            await asyncio.to_thread(self._write_disk, key, vector)
+
+    def _get_memory(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def _get_disk(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        row = None
+        if self._conn is not None:
+            try:
+                with self._db_lock:
+                    row = self._conn.execute(
+                        "SELECT vector FROM embeddings WHERE key = ?", (self._disk_key(*key),)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache read failed: {e}")
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            vector = array("f", row[0]).tolist()
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def _write_disk(self, key: Tuple[str, str], vector: List[float]):
+        if self._conn is None:
+            return
+        try:
+            with self._db_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (self._disk_key(*key), array("f", vector).tobytes())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache write failed: {e}")
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters. Every hit is an embedding round trip saved.
+        """
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "size": len(self._memory),
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings client so query embeddings go through an EmbeddingCache.
+    Document embeddings (ingestion) are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(self.model, text)
+        record_cache("embedding", vector is not None)
+        if vector is None:
+            with step_timer("embed_query"):
+                vector = self.embeddings.embed_query(text)
+            self.cache.put(self.model, text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = await self.cache.aget(self.model, text)
+        record_cache("embedding", vector is not None)
+        if vector is None:
+            with step_timer("embed_query"):
+                vector = await self.embeddings.aembed_query(text)
+            await self.cache.aput(self.model, text, vector)
+        return vector
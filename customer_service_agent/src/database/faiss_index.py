@@ -0,0 +1,176 @@
+"""
+FAISS index construction for VectorDB.
+Supports exact (flat), HNSW and IVF indexes, configured per index name,
+with search-time parameters (efSearch / nprobe) applied on load.
+"""
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+from src.config import settings
+import math
+import logging
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    """ANN index type and tuning parameters."""
+    type: str = "flat"
+    # HNSW
+    m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    # IVF; nlist=0 picks ~4*sqrt(n) at training time
+    nlist: int = 0
+    nprobe: int = 8
+
+    def __post_init__(self):
+        if self.type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.type}', expected one of {INDEX_TYPES}")
+
+    @classmethod
+    def for_index(cls, index_name: str) -> "IndexConfig":
+        """
+        Config for an index: VECTOR_INDEX_TYPE, overridden by the entry for
+        index_name in VECTOR_INDEX_CONFIGS.
+        """
+        overrides: Dict[str, Any] = dict(settings.VECTOR_INDEX_CONFIGS.get(index_name, {}))
+        overrides.setdefault("type", settings.VECTOR_INDEX_TYPE)
+        return cls(**overrides)
+
+    @classmethod
+    def parse(cls, spec: str) -> "IndexConfig":
+        """
+        Parses 'type' or 'type:key=value,...', e.g. 'hnsw:m=32,ef_search=128'.
+        """
+        index_type, _, params = spec.partition(":")
+        names = {f.name for f in fields(cls)}
+        values: Dict[str, Any] = {"type": index_type.strip()}
+        for item in filter(None, params.split(",")):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in names or key == "type":
+                raise ValueError(f"Unknown index parameter '{key}'")
+            values[key] = int(value)
+        return cls(**values)
+
+    def label(self) -> str:
+        if self.type == "hnsw":
+            return f"hnsw(m={self.m},efSearch={self.ef_search})"
+        if self.type == "ivf":
+            return f"ivf(nlist={self.nlist or 'auto'},nprobe={self.nprobe})"
+        return "flat"
+
+
+def index_type(index: Any) -> str:
+    """Type name of a FAISS index as used in IndexConfig."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    try:
+        faiss.extract_index_ivf(index)
+        return "ivf"
+    except (RuntimeError, TypeError):
+        return "flat"
+
+
+def auto_nlist(n: int) -> int:
+    # FAISS wants ~39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def build_index(config: IndexConfig, vectors: np.ndarray) -> Any:
+    """
+    Creates an empty index for the config. IVF indexes are trained on the
+    given vectors, so pass the full set being indexed.
+    """
+    dimension = vectors.shape[1]
+    if config.type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config.m)
+        index.hnsw.efConstruction = config.ef_construction
+    elif config.type == "ivf":
+        nlist = min(config.nlist, len(vectors)) if config.nlist else auto_nlist(len(vectors))
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        logger.info(f"Training IVF index with nlist={nlist} on {len(vectors)} vectors...")
+        index.train(vectors)
+    else:
+        index = faiss.IndexFlatL2(dimension)
+
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index: Any, config: IndexConfig):
+    """Sets efSearch / nprobe on an index loaded or built for the config."""
+    kind = index_type(index)
+    if kind != config.type:
+        logger.warning(f"Index on disk is '{kind}' but config requests '{config.type}'; rebuild to switch.")
+    if kind == "hnsw":
+        index.hnsw.efSearch = config.ef_search
+    elif kind == "ivf":
+        faiss.extract_index_ivf(index).nprobe = config.nprobe
+
+
+def all_vectors(index: Any) -> np.ndarray:
+    """Reconstructs every stored vector in position order."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    if index_type(index) == "ivf":
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def l2_to_cosine(distance: float) -> float:
+    """
+    Cosine similarity for a squared L2 distance between unit vectors.
+    VectorDB normalizes stored and query vectors, so this holds for its
+    indexes whatever the embedding provider returns.
+    """
+    return 1.0 - float(distance) / 2.0
+
+
+def is_normalized(index: Any) -> Optional[bool]:
+    """
+    Whether the first stored vector has unit length, or None if the index
+    is empty or cannot reconstruct vectors without a direct map (IVF).
+    """
+    if index.ntotal == 0:
+        return None
+    try:
+        vector = index.reconstruct(0)
+    except RuntimeError:
+        return None
+    return abs(float(np.linalg.norm(vector)) - 1.0) < 1e-3
+
+
+def normalized_copy(index: Any) -> Any:
+    """Returns a copy of the index with every stored vector scaled to unit length."""
+    vectors = np.ascontiguousarray(all_vectors(index), dtype="float32")
+    faiss.normalize_L2(vectors)
+    new_index = faiss.clone_index(index)
+    new_index.reset()
+    if len(vectors):
+        new_index.add(vectors)
+    return new_index
+
+
+def rebuild_without(index: Any, positions) -> Any:
+    """
+    Returns a copy of the index without the given positions, keeping the
+    training of IVF indexes. Used where remove_ids is unsupported (HNSW) or
+    does not renumber ids (IVF).
+    """
+    drop = set(positions)
+    keep = [p for p in range(index.ntotal) if p not in drop]
+    vectors = all_vectors(index)[keep]
+    new_index = faiss.clone_index(index)
+    new_index.reset()
+    if len(vectors):
+        new_index.add(vectors)
+    return new_index
+
@@ -0,0 +1,59 @@
+"""
+Lexical (BM25) helpers for hybrid retrieval.
+The BM25 index itself is an SQLite FTS5 table built alongside the docstore;
+this module turns questions into FTS queries, judges whether a lexical hit
+is strong enough to skip the embedding call, and fuses ranked lists.
+"""
+from typing import Dict, Hashable, List, Sequence, Tuple
+import re
+
+# Words that carry no retrieval signal in customer questions
+STOPWORDS = frozenset("""
+a about am an and any are as at be been but by can could do does for from had has have how i if in
+into is it its me my of on or our please should so such tell than that the their them then there
+these they this to under was we what when where which who why will with would you your
+""".split())
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, stopwords removed, first occurrence order."""
+    seen = {}
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token not in STOPWORDS:
+            seen.setdefault(token, None)
+    return list(seen)
+
+
+def fts_query(text: str) -> str:
+    """
+    FTS5 MATCH expression that ORs the question's terms.
+    Terms are quoted so user input cannot inject FTS syntax.
+    """
+    return " OR ".join(f'"{token}"' for token in tokenize(text))
+
+
+def is_strong_match(query: str, content: str, score: float, min_score: float) -> bool:
+    """
+    True when a lexical hit contains every query term and scores at least
+    min_score, i.e. embedding search is unlikely to find anything better.
+    """
+    terms = tokenize(query)
+    if not terms or score < min_score:
+        return False
+    return set(terms) <= set(_TOKEN_RE.findall(content.lower()))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Merges ranked lists of keys with reciprocal rank fusion.
+
+    Returns:
+        (key, score) pairs, best first. Ties keep first-seen order.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient
 from pymongo.errors import PyMongoError
 from src.config import settings
 from typing import Optional, Dict, Any
@@ -7,6 +7,19 @@ import logging
 # Configure logging
 logger = logging.getLogger(__name__)
 
+def client_options() -> Dict[str, Any]:
+    """
+    Connection pool and timeout options shared by the sync and async clients.
+    """
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+
 class MongoDBClient:
     _instance: Optional[MongoClient] = None
 
@@ -18,7 +31,7 @@ class MongoDBClient:
         if cls._instance is None:
             try:
                 # str(settings.MONGO_URI) converts MongoDsn to string
-                cls._instance = MongoClient(str(settings.MONGO_URI))
+                cls._instance = MongoClient(str(settings.MONGO_URI), **client_options())
                 # Trigger a connection check
                 cls._instance.admin.command('ping')
                 logger.info("Successfully connected to MongoDB.")
@@ -28,13 +41,71 @@ class MongoDBClient:
         return cls._instance
 
     @classmethod
-    def get_database(cls, db_name: str = "customer_service"):
+    def get_database(cls, db_name: str = settings.MONGO_DB_NAME):
         """
         Returns the default database.
         """
         client = cls.get_client()
         return client[db_name]
 
+class AsyncMongoDBClient:
+    """
+    Async counterpart of MongoDBClient for use on the event loop.
+    connect() is awaited from the FastAPI lifespan so the pool is warm
+    before the first request.
+    """
+    _instance: Optional[AsyncMongoClient] = None
+
+    @classmethod
+    def get_client(cls) -> AsyncMongoClient:
+        """
+        Returns a singleton instance of the AsyncMongoClient.
+        Creating the client does not perform I/O.
+        """
+        if cls._instance is None:
+            cls._instance = AsyncMongoClient(str(settings.MONGO_URI), **client_options())
+        return cls._instance
+
+    @classmethod
+    def get_database(cls, db_name: str = settings.MONGO_DB_NAME):
+        """
+        Returns the default database.
+        """
+        return cls.get_client()[db_name]
+
+    @classmethod
+    async def connect(cls) -> AsyncMongoClient:
+        """
+        Pings the server, opening the first pooled connection; the driver
+        then fills the pool up to MONGO_MIN_POOL_SIZE in the background.
+        """
+        client = cls.get_client()
+        try:
+            await client.admin.command('ping')
+            logger.info("Successfully connected to MongoDB (async).")
+        except Exception as e:
+            logger.error(f"Failed to connect to MongoDB: {e}")
+            raise e
+        return client
+
+    @classmethod
+    async def close(cls):
+        """
+        Closes the client and its pool.
+        """
+        if cls._instance is not None:
+            client, cls._instance = cls._instance, None
+            await client.close()
+
+def _clean_order(order: Optional[Dict[str, Any]], order_id: str) -> Optional[Dict[str, Any]]:
+    if order:
+        # Convert ObjectId to string for cleaner JSON handling if needed
+        if "_id" in order:
+            order["_id"] = str(order["_id"])
+        return order
+    logger.warning(f"Order {order_id} not found.")
+    return None
+
 def query_order(order_id: str) -> Optional[Dict[str, Any]]:
     """
     Queries the 'orders' collection for a specific order ID.
@@ -46,15 +117,26 @@ def query_order(order_id: str) -> Optional[Dict[str, Any]]:
         
         # Simple find_one query
         order = collection.find_one({"order_id": order_id})
+        return _clean_order(order, order_id)
+
+    except PyMongoError as e:
+        logger.error(f"Database error querying order {order_id}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error querying order {order_id}: {e}")
+        return None
+
+async def aquery_order(order_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Async version of query_order.
+    Returns the order document or None if not found.
+    """
+    try:
+        db = AsyncMongoDBClient.get_database()
+        collection = db["orders"]
         
-        if order:
-            # Convert ObjectId to string for cleaner JSON handling if needed
-            if "_id" in order:
-                order["_id"] = str(order["_id"])
-            return order
-        else:
-            logger.warning(f"Order {order_id} not found.")
-            return None
+        order = await collection.find_one({"order_id": order_id})
+        return _clean_order(order, order_id)
 
     except PyMongoError as e:
         logger.error(f"Database error querying order {order_id}: {e}")
@@ -1,87 +1,530 @@
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from src.config import settings
-from typing import List
+from src.utils.clients import get_embeddings
+from src.database.docstore import SQLiteDocstore, load_in_memory, read_ids, write_docstore
+from src.database.embedding_cache import CachedEmbeddings, EmbeddingCache
+from src.database.lexical import is_strong_match, reciprocal_rank_fusion
+from src.database.faiss_index import (
+    IndexConfig, apply_search_params, build_index, index_type, is_normalized, l2_to_cosine, normalized_copy, rebuild_without
+)
+from typing import Dict, List, Optional, Set, Tuple
 import os
+import re
+import shutil
+import tempfile
+import threading
+import time
 import logging
 
+import faiss
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Saved generations whose files are kept; older ones are deleted on save
+KEEP_GENERATIONS = 2
+
+
+def generation_files(persist_directory: str, index_name: str, generation: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Index and docstore files of a generation (default: the one the marker
+    points at). Each save writes its own pair, so a reader always opens a
+    matching index and docstore. Indexes saved before per-generation files
+    use the unsuffixed names.
+    """
+    if generation is None:
+        try:
+            with open(os.path.join(persist_directory, f"{index_name}.generation"), "r", encoding="utf-8") as f:
+                generation = f.read().strip() or None
+        except FileNotFoundError:
+            pass
+    if generation:
+        index_path = os.path.join(persist_directory, f"{index_name}.{generation}.faiss")
+        if os.path.exists(index_path):
+            return index_path, os.path.join(persist_directory, f"{index_name}.{generation}.docs.sqlite3")
+    return (
+        os.path.join(persist_directory, f"{index_name}.faiss"),
+        os.path.join(persist_directory, f"{index_name}.docs.sqlite3")
+    )
+
+
+def _with_scores(doc: Document, **scores: float) -> Document:
+    # Copy so scores never leak into documents shared by the docstore
+    return Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, **scores})
+
+
 class VectorDB:
-    def __init__(self, index_name: str = "legal_docs_index"):
+    # Process-wide instances, one per index name
+    _instances: Dict[str, "VectorDB"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        index_name: str = "legal_docs_index",
+        persist_directory: Optional[str] = None,
+        embedding_function: Optional[Embeddings] = None,
+        index_config: Optional[IndexConfig] = None,
+    ):
         """
         Initializes the FAISS vector store and embedding function.
         """
         # Ensure data directory exists
-        self.persist_directory = os.path.join(os.getcwd(), "data", "faiss_index")
+        self.persist_directory = persist_directory or os.path.join(os.getcwd(), "data", "faiss_index")
         os.makedirs(self.persist_directory, exist_ok=True)
         self.index_name = index_name
-        
+        self.index_config = index_config or IndexConfig.for_index(index_name)
+
+        # Guards swaps of vector_store; searches only read the reference
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
         try:
-            self.embedding_function = OpenAIEmbeddings(
-                model="Alibaba-NLP/gte-Qwen2-7B-instruct",
-                api_key=settings.OPENAI_API_KEY_AI_GRID.get_secret_value(),
-                base_url=settings.OPENAI_API_BASE_URL,
-                chunk_size=100 # Process in smaller batches to avoid timeouts
-            )
-            
-            # Load existing index if it exists, otherwise initialize empty
-            index_file_path = os.path.join(self.persist_directory, f"{self.index_name}.faiss")
-            if os.path.exists(index_file_path):
-                logger.info("Loading existing FAISS index...")
-                self.vector_store = FAISS.load_local(
-                    self.persist_directory, 
-                    self.embedding_function, 
-                    index_name=self.index_name,
-                    allow_dangerous_deserialization=True # Safe since we created it
+            if embedding_function is None:
+                # Shared client on the process-wide HTTP pool
+                embeddings = get_embeddings()
+                # Repeated queries are served from the shared embedding cache
+                embedding_function = CachedEmbeddings(
+                    embeddings, EmbeddingCache.get_instance(), model=embeddings.model
                 )
-            else:
-                logger.info("Initializing new FAISS index...")
-                # FAISS requires at least one document to initialize or a specific setup
-                # We'll initialize it lazily or with a dummy doc if needed, 
-                # but for now let's handle it by checking in add_documents
-                self.vector_store = None
-            
+            self.embedding_function = embedding_function
+
+            # Load existing index if it exists, otherwise initialize empty
+            self.generation = self._read_generation()
+            self.vector_store = self._load_store()
+
         except Exception as e:
             logger.error(f"Failed to initialize VectorDB: {e}")
             raise e
 
-    def add_documents(self, documents: List[Document]):
+    @classmethod
+    def get_instance(cls, index_name: str = "legal_docs_index") -> "VectorDB":
+        """
+        Returns the shared VectorDB for this process, loading it on first use.
+        """
+        instance = cls._instances.get(index_name)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(index_name)
+                if instance is None:
+                    instance = cls(index_name=index_name)
+                    cls._instances[index_name] = instance
+        return instance
+
+    @classmethod
+    def reset_instances(cls):
+        """
+        Stops all watchers and drops the shared instances.
+        """
+        with cls._instances_lock:
+            for instance in cls._instances.values():
+                instance.stop_watcher()
+            cls._instances.clear()
+
+    @property
+    def _index_file_path(self) -> str:
+        # Unsuffixed layout of indexes saved before per-generation files
+        return os.path.join(self.persist_directory, f"{self.index_name}.faiss")
+
+    @property
+    def _legacy_docstore_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.index_name}.pkl")
+
+    @property
+    def centroids_path(self) -> str:
+        """Per-route question centroids for the orchestrator, built by build_intent_centroids."""
+        return os.path.join(self.persist_directory, f"{self.index_name}.centroids.npz")
+
+    @property
+    def _generation_file_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.index_name}.generation")
+
+    def _read_generation(self) -> Optional[str]:
+        """
+        Returns an identifier for the index generation currently on disk.
+        Uses the marker written by _save(), falling back to the index file
+        stats for indexes written before the marker existed.
+        """
+        try:
+            with open(self._generation_file_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            pass
+
+        try:
+            stat = os.stat(self._index_file_path)
+            return f"{stat.st_mtime_ns}-{stat.st_size}"
+        except FileNotFoundError:
+            return None
+
+    def _load_store(self, writable: bool = False, generation: Optional[str] = None) -> Optional[FAISS]:
+        """
+        Loads a generation of the index from disk (default: self.generation).
+        Serving loads are read-only: vectors are memory-mapped and chunks are
+        fetched from SQLite per hit, so workers share the page cache.
+        Writable loads read everything into memory for ingestion.
+        """
+        index_path, docs_path = generation_files(
+            self.persist_directory, self.index_name, self.generation if generation is None else generation
+        )
+        if os.path.exists(index_path) and os.path.exists(docs_path):
+            logger.info("Loading existing FAISS index...")
+            flags = 0
+            if settings.VECTOR_DB_MMAP and not writable:
+                flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            index = faiss.read_index(index_path, flags)
+            apply_search_params(index, self.index_config)
+            if is_normalized(index) is False:
+                logger.warning(
+                    "FAISS index holds vectors that are not unit length, so similarity scores are not "
+                    "cosine. Run `python -m src.scripts.ingest --rebuild` to re-embed."
+                )
+
+            docstore = load_in_memory(docs_path) if writable else SQLiteDocstore(docs_path)
+            return FAISS(
+                self.embedding_function,
+                index,
+                docstore,
+                dict(enumerate(read_ids(docs_path))),
+                normalize_L2=True
+            )
+
+        if os.path.exists(self._legacy_docstore_path):
+            logger.error(
+                "Found a pickled FAISS docstore from an older version, which is no longer loaded. "
+                "Run `python -m src.scripts.ingest --migrate-legacy` to convert it, or `--rebuild`."
+            )
+
+        logger.info("Initializing new FAISS index...")
+        # FAISS requires at least one document to initialize or a specific setup
+        # We'll initialize it lazily or with a dummy doc if needed,
+        # but for now let's handle it by checking in add_documents
+        return None
+
+    def _ensure_writable(self):
+        """
+        Swaps a read-only (memory-mapped) store for a writable copy.
+        """
+        if self.vector_store is not None and isinstance(self.vector_store.docstore, SQLiteDocstore):
+            self.vector_store = self._load_store(writable=True)
+
+    def migrate_legacy(self) -> bool:
+        """
+        Converts an index saved with the pickled docstore to the current
+        format, keeping its embeddings. The legacy pickle is deserialized
+        this once, so only run it on an index this application wrote.
+
+        Returns:
+            bool: True if a legacy index was converted.
+        """
+        if not (os.path.exists(self._index_file_path) and os.path.exists(self._legacy_docstore_path)):
+            return False
+
+        with self._lock:
+            self.vector_store = FAISS.load_local(
+                self.persist_directory,
+                self.embedding_function,
+                index_name=self.index_name,
+                allow_dangerous_deserialization=True, # One-off migration of our own index
+                normalize_L2=True
+            )
+            self.vector_store.index = normalized_copy(self.vector_store.index)
+            self._save()
+            os.remove(self._legacy_docstore_path)
+        logger.info(f"Migrated {len(self.vector_store.index_to_docstore_id)} vectors to the SQLite docstore.")
+        return True
+
+    def _save(self):
+        """
+        Persists the index as a new generation and points the marker at it.
+        Each generation has its own index and docstore files, written to a
+        temporary directory and renamed into place before the marker, so
+        readers only ever open a complete, matching pair. Files of the
+        previous generation stay until the next save for readers that have
+        not reloaded yet.
+        """
+        generation = str(time.time_ns())
+        tmp_dir = tempfile.mkdtemp(prefix=f".{self.index_name}-", dir=self.persist_directory)
+        try:
+            faiss.write_index(self.vector_store.index, os.path.join(tmp_dir, "index.faiss"))
+            write_docstore(
+                os.path.join(tmp_dir, "docs.sqlite3"),
+                self.vector_store.index_to_docstore_id,
+                self.vector_store.docstore
+            )
+            index_path = os.path.join(self.persist_directory, f"{self.index_name}.{generation}.faiss")
+            docs_path = os.path.join(self.persist_directory, f"{self.index_name}.{generation}.docs.sqlite3")
+            os.replace(os.path.join(tmp_dir, "docs.sqlite3"), docs_path)
+            os.replace(os.path.join(tmp_dir, "index.faiss"), index_path)
+
+            tmp_marker = f"{self._generation_file_path}.tmp"
+            with open(tmp_marker, "w", encoding="utf-8") as f:
+                f.write(generation)
+            os.replace(tmp_marker, self._generation_file_path)
+            self.generation = generation
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._prune_generations()
+
+    def _prune_generations(self):
+        """
+        Deletes the files of generations older than the last KEEP_GENERATIONS,
+        including an unsuffixed index from before per-generation files.
+        """
+        pattern = re.compile(rf"^{re.escape(self.index_name)}\.(\d+)\.(?:faiss|docs\.sqlite3)$")
+        generations: Dict[int, List[str]] = {}
+        for filename in os.listdir(self.persist_directory):
+            match = pattern.match(filename)
+            if match:
+                generations.setdefault(int(match.group(1)), []).append(filename)
+
+        stale = [name for g in sorted(generations)[:-KEEP_GENERATIONS] for name in generations[g]]
+        if len(generations) >= KEEP_GENERATIONS:
+            stale += [f"{self.index_name}.faiss", f"{self.index_name}.docs.sqlite3"]
+        for filename in stale:
+            try:
+                os.remove(os.path.join(self.persist_directory, filename))
+            except FileNotFoundError:
+                pass
+
+    def reload_if_changed(self) -> bool:
+        """
+        Loads a newer index generation from disk and swaps it in.
+        The new store is fully loaded before the swap, so searches keep
+        using the previous generation until then and never wait on a load.
+
+        Returns:
+            bool: True if a new generation was loaded.
+        """
+        generation = self._read_generation()
+        if generation is None or generation == self.generation:
+            return False
+
+        try:
+            new_store = self._load_store(generation=generation)
+        except Exception as e:
+            # Keep serving the current generation; retry on the next poll
+            logger.error(f"Failed to load FAISS index generation {generation}: {e}")
+            return False
+
+        with self._lock:
+            self.vector_store = new_store
+            self.generation = generation
+        logger.info(f"Swapped to FAISS index generation {generation}.")
+        return True
+
+    def start_watcher(self, interval: Optional[float] = None):
+        """
+        Starts a background thread that polls for new index generations.
+        """
+        interval = settings.VECTOR_DB_RELOAD_INTERVAL if interval is None else interval
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+
+        self._stop_event.clear()
+        self._watcher = threading.Thread(
+            target=self._watch,
+            args=(interval,),
+            name=f"faiss-reload-{self.index_name}",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """
+        Stops the background reload thread, if running.
+        """
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"FAISS reload check failed: {e}")
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
         """
         Adds documents to the vector database.
         """
         if not documents:
             return
 
+        self.apply_changes(documents, ids=ids)
+
+    def apply_changes(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+        delete_ids: Optional[List[str]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ):
+        """
+        Deletes stale vectors, adds new documents and saves one new generation.
+
+        Args:
+            documents: Documents to embed and add.
+            ids: Optional vector ids for the documents.
+            delete_ids: Vector ids to remove before adding.
+            embeddings: Precomputed vectors for the documents; embedded here if omitted.
+        """
         try:
-            if self.vector_store is None:
-                self.vector_store = FAISS.from_documents(
-                    documents, 
-                    self.embedding_function
-                )
-            else:
-                self.vector_store.add_documents(documents)
-            
-            # Save index
-            self.vector_store.save_local(self.persist_directory, index_name=self.index_name)
-            logger.info(f"Added {len(documents)} documents to FAISS and saved.")
-            
+            with self._lock:
+                self._ensure_writable()
+                existing = self.existing_ids()
+                delete_ids = [i for i in (delete_ids or []) if i in existing]
+                if delete_ids:
+                    self._delete(delete_ids)
+
+                if ids is not None:
+                    # Ids already present (e.g. from an interrupted run) are not re-embedded
+                    keep = [n for n, i in enumerate(ids) if i not in existing or i in delete_ids]
+                    documents = [documents[n] for n in keep]
+                    ids = [ids[n] for n in keep]
+                    if embeddings is not None:
+                        embeddings = [embeddings[n] for n in keep]
+
+                if documents:
+                    if embeddings is None:
+                        embeddings = self.embedding_function.embed_documents([d.page_content for d in documents])
+                    text_embeddings = [(d.page_content, e) for d, e in zip(documents, embeddings)]
+                    metadatas = [d.metadata for d in documents]
+                    if self.vector_store is None:
+                        # IVF indexes are trained on the full initial set, normalized as it will be stored
+                        training = np.array(embeddings, dtype="float32")
+                        faiss.normalize_L2(training)
+                        index = build_index(self.index_config, training)
+                        # Unit vectors on both sides, so L2 distances map to cosine similarity
+                        self.vector_store = FAISS(
+                            self.embedding_function, index, InMemoryDocstore(), {}, normalize_L2=True
+                        )
+                    self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+                if not documents and not delete_ids:
+                    return
+
+                # Save index
+                self._save()
+            logger.info(f"Added {len(documents)} and deleted {len(delete_ids)} documents in FAISS and saved.")
+
         except Exception as e:
-            logger.error(f"Failed to add documents: {e}")
+            logger.error(f"Failed to update documents: {e}")
             raise e
 
-    def search(self, query: str, limit: int = 3) -> List[Document]:
+    def _delete(self, ids: List[str]):
+        """
+        Removes vectors by id. Flat indexes delete in place; HNSW cannot
+        remove ids and IVF does not renumber them, so those are rebuilt
+        from the remaining vectors.
+        """
+        store = self.vector_store
+        if index_type(store.index) == "flat":
+            store.delete(ids)
+            return
+
+        drop = set(ids)
+        positions = [pos for pos, vid in store.index_to_docstore_id.items() if vid in drop]
+        kept = [vid for _, vid in sorted(store.index_to_docstore_id.items()) if vid not in drop]
+        store.index = rebuild_without(store.index, positions)
+        store.docstore.delete(list(drop))
+        store.index_to_docstore_id = dict(enumerate(kept))
+
+    def existing_ids(self) -> Set[str]:
+        """
+        Returns the ids of all vectors in the current store.
+        """
+        vector_store = self.vector_store
+        if vector_store is None:
+            return set()
+        return set(vector_store.index_to_docstore_id.values())
+
+    def clear(self):
+        """
+        Drops the in-memory store so the next write starts a fresh index.
+        """
+        with self._lock:
+            self.vector_store = None
+
+    def search(self, query: str, limit: int = 3, mode: Optional[str] = None) -> List[Document]:
         """
         Searches for documents relevant to the query.
+
+        Returned documents are copies carrying their retrieval scores in
+        metadata: "score" (cosine similarity, vector hits) and/or "bm25"
+        (lexical hits).
+
+        Args:
+            query: Search text.
+            limit: Number of documents to return.
+            mode: 'vector', 'lexical' (BM25) or 'hybrid' (both, merged with
+                reciprocal rank fusion). Defaults to VECTOR_SEARCH_MODE.
         """
-        if self.vector_store is None:
+        mode = mode or settings.VECTOR_SEARCH_MODE
+        # Take a reference once so a concurrent swap cannot affect this search
+        vector_store = self.vector_store
+        if vector_store is None:
             logger.warning("Vector store is empty.")
             return []
-            
+
         try:
-            return self.vector_store.similarity_search(query, k=limit)
-            
+            candidates = max(limit, settings.HYBRID_CANDIDATES)
+            lexical = None
+            if mode in ("hybrid", "lexical") and hasattr(vector_store.docstore, "lexical_search"):
+                lexical = vector_store.docstore.lexical_search(query, limit=candidates)
+                if lexical is not None:
+                    lexical = [_with_scores(doc, bm25=score) for doc, score in lexical]
+
+            if lexical is not None and mode == "lexical":
+                return lexical[:limit]
+
+            if lexical and settings.LEXICAL_FAST_PATH:
+                top_doc = lexical[0]
+                if is_strong_match(query, top_doc.page_content, top_doc.metadata["bm25"], settings.LEXICAL_STRONG_SCORE):
+                    # Exact statutory terms matched well; skip the remote embedding call
+                    logger.info(f"Strong lexical match (bm25={top_doc.metadata['bm25']:.2f}); skipping vector search.")
+                    return lexical[:limit]
+
+            if not lexical:
+                return self._vector_search(vector_store, query, limit)
+
+            vector_hits = self._vector_search(vector_store, query, candidates)
+            return self._fuse(vector_hits, lexical, limit)
+
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
+
+    @staticmethod
+    def _vector_search(vector_store: FAISS, query: str, k: int) -> List[Document]:
+        return [
+            _with_scores(doc, score=l2_to_cosine(distance))
+            for doc, distance in vector_store.similarity_search_with_score(query, k=k)
+        ]
+
+    @staticmethod
+    def _fuse(vector_hits: List[Document], lexical_hits: List[Document], limit: int) -> List[Document]:
+        """
+        Merges vector and lexical rankings with reciprocal rank fusion.
+        A chunk found by both keeps both of its scores.
+        """
+        key = lambda doc: doc.id or doc.page_content
+        by_key: Dict[str, Document] = {}
+        for doc in vector_hits + lexical_hits:
+            if key(doc) in by_key:
+                by_key[key(doc)].metadata.update(
+                    {k: v for k, v in doc.metadata.items() if k in ("score", "bm25")}
+                )
+            else:
+                by_key[key(doc)] = doc
+
+        fused = reciprocal_rank_fusion(
+            [[key(d) for d in vector_hits], [key(d) for d in lexical_hits]],
+            k=settings.RRF_K
+        )
+        return [by_key[k] for k, _ in fused[:limit]]
@@ -0,0 +1,73 @@
+"""
+Builds the per-route centroid vectors used by the orchestrator.
+Embeds a labelled set of example questions with the same embedding client
+as retrieval and writes one normalized mean vector per route next to the
+FAISS index as {index}.centroids.npz.
+
+The examples file is JSON Lines with one question per line:
+    {"question": "Where is my parcel?", "route": "order_inquiry"}
+
+Routes must be one of order_inquiry, legal_inquiry, web_search or general_inquiry.
+
+Usage:
+    python -m src.scripts.build_intent_centroids data/route_examples.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import logging
+from collections import Counter
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.agent.intent_centroids import compute_centroids, save_centroids
+from src.agent.nodes.orchestrator import ROUTE_SOURCES
+from src.database.vector_db import VectorDB
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def embed_questions(embeddings, questions, concurrency: int = 8):
+    # Query embeddings, as the orchestrator embeds incoming questions the same way
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed(question):
+        async with semaphore:
+            return await embeddings.aembed_query(question)
+
+    return await asyncio.gather(*(embed(q) for q in questions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build route centroids for the orchestrator.")
+    parser.add_argument("examples", help="JSON Lines file of {question, route}.")
+    parser.add_argument("--index-name", default="legal_docs_index")
+    args = parser.parse_args()
+
+    with open(args.examples, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    unknown = {row["route"] for row in rows} - set(ROUTE_SOURCES)
+    if unknown:
+        raise SystemExit(f"Unknown routes in {args.examples}: {', '.join(sorted(unknown))}")
+
+    vector_db = VectorDB(index_name=args.index_name)
+    questions = [row["question"] for row in rows]
+    routes = [row["route"] for row in rows]
+    vectors = asyncio.run(embed_questions(vector_db.embedding_function, questions))
+
+    labels, centroids = compute_centroids(vectors, routes)
+    counts = Counter(routes)
+    save_centroids(vector_db.centroids_path, labels, centroids, counts)
+
+    for label in labels:
+        logger.info(f"{label}: {counts[label]} examples")
+    logger.info(f"Wrote {len(labels)} route centroids to {vector_db.centroids_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Fits the score-gate thresholds for context sufficiency.
+Runs retrieval for a labelled question set and picks the lowest "high"
+threshold and highest "low" threshold that keep the local verdicts at the
+target precision, so only the ambiguous band reaches the LLM judge.
+
+The labels file is JSON Lines with one question per line:
+    {"question": "What is the PAYE remittance deadline?", "sufficient": true}
+
+Usage:
+    python -m src.scripts.calibrate_sufficiency data/sufficiency_labels.jsonl --precision 0.95
+"""
+import argparse
+import json
+import os
+import sys
+import logging
+from typing import Dict, List, Optional
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fit_thresholds(scores: List[float], labels: List[bool], precision: float = 0.95, min_support: int = 5) -> Dict:
+    """
+    Chooses thresholds from labelled retrieval confidences.
+
+    high is the lowest score such that questions scoring at or above it are
+    sufficient with at least the target precision; low is the highest score
+    such that questions below it are insufficient with that precision. Each
+    side needs min_support questions, otherwise it is left as None.
+
+    Returns:
+        Dict with high, low, coverage (share decided locally) and errors
+        (local verdicts that contradict the labels).
+    """
+    pairs = sorted(zip(scores, labels), key=lambda pair: pair[0])
+    n = len(pairs)
+
+    high: Optional[float] = None
+    correct = 0
+    for count, (score, label) in enumerate(reversed(pairs), 1):
+        correct += label
+        if count >= min_support and correct / count >= precision:
+            high = score
+
+    low: Optional[float] = None
+    correct = 0
+    for count, (score, label) in enumerate(pairs, 1):
+        correct += not label
+        # Threshold just above this score so it falls in the "below low" side
+        next_score = pairs[count][0] if count < n else score
+        if count >= min_support and correct / count >= precision and next_score > score:
+            low = (score + next_score) / 2
+
+    if high is not None and low is not None and low > high:
+        low = high
+
+    decided = errors = 0
+    for score, label in pairs:
+        if high is not None and score >= high:
+            decided += 1
+            errors += not label
+        elif low is not None and score < low:
+            decided += 1
+            errors += label
+
+    return {
+        "high": high,
+        "low": low,
+        "coverage": round(decided / n, 4) if n else 0.0,
+        "errors": errors,
+        "questions": n,
+    }
+
+
+def load_labels(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit SUFFICIENCY_HIGH_SCORE / SUFFICIENCY_LOW_SCORE from labelled questions.")
+    parser.add_argument("labels", help="JSON Lines file of {question, sufficient}.")
+    parser.add_argument("--precision", type=float, default=0.95, help="Required precision of local verdicts.")
+    parser.add_argument("--min-support", type=int, default=5, help="Minimum questions on each side of a threshold.")
+    parser.add_argument("--limit", type=int, default=10, help="Hits retrieved per question, as in tool_node.")
+    args = parser.parse_args()
+
+    from src.agent.sufficiency import retrieval_confidence
+    from src.database.vector_db import VectorDB
+
+    vector_db = VectorDB.get_instance()
+    scores, labels = [], []
+    for row in load_labels(args.labels):
+        # Vector mode so every hit carries a cosine score
+        hits = vector_db.search(row["question"], limit=args.limit, mode="vector")
+        confidence = retrieval_confidence(hits)
+        if confidence is None:
+            logger.warning(f"No scored hits for: {row['question']}")
+            continue
+        scores.append(confidence)
+        labels.append(bool(row["sufficient"]))
+
+    result = fit_thresholds(scores, labels, precision=args.precision, min_support=args.min_support)
+    print(json.dumps(result, indent=2))
+    if result["high"] is not None:
+        print(f"SUFFICIENCY_HIGH_SCORE={result['high']:.4f}")
+    if result["low"] is not None:
+        print(f"SUFFICIENCY_LOW_SCORE={result['low']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
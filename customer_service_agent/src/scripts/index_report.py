@@ -0,0 +1,111 @@
+"""
+Compares ANN index configurations against exact (flat) search.
+Builds each configuration in memory from the vectors of an existing index
+and reports recall@k against the flat results plus p50/p99 search latency.
+Runs offline: queries are sampled from the indexed vectors with small noise.
+
+Usage:
+    python -m src.scripts.index_report --k 10 --queries 200 flat hnsw:ef_search=32 ivf:nprobe=4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import logging
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.database.faiss_index import IndexConfig, all_vectors, build_index
+from src.database.vector_db import generation_files
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIGS = [
+    "flat",
+    "hnsw:ef_search=16",
+    "hnsw:ef_search=64",
+    "hnsw:ef_search=128",
+    "ivf:nprobe=1",
+    "ivf:nprobe=8",
+    "ivf:nprobe=32",
+]
+
+
+def sample_queries(vectors: np.ndarray, count: int, noise: float = 0.05, seed: int = 0) -> np.ndarray:
+    """Perturbed copies of random indexed vectors, scaled to the data's spread."""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), size=count)]
+    scale = noise * float(np.std(vectors))
+    return (picks + rng.normal(0, scale, size=picks.shape)).astype("float32")
+
+
+def evaluate(config: IndexConfig, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict:
+    """Builds one configuration and measures recall@k and per-query latency."""
+    started = time.perf_counter()
+    index = build_index(config, vectors)
+    index.add(vectors)
+    build_seconds = time.perf_counter() - started
+
+    latencies: List[float] = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, found = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(set(found[0]) & set(expected))
+
+    return {
+        "config": config.label(),
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "build_s": round(build_seconds, 3),
+    }
+
+
+def report(vectors: np.ndarray, specs: List[str], k: int = 10, query_count: int = 200) -> List[Dict]:
+    k = min(k, len(vectors))
+    queries = sample_queries(vectors, query_count)
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    _, truth = flat.search(queries, k)
+
+    return [evaluate(IndexConfig.parse(spec), vectors, queries, truth, k) for spec in specs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency report for FAISS index configurations.")
+    parser.add_argument("configs", nargs="*", default=DEFAULT_CONFIGS, help="Configs such as 'hnsw:m=32,ef_search=64'.")
+    parser.add_argument("--index-name", default="legal_docs_index")
+    parser.add_argument("--index-dir", default=os.path.join(os.getcwd(), "data", "faiss_index"))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    index_path, _ = generation_files(args.index_dir, args.index_name)
+    vectors = all_vectors(faiss.read_index(index_path)).astype("float32")
+    logger.info(f"Loaded {len(vectors)} vectors of dimension {vectors.shape[1]} from {index_path}")
+
+    results = report(vectors, args.configs, k=args.k, query_count=args.queries)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    recall_key = f"recall@{min(args.k, len(vectors))}"
+    print(f"{'config':<32}{recall_key:>12}{'p50 ms':>10}{'p99 ms':>10}{'build s':>10}")
+    for row in results:
+        print(f"{row['config']:<32}{row[recall_key]:>12.4f}{row['p50_ms']:>10.4f}{row['p99_ms']:>10.4f}{row['build_s']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,28 @@
 Script to ingest documents from data/docs into the Vector DB.
 Supports .txt, .md, and .pdf files.
 Implements chunking for better retrieval.
+
+Ingestion is incremental: a manifest of file hash -> chunk hashes -> vector
+ids is kept next to the FAISS index, so a rerun only embeds new or changed
+chunks and deletes vectors for removed or changed files.
 """
+import argparse
+import asyncio
 import os
 import sys
 import logging
-from typing import List
+from typing import Dict, List
 from langchain_core.documents import Document
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # Add src to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
+from src.config import settings
+from src.database.batch_embedder import BatchEmbedder, EmbeddingCheckpoint
 from src.database.vector_db import VectorDB
+from src.scripts.manifest import IngestManifest, IngestPlan, file_hash
+from src.scripts.parse import PageCache, load_files
+from src.utils.governor import Priority, upstream_priority
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,77 +31,170 @@ logger = logging.getLogger(__name__)
 
 DOCS_DIR = os.path.join(os.getcwd(), "data", "docs")
 
-def load_documents() -> List[Document]:
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+
+def list_source_files(docs_dir: str = DOCS_DIR) -> Dict[str, str]:
+    """Map of file key (path relative to docs_dir) to absolute path, sorted by key."""
+    files = {}
+    for filename in sorted(os.listdir(docs_dir)):
+        file_path = os.path.join(docs_dir, filename)
+        if os.path.isfile(file_path) and filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            files[filename] = file_path
+    return files
+
+def _load(files: Dict[str, str], digests: Dict[str, str], workers: int) -> Dict[str, List[Document]]:
+    return load_files(
+        files,
+        digests,
+        workers=settings.INGEST_WORKERS if workers is None else workers,
+        pages_per_task=settings.INGEST_PAGES_PER_TASK,
+        page_cache=PageCache(settings.INGEST_PAGE_CACHE_DIR or None)
+    )
+
+def load_documents(docs_dir: str = DOCS_DIR, workers: int = None) -> List[Document]:
     """Load and chunk documents from the docs directory."""
-    documents = []
-    
-    if not os.path.exists(DOCS_DIR):
-        logger.warning(f"Documents directory not found: {DOCS_DIR}")
+    if not os.path.exists(docs_dir):
+        logger.warning(f"Documents directory not found: {docs_dir}")
         return []
-        
-    # Initialize text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
+
+    files = list_source_files(docs_dir)
+    digests = {key: file_hash(path) for key, path in files.items()}
+    loaded = _load(files, digests, workers)
+    return [doc for key in files if key in loaded for doc in loaded[key]]
+
+def plan_ingestion(manifest: IngestManifest, docs_dir: str = DOCS_DIR, workers: int = None) -> IngestPlan:
+    """
+    Compares the docs directory with the manifest.
+    Only files whose hash changed are read and chunked.
+    """
+    plan = IngestPlan()
+    source_files = list_source_files(docs_dir) if os.path.exists(docs_dir) else {}
+
+    changed: Dict[str, str] = {}
+    digests: Dict[str, str] = {}
+    for file_key, file_path in source_files.items():
+        digests[file_key] = file_hash(file_path)
+        record = manifest.files.get(file_key)
+        if record is not None and record.file_hash == digests[file_key]:
+            plan.unchanged_files.append(file_key)
+        else:
+            changed[file_key] = file_path
+
+    loaded = _load(changed, digests, workers)
+    for file_key in changed:
+        # Files that failed to parse keep their previous vectors
+        if file_key in loaded:
+            manifest.plan_file(plan, file_key, digests[file_key], loaded[file_key])
+
+    manifest.plan_removed(plan, source_files.keys())
+    return plan
+
+def ingest(vector_db: VectorDB, docs_dir: str = DOCS_DIR, rebuild: bool = False, workers: int = None) -> IngestPlan:
+    """
+    Brings the vector index in line with docs_dir and updates the manifest.
+
+    Args:
+        vector_db: Target vector database.
+        docs_dir: Directory of source documents.
+        rebuild: Discard the existing index and manifest and ingest everything.
+        workers: Parser processes; defaults to INGEST_WORKERS (0 = all cores).
+    """
+    manifest_path = os.path.join(vector_db.persist_directory, f"{vector_db.index_name}.manifest.json")
+    manifest = IngestManifest.load(manifest_path)
+
+    if not manifest.files and vector_db.existing_ids():
+        # Indexes built before the manifest have unknown vector ids
+        logger.warning("Existing index has no ingestion manifest; rebuilding from scratch.")
+        rebuild = True
+    elif manifest.all_vector_ids() and not vector_db.existing_ids():
+        logger.warning("Ingestion manifest has no matching index; rebuilding from scratch.")
+        rebuild = True
+
+    if rebuild:
+        manifest = IngestManifest(manifest_path)
+        vector_db.clear()
+
+    plan = plan_ingestion(manifest, docs_dir, workers)
+    logger.info(
+        f"Ingestion plan: {len(plan.changed_files)} new/changed, {len(plan.removed_files)} removed, "
+        f"{len(plan.unchanged_files)} unchanged files; {len(plan.add_ids)} chunks to embed, "
+        f"{len(plan.delete_ids)} vectors to delete."
     )
-    
-    for filename in os.listdir(DOCS_DIR):
-        file_path = os.path.join(DOCS_DIR, filename)
-        
-        if not os.path.isfile(file_path):
-            continue
-            
-        try:
-            raw_docs = []
-            if filename.lower().endswith('.pdf'):
-                logger.info(f"Processing PDF: {filename}")
-                loader = PyPDFLoader(file_path)
-                raw_docs = loader.load()
-            elif filename.lower().endswith(('.txt', '.md')):
-                logger.info(f"Processing Text: {filename}")
-                loader = TextLoader(file_path, encoding='utf-8')
-                raw_docs = loader.load()
-            else:
-                continue
-                
-            # Chunk the documents
-            chunked_docs = text_splitter.split_documents(raw_docs)
-            
-            # Add source metadata if missing (PyPDFLoader adds it, TextLoader adds it)
-            for doc in chunked_docs:
-                if "source" not in doc.metadata:
-                    doc.metadata["source"] = filename
-            
-            documents.extend(chunked_docs)
-            logger.info(f"Loaded and chunked {filename} into {len(chunked_docs)} segments.")
-            
-        except Exception as e:
-            logger.error(f"Error reading {filename}: {e}")
-            
-    return documents
-
-def main():
+
+    # Completed batches are checkpointed so an interrupted run resumes
+    checkpoint = EmbeddingCheckpoint(
+        os.path.join(
+            settings.INGEST_CHECKPOINT_DIR or vector_db.persist_directory,
+            f"{vector_db.index_name}.embed_checkpoint.sqlite3"
+        ),
+        model=getattr(vector_db.embedding_function, "model", "")
+    )
+    try:
+        embeddings = embed_documents(vector_db, plan.add_documents, plan.add_ids, checkpoint)
+
+        vector_db.apply_changes(
+            plan.add_documents, ids=plan.add_ids, delete_ids=plan.delete_ids, embeddings=embeddings
+        )
+
+        # Record the new state only once the index has been saved
+        manifest.apply(plan)
+        manifest.save()
+        checkpoint.clear()
+    finally:
+        checkpoint.close()
+    return plan
+
+def embed_documents(
+    vector_db: VectorDB,
+    documents: List[Document],
+    ids: List[str],
+    checkpoint: EmbeddingCheckpoint = None
+) -> List[List[float]]:
+    """Embeds chunks concurrently in adaptive, retried batches."""
+    if not documents:
+        return []
+
+    embedder = BatchEmbedder(
+        vector_db.embedding_function,
+        max_in_flight=settings.EMBED_MAX_IN_FLIGHT,
+        batch_size=settings.EMBED_BATCH_SIZE,
+        min_batch_size=settings.EMBED_MIN_BATCH_SIZE,
+        max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+        max_retries=settings.EMBED_MAX_RETRIES,
+        max_delay=settings.EMBED_MAX_RETRY_DELAY,
+        checkpoint=checkpoint
+    )
+    # Yields the upstream to user-facing calls when run inside the API process
+    with upstream_priority(Priority.BACKGROUND):
+        return asyncio.run(embedder.embed([d.page_content for d in documents], ids))
+
+def main(rebuild: bool = False, workers: int = None, migrate_legacy: bool = False):
     logger.info("Starting document ingestion...")
-    
-    # Load and chunk documents
-    docs = load_documents()
-    
-    if not docs:
-        logger.warning("No documents found to ingest.")
-        return
-        
+
     # Initialize DB
     try:
         vector_db = VectorDB()
-        
-        # Add to DB
-        vector_db.add_documents(docs)
-        
-        logger.info(f"Successfully ingested {len(docs)} document chunks.")
-        
+
+        if migrate_legacy and vector_db.migrate_legacy():
+            return
+
+        plan = ingest(vector_db, rebuild=rebuild, workers=workers)
+
+        logger.info(
+            f"Successfully ingested {len(plan.add_ids)} new document chunks "
+            f"and removed {len(plan.delete_ids)} stale chunks."
+        )
+
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ingest data/docs into the FAISS index.")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every document from scratch.")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (0 = all cores, 1 = no pool).")
+    parser.add_argument(
+        "--migrate-legacy", action="store_true",
+        help="Convert an index with a pickled docstore to the SQLite format, keeping its embeddings."
+    )
+    args = parser.parse_args()
+    main(rebuild=args.rebuild, workers=args.workers, migrate_legacy=args.migrate_legacy)
@@ -0,0 +1,129 @@
+"""
+Content-hash manifest for incremental ingestion.
+Records file hash -> chunk hashes -> vector ids for every ingested file,
+so a rerun only embeds new or changed chunks and deletes stale vectors.
+"""
+import hashlib
+import json
+import os
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+from langchain_core.documents import Document
+
+
+@dataclass
+class FileRecord:
+    """Ingestion record for a single source file."""
+    file_hash: str
+    # Parallel lists: chunk_hashes[i] is stored under vector_ids[i]
+    chunk_hashes: List[str] = field(default_factory=list)
+    vector_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class IngestPlan:
+    """Changes needed to bring the index in line with the docs directory."""
+    add_documents: List[Document] = field(default_factory=list)
+    add_ids: List[str] = field(default_factory=list)
+    delete_ids: List[str] = field(default_factory=list)
+    records: Dict[str, FileRecord] = field(default_factory=dict)
+    unchanged_files: List[str] = field(default_factory=list)
+    changed_files: List[str] = field(default_factory=list)
+    removed_files: List[str] = field(default_factory=list)
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(doc: Document) -> str:
+    """
+    SHA-256 of a chunk's text and metadata.
+    The source path is excluded so moving the docs directory does not
+    invalidate every chunk.
+    """
+    metadata = {k: v for k, v in doc.metadata.items() if k != "source"}
+    payload = json.dumps([doc.page_content, metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def vector_id(file_key: str, chunk_digest: str, occurrence: int) -> str:
+    """Deterministic vector id for the n-th occurrence of a chunk in a file."""
+    return hashlib.sha256(f"{file_key}\0{chunk_digest}\0{occurrence}".encode("utf-8")).hexdigest()[:32]
+
+
+class IngestManifest:
+    def __init__(self, path: str, files: Dict[str, FileRecord] = None):
+        self.path = path
+        self.files: Dict[str, FileRecord] = files or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        """Loads the manifest, or returns an empty one if none exists."""
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        files = {key: FileRecord(**record) for key, record in data.get("files", {}).items()}
+        return cls(path, files)
+
+    def save(self):
+        """Writes the manifest atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": {k: asdict(v) for k, v in self.files.items()}}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def all_vector_ids(self) -> List[str]:
+        return [vid for record in self.files.values() for vid in record.vector_ids]
+
+    def plan_file(self, plan: IngestPlan, file_key: str, digest: str, chunks: List[Document]):
+        """
+        Diffs a new or changed file's chunks against its previous record.
+        Chunks whose hash is unchanged keep their vector; others are embedded,
+        and vectors for chunks that disappeared are deleted.
+        """
+        previous = self.files.get(file_key)
+        old_ids: Dict[str, List[str]] = defaultdict(list)
+        if previous is not None:
+            for old_hash, old_id in zip(previous.chunk_hashes, previous.vector_ids):
+                old_ids[old_hash].append(old_id)
+
+        record = FileRecord(file_hash=digest)
+        occurrences: Dict[str, int] = defaultdict(int)
+        for doc in chunks:
+            digest_ = chunk_hash(doc)
+            if old_ids[digest_]:
+                vid = old_ids[digest_].pop(0)
+            else:
+                vid = vector_id(file_key, digest_, occurrences[digest_])
+                plan.add_documents.append(doc)
+                plan.add_ids.append(vid)
+            occurrences[digest_] += 1
+            record.chunk_hashes.append(digest_)
+            record.vector_ids.append(vid)
+
+        for stale in old_ids.values():
+            plan.delete_ids.extend(stale)
+
+        plan.records[file_key] = record
+        plan.changed_files.append(file_key)
+
+    def plan_removed(self, plan: IngestPlan, present_keys):
+        """Schedules deletion of vectors for files no longer on disk."""
+        for file_key, record in self.files.items():
+            if file_key not in present_keys:
+                plan.delete_ids.extend(record.vector_ids)
+                plan.removed_files.append(file_key)
+
+    def apply(self, plan: IngestPlan):
+        """Updates the manifest after the plan has been written to the index."""
+        for file_key in plan.removed_files:
+            self.files.pop(file_key, None)
+        self.files.update(plan.records)
@@ -0,0 +1,198 @@
+"""
+Parallel parsing and chunking for the ingest pipeline.
+Files, and page ranges of large PDFs, are parsed and chunked in a process
+pool. Results are reassembled in file and page order, so the chunks and
+their metadata are identical whatever the number of workers.
+Extracted PDF page text is cached by file hash, so unchanged PDFs are
+never parsed twice.
+"""
+import json
+import logging
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+# (page_number, page_label, text)
+Page = Tuple[int, str, str]
+
+
+def text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+    )
+
+
+class PageCache:
+    """Extracted PDF page text, stored as one JSON file per file hash."""
+
+    def __init__(self, cache_dir: Optional[str]):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, digest: str) -> Optional[List[Page]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                return [tuple(page) for page in json.load(f)]
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, digest: str, pages: List[Page]):
+        if not self.cache_dir:
+            return
+        tmp_path = f"{self._path(digest)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, self._path(digest))
+
+
+def _pdf_page_count(file_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[Page]:
+    """Extracts text for pages [start, stop) the same way PyPDFLoader does."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    labels = reader.page_labels
+    pages = []
+    for page_number in range(start, stop):
+        text = reader.pages[page_number].extract_text(extraction_mode="plain").strip()
+        pages.append((page_number, labels[page_number], text))
+    return pages
+
+
+def _chunk_pages(file_path: str, total_pages: int, pages: List[Page]) -> List[Document]:
+    page_docs = [
+        Document(
+            page_content=text,
+            metadata={
+                "source": file_path,
+                "total_pages": total_pages,
+                "page": page_number,
+                "page_label": page_label,
+            }
+        )
+        for page_number, page_label, text in pages
+    ]
+    return text_splitter().split_documents(page_docs)
+
+
+def process_pdf_range(
+    file_path: str,
+    total_pages: int,
+    start: int,
+    stop: int,
+    cached_pages: Optional[List[Page]] = None
+) -> Tuple[List[Page], List[Document]]:
+    """
+    Worker task: extracts (unless cached) and chunks one page range of a PDF.
+    """
+    pages = cached_pages if cached_pages is not None else _extract_pdf_pages(file_path, start, stop)
+    return pages, _chunk_pages(file_path, total_pages, pages)
+
+
+def process_text_file(file_path: str) -> List[Document]:
+    """Worker task: loads and chunks a .txt or .md file."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return text_splitter().split_documents([Document(page_content=text, metadata={"source": file_path})])
+
+
+class _InlineExecutor(Executor):
+    """Runs tasks in the calling process, for workers=1."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def load_files(
+    files: Dict[str, str],
+    digests: Dict[str, str],
+    workers: int = 0,
+    pages_per_task: int = 20,
+    page_cache: Optional[PageCache] = None
+) -> Dict[str, List[Document]]:
+    """
+    Parses and chunks files, fanning page ranges of PDFs out to a process pool.
+
+    Args:
+        files: File key -> absolute path.
+        digests: File key -> content hash, used for the page cache.
+        workers: Process count; 0 uses every core, 1 runs inline.
+        pages_per_task: PDF pages handled by one task.
+        page_cache: Cache of extracted PDF page text.
+
+    Returns:
+        File key -> ordered chunks. Files that fail to parse are logged and omitted.
+    """
+    page_cache = page_cache or PageCache(None)
+    workers = workers or os.cpu_count() or 1
+    executor = _InlineExecutor() if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+
+    results: Dict[str, List[Document]] = {}
+    try:
+        # Submit every task first so the pool stays busy across files
+        submitted = {}
+        for file_key, file_path in files.items():
+            try:
+                if file_path.lower().endswith(".pdf"):
+                    cached = page_cache.get(digests[file_key])
+                    total_pages = len(cached) if cached is not None else _pdf_page_count(file_path)
+                    futures = []
+                    for start in range(0, total_pages, pages_per_task):
+                        stop = min(start + pages_per_task, total_pages)
+                        futures.append(executor.submit(
+                            process_pdf_range, file_path, total_pages, start, stop,
+                            cached[start:stop] if cached is not None else None
+                        ))
+                    submitted[file_key] = ("pdf", futures, cached is not None)
+                    logger.info(f"Processing PDF: {file_key} ({total_pages} pages, cached={cached is not None})")
+                else:
+                    submitted[file_key] = ("text", [executor.submit(process_text_file, file_path)], True)
+                    logger.info(f"Processing Text: {file_key}")
+            except Exception as e:
+                logger.error(f"Error reading {file_key}: {e}")
+
+        # Collect in submission order to keep chunk order deterministic
+        for file_key, (kind, futures, cached) in submitted.items():
+            try:
+                chunks: List[Document] = []
+                pages: List[Page] = []
+                for future in futures:
+                    if kind == "pdf":
+                        range_pages, range_chunks = future.result()
+                        pages.extend(range_pages)
+                    else:
+                        range_chunks = future.result()
+                    chunks.extend(range_chunks)
+
+                if kind == "pdf" and not cached:
+                    page_cache.put(digests[file_key], pages)
+
+                results[file_key] = chunks
+                logger.info(f"Loaded and chunked {file_key} into {len(chunks)} segments.")
+            except Exception as e:
+                logger.error(f"Error reading {file_key}: {e}")
+    finally:
+        executor.shutdown()
+
+    return results
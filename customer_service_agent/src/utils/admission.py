@@ -0,0 +1,276 @@
+"""
+Admission control for graph runs.
+A global concurrency limit with a bounded FIFO wait queue keeps latency
+stable under spikes: requests beyond the queue, or that wait longer than
+the maximum queue time, are rejected immediately with a Retry-After hint
+instead of piling onto the upstream model provider. A per-client token
+bucket limits how fast any single client can submit questions.
+Limits apply per worker process.
+"""
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, Optional
+from src.config import settings
+from src.utils.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+import asyncio
+import ipaddress
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def _is_trusted(address: str, trusted_proxies: Iterable[str]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    for proxy in trusted_proxies:
+        try:
+            if ip in ipaddress.ip_network(proxy, strict=False):
+                return True
+        except ValueError:
+            logger.error(f"Ignoring invalid trusted proxy {proxy!r}")
+    return False
+
+
+def client_address(
+    peer: Optional[str],
+    forwarded_for: Optional[str] = None,
+    trusted_proxies: Iterable[str] = ()
+) -> Optional[str]:
+    """
+    Address to rate limit a request by.
+
+    X-Forwarded-For is only believed when the connection comes from a
+    trusted proxy; it is read right to left, skipping further trusted
+    proxies, so a client cannot choose its own key by sending the header.
+
+    Args:
+        peer: Address of the connection.
+        forwarded_for: X-Forwarded-For header value, if any.
+        trusted_proxies: Proxy addresses or networks (CIDR).
+    """
+    if peer is None or not forwarded_for or not _is_trusted(peer, trusted_proxies):
+        return peer
+    address = peer
+    for hop in reversed([hop.strip() for hop in forwarded_for.split(",") if hop.strip()]):
+        address = hop
+        if not _is_trusted(hop, trusted_proxies):
+            break
+    return address
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets; the least recently seen clients are evicted first."""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()  # client -> (tokens, updated)
+        self.limited = 0
+
+    def acquire(self, client: str):
+        """
+        Takes one token for client.
+
+        Raises:
+            AdmissionRejected: 429 when the client's bucket is empty
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            self.limited += 1
+            ADMISSION_REJECTED.labels("rate_limited").inc()
+            raise AdmissionRejected(429, "Rate limit exceeded", (1 - tokens) / self.rate if self.rate else 60)
+
+        self._buckets[client] = (tokens - 1, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+
+class Ticket:
+    """An admitted request's slot; release it exactly once when the run ends."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started)
+
+
+class AdmissionController:
+    _instance: Optional["AdmissionController"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 64,
+        max_wait: float = 10.0,
+        limiter: Optional[TokenBucketLimiter] = None
+    ):
+        """
+        Args:
+            max_concurrent: Graph runs allowed at once.
+            max_queue: Requests allowed to wait for a slot; beyond this they are rejected.
+            max_wait: Seconds a request may wait in the queue before it is rejected.
+            limiter: Optional per-client rate limiter.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.limiter = limiter
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Recent queue waits and run durations, for stats and Retry-After estimates
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._run_seconds = 5.0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @classmethod
+    def get_instance(cls) -> "AdmissionController":
+        """
+        Returns the process-wide controller configured from settings.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    limiter = None
+                    if settings.RATE_LIMIT_ENABLED:
+                        limiter = TokenBucketLimiter(
+                            settings.RATE_LIMIT_PER_MINUTE,
+                            settings.RATE_LIMIT_BURST,
+                            settings.RATE_LIMIT_MAX_CLIENTS
+                        )
+                    cls._instance = cls(
+                        max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+                        max_queue=settings.ADMISSION_MAX_QUEUE,
+                        max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+                        limiter=limiter
+                    )
+        return cls._instance
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _retry_after(self) -> float:
+        # Time for the queue ahead to drain at the observed run duration
+        return self._run_seconds * (self.queued + 1) / max(1, self.max_concurrent)
+
+    async def acquire(self, client: Optional[str] = None) -> Ticket:
+        """
+        Admits a request, waiting in the queue for a free slot if needed.
+
+        Args:
+            client: Client key for the per-client rate limit
+
+        Raises:
+            AdmissionRejected: 429 when the client is rate limited, 503 when
+                the queue is full or the wait exceeds max_wait
+        """
+        if self.limiter is not None and client is not None:
+            self.limiter.acquire(client)
+
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            ADMISSION_ACTIVE.set(self.active)
+            self._record_admission(0.0)
+            return Ticket(self)
+
+        if self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            ADMISSION_REJECTED.labels("queue_full").inc()
+            raise AdmissionRejected(503, "Server busy, queue full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.set(self.queued)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on
+                self._release(None)
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected_timeout += 1
+            ADMISSION_REJECTED.labels("queue_timeout").inc()
+            ADMISSION_QUEUE_WAIT.observe(time.monotonic() - started)
+            raise AdmissionRejected(503, "Server busy, queue wait exceeded", self._retry_after())
+
+        self._record_admission(time.monotonic() - started)
+        return Ticket(self)
+
+    def _remove_waiter(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        ADMISSION_QUEUE_DEPTH.set(self.queued)
+
+    def _record_admission(self, waited: float):
+        self.admitted += 1
+        self._waits.append(waited)
+        ADMISSION_QUEUE_WAIT.observe(waited)
+
+    def _release(self, duration: Optional[float]):
+        if duration is not None:
+            self._run_seconds = 0.8 * self._run_seconds + 0.2 * duration
+        # Hand the slot straight to the next live waiter so arrivals cannot jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUE_DEPTH.set(self.queued)
+                return
+        self.active -= 1
+        ADMISSION_QUEUE_DEPTH.set(self.queued)
+        ADMISSION_ACTIVE.set(self.active)
+
+    def stats(self) -> Dict:
+        """Current load and recent queue wait times, in seconds."""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4) if waits else 0.0
+
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "rate_limited": self.limiter.limited if self.limiter is not None else 0,
+            "queue_wait_p50": percentile(0.5),
+            "queue_wait_p95": percentile(0.95),
+            "queue_wait_max": round(waits[-1], 4) if waits else 0.0,
+            "avg_run_seconds": round(self._run_seconds, 3),
+        }
@@ -0,0 +1,200 @@
+"""
+Shared HTTP clients and model client factories.
+Every chat, embedding and web search client in the process goes through
+one keep-alive connection pool per direction (sync/async), so repeated
+calls reuse TCP/TLS connections instead of each client opening its own.
+Model calls are additionally admitted by the upstream governor.
+"""
+from typing import Optional
+from functools import lru_cache
+import asyncio
+import threading
+import logging
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from src.config import settings
+from src.utils.governor import AsyncGovernedTransport, GovernedTransport, UpstreamGovernor
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = "openai/gpt-oss-20b"
+EMBEDDING_MODEL = "Alibaba-NLP/gte-Qwen2-7B-instruct"
+
+_lock = threading.RLock()
+_sync_transport: Optional[httpx.HTTPTransport] = None
+_async_transport: Optional[httpx.AsyncHTTPTransport] = None
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_enabled() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1.")
+        return False
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.HTTP_READ_TIMEOUT,
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+        pool=settings.HTTP_POOL_TIMEOUT
+    )
+
+
+def get_sync_transport() -> httpx.HTTPTransport:
+    """The process-wide sync connection pool."""
+    global _sync_transport
+    if _sync_transport is None:
+        with _lock:
+            if _sync_transport is None:
+                _sync_transport = httpx.HTTPTransport(limits=_limits(), http2=_http2_enabled(), retries=1)
+    return _sync_transport
+
+
+def get_async_transport() -> httpx.AsyncHTTPTransport:
+    """The process-wide async connection pool."""
+    global _async_transport
+    if _async_transport is None:
+        with _lock:
+            if _async_transport is None:
+                _async_transport = httpx.AsyncHTTPTransport(limits=_limits(), http2=_http2_enabled(), retries=1)
+    return _async_transport
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Shared sync client for OpenAI-compatible APIs, admitted through the
+    upstream governor.
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                transport = get_sync_transport()
+                if settings.GOVERNOR_ENABLED:
+                    transport = GovernedTransport(transport, UpstreamGovernor.get_instance())
+                _sync_client = httpx.Client(transport=transport, timeout=_timeout())
+    return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Shared async client for OpenAI-compatible APIs, admitted through the
+    upstream governor.
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                transport = get_async_transport()
+                if settings.GOVERNOR_ENABLED:
+                    transport = AsyncGovernedTransport(transport, UpstreamGovernor.get_instance())
+                _async_client = httpx.AsyncClient(transport=transport, timeout=_timeout())
+    return _async_client
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(temperature: float = 0.0, streaming: bool = False, model: str = CHAT_MODEL) -> ChatOpenAI:
+    """
+    Shared ChatOpenAI for a model/temperature/streaming combination.
+    """
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=settings.OPENAI_API_KEY_AI_GRID,
+        base_url=settings.OPENAI_API_BASE_URL,
+        streaming=streaming,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client()
+    )
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model: str = EMBEDDING_MODEL) -> OpenAIEmbeddings:
+    """
+    Shared OpenAIEmbeddings client.
+    """
+    return OpenAIEmbeddings(
+        model=model,
+        api_key=settings.OPENAI_API_KEY_AI_GRID.get_secret_value(),
+        base_url=settings.OPENAI_API_BASE_URL,
+        chunk_size=100,  # Process in smaller batches to avoid timeouts
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client()
+    )
+
+
+@lru_cache(maxsize=None)
+def get_tavily_client():
+    """
+    Shared sync Tavily client. Tavily's sync client uses requests, so it
+    gets its own keep-alive session rather than the httpx pool.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from tavily import TavilyClient
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return TavilyClient(
+        api_key=settings.TAVILY_API_KEY.get_secret_value(),
+        api_base_url=settings.TAVILY_API_BASE_URL,
+        session=session
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_tavily_client():
+    """
+    Shared async Tavily client on the shared async connection pool.
+    Tavily sets its own auth headers on the client it is given, so it gets
+    a dedicated httpx client over the shared transport.
+    """
+    from tavily import AsyncTavilyClient
+
+    client = httpx.AsyncClient(transport=get_async_transport(), timeout=_timeout())
+    return AsyncTavilyClient(
+        api_key=settings.TAVILY_API_KEY.get_secret_value(),
+        api_base_url=settings.TAVILY_API_BASE_URL,
+        client=client
+    )
+
+
+async def warm_up():
+    """
+    Opens pooled connections (DNS, TCP, TLS) to the model and search
+    hosts before the first request. Failures are logged, not raised.
+    """
+    targets = [
+        (f"{settings.OPENAI_API_BASE_URL.rstrip('/')}/models",
+         {"Authorization": f"Bearer {settings.OPENAI_API_KEY_AI_GRID.get_secret_value()}"}),
+        (settings.TAVILY_API_BASE_URL, {}),
+    ]
+    client = get_async_http_client()
+
+    async def warm(url: str, headers: dict):
+        try:
+            response = await client.get(url, headers=headers, timeout=settings.HTTP_CONNECT_TIMEOUT)
+            logger.info(f"Warmed HTTP pool for {response.url.host} ({response.status_code})")
+        except Exception as e:
+            logger.warning(f"Could not warm HTTP pool for {url}: {e}")
+
+    await asyncio.gather(*(warm(url, headers) for url, headers in targets))
+
@@ -0,0 +1,433 @@
+"""
+Upstream governor for model API calls.
+Every chat and embedding request to the OpenAI-compatible endpoint passes
+through one process-wide governor, shared by sync and async clients:
+
+- Adaptive concurrency (AIMD): while saturated, the in-flight limit grows
+  by one per window of successful calls; it halves on a 429 or when
+  time-to-first-byte exceeds the latency target. A Retry-After on a 429 pauses all callers
+  together instead of letting each client retry on its own schedule.
+- Tokens-per-minute budget: each request is charged an estimate of its
+  prompt and completion tokens against a refilling bucket.
+- Priority classes: waiting requests are admitted highest priority first,
+  and background work may only use part of the limit, so user-facing
+  generation is not starved by refinement, summaries or ingestion.
+
+The priority of a call is taken from a context variable; see
+upstream_priority and prioritized.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from functools import wraps
+from typing import Dict, List, Optional
+from src.config import settings
+from src.utils.metrics import record_retry
+import asyncio
+import itertools
+import threading
+import time
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Rough average for English prose, as in src.utils.tokens
+CHARS_PER_TOKEN = 4
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # Answer generation the user is waiting on
+    STANDARD = 1  # Other request-path calls (query embeddings, routing)
+    BACKGROUND = 2  # Query refinement, history summaries, ingestion
+
+
+_priority: ContextVar[Priority] = ContextVar("upstream_priority", default=Priority.STANDARD)
+
+
+@contextmanager
+def upstream_priority(priority: Priority):
+    """Runs model calls made inside the block at the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def prioritized(priority: Priority):
+    """Decorator running an async function's model calls at the given priority."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with upstream_priority(priority):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, seq: int, cost: int, loop: Optional[asyncio.AbstractEventLoop]):
+        self.priority = priority
+        self.seq = seq
+        self.cost = cost
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    @property
+    def key(self):
+        return (self.priority, self.seq)
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            try:
+                self.loop.call_soon_threadsafe(self.event.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+
+class Permit:
+    """An admitted upstream call; report its response, then release it once."""
+
+    def __init__(self, governor: "UpstreamGovernor"):
+        self._governor = governor
+        self._started = time.monotonic()
+        self._released = False
+
+    def observe(self, response: httpx.Response):
+        self._governor._observe(response, time.monotonic() - self._started)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._governor._release()
+
+
+class UpstreamGovernor:
+    _instance: Optional["UpstreamGovernor"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        latency_target: float = 10.0,
+        tokens_per_minute: int = 0,
+        completion_tokens: int = 512,
+        background_share: float = 0.5,
+        max_wait: float = 30.0
+    ):
+        """
+        Args:
+            initial_concurrency: Starting in-flight limit.
+            min_concurrency: Floor for the in-flight limit.
+            max_concurrency: Ceiling for the in-flight limit.
+            latency_target: Seconds to first byte above which the limit backs off (0 disables).
+            tokens_per_minute: Token budget per minute (0 disables).
+            completion_tokens: Completion tokens charged per chat request.
+            background_share: Share of the limit background calls may use.
+            max_wait: Seconds a call may wait for admission before failing.
+        """
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.tokens_per_minute = tokens_per_minute
+        self.completion_tokens = completion_tokens
+        self.background_share = background_share
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiters: List[_Waiter] = []
+        self.in_flight = 0
+        self._tokens = float(tokens_per_minute)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self.throttled = 0
+        self.decreases = 0
+
+    @classmethod
+    def get_instance(cls) -> "UpstreamGovernor":
+        """
+        Returns the process-wide governor configured from settings.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        initial_concurrency=settings.GOVERNOR_INITIAL_CONCURRENCY,
+                        min_concurrency=settings.GOVERNOR_MIN_CONCURRENCY,
+                        max_concurrency=settings.GOVERNOR_MAX_CONCURRENCY,
+                        latency_target=settings.GOVERNOR_LATENCY_TARGET,
+                        tokens_per_minute=settings.GOVERNOR_TOKENS_PER_MINUTE,
+                        completion_tokens=settings.GOVERNOR_COMPLETION_TOKENS,
+                        background_share=settings.GOVERNOR_BACKGROUND_SHARE,
+                        max_wait=settings.GOVERNOR_MAX_WAIT
+                    )
+        return cls._instance
+
+    def estimate_tokens(self, request: httpx.Request) -> int:
+        """Prompt tokens from the request body, plus a completion allowance for chat calls."""
+        try:
+            prompt = len(request.content) // CHARS_PER_TOKEN
+        except httpx.RequestNotRead:
+            prompt = 0
+        completion = 0 if request.url.path.endswith("/embeddings") else self.completion_tokens
+        return prompt + completion
+
+    def _capacity(self, priority: Priority) -> int:
+        limit = int(self.limit)
+        if priority == Priority.BACKGROUND:
+            return max(1, int(limit * self.background_share))
+        return limit
+
+    def _refill(self, now: float):
+        if self.tokens_per_minute:
+            elapsed = now - self._refilled
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._refilled = now
+
+    def _try_admit(self, waiter: _Waiter) -> Optional[float]:
+        """
+        Admits waiter if it is next in line and there is room; call with the lock held.
+
+        Returns:
+            None if admitted, else seconds after which to check again
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if min(self._waiters, key=lambda w: w.key) is not waiter:
+            return 1.0
+        if self.in_flight >= self._capacity(waiter.priority):
+            return 1.0
+
+        if self.tokens_per_minute:
+            self._refill(now)
+            cost = min(waiter.cost, self.tokens_per_minute)
+            if self._tokens < cost:
+                return (cost - self._tokens) * 60 / self.tokens_per_minute
+            self._tokens -= cost
+
+        self._waiters.remove(waiter)
+        self.in_flight += 1
+        return None
+
+    def _enqueue(self, cost: int, loop: Optional[asyncio.AbstractEventLoop]) -> _Waiter:
+        waiter = _Waiter(_priority.get(), next(self._seq), cost, loop)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self._wake_all()
+
+    def _timeout(self, waiter: _Waiter, request: httpx.Request):
+        self._abandon(waiter)
+        self.throttled += 1
+        raise httpx.PoolTimeout(f"Upstream governor: no capacity within {self.max_wait}s", request=request)
+
+    def acquire(self, request: httpx.Request) -> Permit:
+        """
+        Blocks until the calling thread's request may be sent.
+
+        Raises:
+            httpx.PoolTimeout: if not admitted within max_wait
+        """
+        deadline = time.monotonic() + self.max_wait
+        with self._lock:
+            waiter = self._enqueue(self.estimate_tokens(request), None)
+        while True:
+            with self._lock:
+                retry_in = self._try_admit(waiter)
+            if retry_in is None:
+                self._wake_all()
+                return Permit(self)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timeout(waiter, request)
+            waiter.event.wait(min(retry_in, remaining))
+            waiter.event.clear()
+
+    async def aacquire(self, request: httpx.Request) -> Permit:
+        """
+        Waits until the current task's request may be sent.
+
+        Raises:
+            httpx.PoolTimeout: if not admitted within max_wait
+        """
+        deadline = time.monotonic() + self.max_wait
+        with self._lock:
+            waiter = self._enqueue(self.estimate_tokens(request), asyncio.get_running_loop())
+        try:
+            while True:
+                with self._lock:
+                    retry_in = self._try_admit(waiter)
+                if retry_in is None:
+                    # The next waiter in line may fit as well
+                    self._wake_all()
+                    return Permit(self)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeout(waiter, request)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout=min(retry_in, remaining))
+                except asyncio.TimeoutError:
+                    pass
+                waiter.event.clear()
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _wake_all(self):
+        with self._lock:
+            waiters = list(self._waiters)
+        for waiter in waiters:
+            waiter.wake()
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._wake_all()
+
+    def _observe(self, response: httpx.Response, latency: float):
+        """AIMD update from a response's status and time to first byte."""
+        now = time.monotonic()
+        rate_limited = response.status_code == 429
+        slow = self.latency_target > 0 and latency > self.latency_target
+        if rate_limited or response.status_code >= 500:
+            # The API clients retry these
+            record_retry("upstream_429" if rate_limited else "upstream_5xx")
+        with self._lock:
+            if rate_limited:
+                retry_after = _retry_after_seconds(response)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            if rate_limited or slow:
+                # At most one decrease per latency window, so one burst counts once
+                if now - self._last_decrease >= max(1.0, latency):
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                    self.decreases += 1
+                    logger.warning(
+                        f"Upstream {'rate limited' if rate_limited else f'slow ({latency:.1f}s)'}; "
+                        f"concurrency limit now {int(self.limit)}"
+                    )
+            elif response.status_code < 500 and self.in_flight >= int(self.limit):
+                # Probe upward only while the limit is actually what holds calls back
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "waiting_by_priority": {
+                    p.name.lower(): sum(w.priority == p for w in self._waiters) for p in Priority
+                },
+                "tokens_available": int(self._tokens) if self.tokens_per_minute else None,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                "decreases": self.decreases,
+                "throttled": self.throttled,
+            }
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, permit: Permit):
+        self._stream = stream
+        self._permit = permit
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._permit.release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, permit: Permit):
+        self._stream = stream
+        self._permit = permit
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._permit.release()
+
+
+class GovernedTransport(httpx.BaseTransport):
+    """Sync transport that admits each request through the governor."""
+
+    def __init__(self, transport: httpx.BaseTransport, governor: UpstreamGovernor):
+        self._transport = transport
+        self._governor = governor
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        permit = self._governor.acquire(request)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            permit.release()
+            raise
+        permit.observe(response)
+        # The slot is held until the (possibly streamed) body is closed
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, permit),
+            extensions=response.extensions
+        )
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncGovernedTransport(httpx.AsyncBaseTransport):
+    """Async transport that admits each request through the governor."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, governor: UpstreamGovernor):
+        self._transport = transport
+        self._governor = governor
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        permit = await self._governor.aacquire(request)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            permit.release()
+            raise
+        permit.observe(response)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncReleasingStream(response.stream, permit),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
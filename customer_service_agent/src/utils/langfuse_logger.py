@@ -1,3 +1,121 @@
-# Setting up observability callback
-def setup_langfuse():
-    pass
+"""
+Sampled Langfuse tracing.
+One process-wide CallbackHandler is attached to a sampled share of
+requests only; the rest run without callbacks. Errors and slow requests
+outside the sample are still recorded as lightweight summary traces.
+Events are exported by the Langfuse SDK's background batch queue.
+"""
+from typing import Any, Dict, List, Optional
+from src.config import settings
+import random
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LangfuseTracer:
+    _instance: Optional["LangfuseTracer"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, sample_rate: float = 0.05, slow_request_seconds: float = 10.0):
+        """
+        Args:
+            sample_rate: Share of requests traced in full (0 to 1).
+            slow_request_seconds: Unsampled requests slower than this get a summary trace.
+        """
+        self.sample_rate = sample_rate
+        self.slow_request_seconds = slow_request_seconds
+        self.handler = self._create_handler()
+
+    @classmethod
+    def get_instance(cls) -> "LangfuseTracer":
+        """
+        Returns the process-wide tracer configured from settings.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        sample_rate=settings.LANGFUSE_SAMPLE_RATE,
+                        slow_request_seconds=settings.LANGFUSE_SLOW_REQUEST_SECONDS
+                    )
+        return cls._instance
+
+    @staticmethod
+    def _create_handler():
+        if not (settings.LANGFUSE_PUBLIC_KEY and settings.LANGFUSE_SECRET_KEY):
+            logger.info("Langfuse keys not configured; tracing disabled.")
+            return None
+        try:
+            from langfuse.callback import CallbackHandler
+
+            return CallbackHandler(
+                secret_key=settings.LANGFUSE_SECRET_KEY.get_secret_value(),
+                public_key=settings.LANGFUSE_PUBLIC_KEY,
+                host=settings.LANGFUSE_HOST,
+                flush_at=settings.LANGFUSE_FLUSH_AT,
+                flush_interval=settings.LANGFUSE_FLUSH_INTERVAL
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize Langfuse: {e}")
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self.handler is not None
+
+    def sample(self) -> bool:
+        """Decides whether the current request is traced in full."""
+        return self.enabled and random.random() < self.sample_rate
+
+    def callbacks(self, sampled: bool) -> List[Any]:
+        """Callbacks for a graph run: the shared handler if sampled, else none."""
+        return [self.handler] if sampled else []
+
+    def record_request(
+        self,
+        sampled: bool,
+        duration: float,
+        question: str,
+        route: Optional[str] = None,
+        error: Optional[str] = None
+    ):
+        """
+        Records a summary trace for an unsampled request that failed or was
+        slow. Sampled requests are already traced by the handler.
+        """
+        if sampled or not self.enabled:
+            return
+        slow = duration >= self.slow_request_seconds
+        if error is None and not slow:
+            return
+
+        metadata: Dict[str, Any] = {"duration_s": round(duration, 3), "route": route}
+        tags = [tag for tag, flag in (("error", error is not None), ("slow", slow)) if flag]
+        try:
+            # Enqueued for the background exporter; does not block
+            self.handler.langfuse.trace(
+                name="ask",
+                input=question,
+                output=error,
+                metadata=metadata,
+                tags=tags
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record Langfuse summary trace: {e}")
+
+    def flush(self):
+        """Blocks until queued events are exported; call at shutdown."""
+        if self.enabled:
+            try:
+                self.handler.flush()
+            except Exception as e:
+                logger.warning(f"Failed to flush Langfuse events: {e}")
+
+
+def setup_langfuse() -> LangfuseTracer:
+    """
+    Returns the process-wide tracer, creating its handler on first use.
+    """
+    return LangfuseTracer.get_instance()
@@ -0,0 +1,210 @@
+"""
+Latency metrics for the agent, exported in Prometheus format.
+
+- Graph nodes (timed_node) and the steps inside them: tools, query
+  refinement, query embedding, the sufficiency check (timed_step), as
+  duration histograms.
+- Streamed LLM calls (LLMStreamTimer): time to first token and tokens/sec.
+- Retries (web search reroutes, upstream 429/5xx) and cache hits/misses
+  as counters.
+- /ask admission: queue depth and active runs (gauges), queue wait
+  (histogram) and rejections by reason.
+
+Durations are also collected per request (start_request) so /ask can send
+a compact breakdown to the client at the end of the stream.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR so /metrics
+aggregates all of them.
+"""
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 300, 500)
+
+NODE_DURATION = Histogram(
+    "agent_node_duration_seconds", "Graph node run time.", ["node"], buckets=DURATION_BUCKETS
+)
+STEP_DURATION = Histogram(
+    "agent_step_duration_seconds", "Run time of tools and other steps within nodes.", ["step"], buckets=DURATION_BUCKETS
+)
+REQUEST_DURATION = Histogram(
+    "agent_request_duration_seconds", "Full /ask stream time.", ["route"], buckets=DURATION_BUCKETS
+)
+LLM_TTFT = Histogram(
+    "agent_llm_time_to_first_token_seconds", "Time from request to first streamed token.", ["call"], buckets=DURATION_BUCKETS
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "agent_llm_tokens_per_second", "Streaming rate after the first token.", ["call"], buckets=RATE_BUCKETS
+)
+RETRIES = Counter("agent_retries_total", "Retried work.", ["reason"])
+CACHE_REQUESTS = Counter("agent_cache_requests_total", "Cache lookups.", ["cache", "result"])
+# Summed over live worker processes when PROMETHEUS_MULTIPROC_DIR is set
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "agent_admission_queue_depth", "Requests waiting for a graph run slot.", multiprocess_mode="livesum"
+)
+ADMISSION_ACTIVE = Gauge(
+    "agent_admission_active", "Graph runs in progress.", multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "agent_admission_queue_wait_seconds", "Time requests waited for a slot, including rejected waits.",
+    buckets=DURATION_BUCKETS
+)
+ADMISSION_REJECTED = Counter("agent_admission_rejected_total", "Requests turned away.", ["reason"])
+
+
+class RequestTiming:
+    """Durations recorded while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes: Dict[str, float] = {}
+        self.steps: Dict[str, float] = {}
+        self.ttft: Optional[float] = None
+        self.retries = 0
+        # Steps run on worker threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, seconds: float):
+        with self._lock:
+            totals = self.nodes if kind == "node" else self.steps
+            totals[name] = totals.get(name, 0.0) + seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """Milliseconds per node and step; repeated runs (reroutes) are summed."""
+        ms = lambda seconds: round(seconds * 1000, 1)
+        with self._lock:
+            return {
+                "total_ms": ms(time.perf_counter() - self.started),
+                "ttft_ms": ms(self.ttft) if self.ttft is not None else None,
+                "nodes": {name: ms(s) for name, s in self.nodes.items()},
+                "steps": {name: ms(s) for name, s in self.steps.items()},
+                "retries": self.retries,
+            }
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def start_request() -> RequestTiming:
+    """Starts collecting timings for the current request (and tasks it spawns)."""
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def _record(kind: str, name: str, seconds: float):
+    (NODE_DURATION if kind == "node" else STEP_DURATION).labels(name).observe(seconds)
+    timing = _current.get()
+    if timing is not None:
+        timing.add(kind, name, seconds)
+
+
+def _timed(kind: str, name: str, func):
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record(kind, name, time.perf_counter() - started)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(kind, name, time.perf_counter() - started)
+    return wrapper
+
+
+def timed_node(name: str, func):
+    """Wraps a graph node (sync or async) to record its duration."""
+    return _timed("node", name, func)
+
+
+def timed_step(name: str):
+    """Decorator recording the duration of a tool or step (sync or async)."""
+    def decorator(func):
+        return _timed("step", name, func)
+    return decorator
+
+
+class step_timer:
+    """Context manager form of timed_step for code that is not a function."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record("step", self.name, time.perf_counter() - self.started)
+        return False
+
+
+class LLMStreamTimer:
+    """
+    Times a streamed LLM call. Call chunk() for every chunk received and
+    finish() once; each chunk is counted as one token, which is how
+    OpenAI-compatible APIs stream completions.
+    """
+
+    def __init__(self, call: str):
+        self.call = call
+        self.started = time.perf_counter()
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.chunks = 0
+
+    def chunk(self):
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.chunks += 1
+
+    def finish(self):
+        if self.first is None:
+            return
+        ttft = self.first - self.started
+        LLM_TTFT.labels(self.call).observe(ttft)
+        timing = _current.get()
+        if timing is not None and timing.ttft is None:
+            # From the start of the request, as the client sees it
+            timing.ttft = self.first - timing.started
+        if self.chunks > 1 and self.last > self.first:
+            LLM_TOKENS_PER_SECOND.labels(self.call).observe((self.chunks - 1) / (self.last - self.first))
+
+
+def record_retry(reason: str):
+    RETRIES.labels(reason).inc()
+    timing = _current.get()
+    if timing is not None:
+        timing.retries += 1
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,97 @@
+"""
+Server-sent event encoding for the /ask stream.
+Frames are encoded with orjson when it is installed, and consecutive
+token events are coalesced over a short time/size window so a response
+is sent as tens of frames rather than one frame per token.
+"""
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import time
+
+try:
+    import orjson
+
+    def dumps(event: Any) -> bytes:
+        return orjson.dumps(event)
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    def dumps(event: Any) -> bytes:
+        return json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_frame(event: Dict[str, Any]) -> bytes:
+    """Encodes one event as an SSE data frame."""
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+async def coalesce_tokens(
+    events: AsyncIterator[Dict[str, Any]],
+    window: float = 0.03,
+    max_chars: int = 256
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Merges consecutive token events.
+
+    Buffered tokens are flushed when max_chars is reached, when window
+    seconds have passed since the first buffered token, or before any
+    non-token event so ordering is preserved.
+
+    Args:
+        events: Stream events as passed to the graph's stream writer.
+        window: Maximum seconds a token is held back (0 disables coalescing).
+        max_chars: Buffered characters that force a flush.
+    """
+    if window <= 0:
+        async for event in events:
+            yield event
+        return
+
+    iterator = events.__aiter__()
+    buffer = []
+    size = 0
+    deadline: Optional[float] = None
+    pending: Optional[asyncio.Task] = None
+
+    def flush() -> Dict[str, Any]:
+        nonlocal buffer, size, deadline
+        event = {"type": "token", "content": "".join(buffer)}
+        buffer, size, deadline = [], 0, None
+        return event
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            # Wait for the next event, but no longer than the flush deadline
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield flush()
+                continue
+
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                break
+
+            if event.get("type") == "token" and isinstance(event.get("content"), str):
+                buffer.append(event["content"])
+                size += len(event["content"])
+                if deadline is None:
+                    deadline = time.monotonic() + window
+                if size >= max_chars:
+                    yield flush()
+                continue
+
+            if buffer:
+                yield flush()
+            yield event
+
+        if buffer:
+            yield flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,69 @@
+"""
+Token counting for prompt budgets.
+Uses tiktoken's o200k_base encoding, the closest public match for the
+gpt-oss tokenizer, and falls back to a characters-per-token estimate when
+the encoding cannot be loaded (e.g. offline without a cached BPE file).
+"""
+from typing import Optional
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENCODING_NAME = "o200k_base"
+# Rough average for English prose with o200k_base
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_failed = False
+_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                except Exception as e:
+                    _encoding_failed = True
+                    logger.warning(f"tiktoken encoding '{ENCODING_NAME}' unavailable ({e}); estimating token counts.")
+    return _encoding
+
+
+def load_encoding() -> bool:
+    """
+    Loads the encoding, downloading the BPE file on first use unless
+    TIKTOKEN_CACHE_DIR already holds it. Call at startup, off the event
+    loop, so no request waits on the download. Returns False when token
+    counts will be estimates.
+    """
+    return _get_encoding() is not None
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens in text."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text within max_tokens, cut back to a word boundary."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        prefix = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    # Avoid ending on a partial word (or a partially decoded character)
+    cut = prefix.rfind(" ")
+    return prefix[:cut] if cut > 0 else prefix
@@ -0,0 +1,116 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.admission import AdmissionController, AdmissionRejected, TokenBucketLimiter, client_address
+from src.utils.metrics import REGISTRY
+
+
+def test_requests_queue_in_order_and_inherit_released_slots():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait=1.0)
+        first = await controller.acquire()
+        second = asyncio.create_task(controller.acquire())
+        third = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert (controller.active, controller.queued) == (1, 2)
+
+        first.release()
+        (await second).release()
+        (await third).release()
+        return controller
+
+    controller = asyncio.run(run())
+    stats = controller.stats()
+    assert (stats["active"], stats["queued"], stats["admitted"]) == (0, 0, 3)
+    assert stats["queue_wait_max"] >= 0
+
+
+def test_full_queue_is_rejected_with_503():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=0, max_wait=1.0)
+        ticket = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        ticket.release()
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(run())
+    assert rejected.status_code == 503 and rejected.retry_after >= 1
+    assert controller.stats()["rejected_queue_full"] == 1
+
+
+def test_queue_wait_timeout_is_rejected_and_leaves_no_waiter():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=0.05)
+        ticket = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert controller.queued == 0
+        ticket.release()
+        ticket.release()  # Idempotent
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(run())
+    assert rejected.status_code == 503
+    assert (controller.active, controller.rejected_timeout) == (0, 1)
+
+
+def test_token_bucket_limits_each_client_separately():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+    with patch("src.utils.admission.time.monotonic", return_value=100.0):
+        limiter.acquire("a")
+        limiter.acquire("a")
+        limiter.acquire("b")
+        with pytest.raises(AdmissionRejected) as rejected:
+            limiter.acquire("a")
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == 1
+
+    # One token per second refills the bucket
+    with patch("src.utils.admission.time.monotonic", return_value=101.0):
+        limiter.acquire("a")
+
+
+def test_token_bucket_evicts_least_recent_clients():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=1, max_clients=2)
+    for client in ("a", "b", "c"):
+        limiter.acquire(client)
+    assert list(limiter._buckets) == ["b", "c"]
+
+
+def test_forwarded_for_is_only_used_behind_trusted_proxies():
+    trusted = ["10.0.0.0/8", "192.168.1.5"]
+    # Direct clients cannot pick their own key
+    assert client_address("203.0.113.9", "1.2.3.4", trusted) == "203.0.113.9"
+    assert client_address("10.0.0.2", "1.2.3.4", []) == "10.0.0.2"
+    # The rightmost untrusted hop is the client; spoofed hops to its left are ignored
+    assert client_address("10.0.0.2", "6.6.6.6, 198.51.100.7, 192.168.1.5", trusted) == "198.51.100.7"
+    assert client_address("10.0.0.2", None, trusted) == "10.0.0.2"
+
+
+def test_queue_depth_and_wait_are_exported():
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    waits_before = sample("agent_admission_queue_wait_seconds_count")
+    full_before = sample("agent_admission_rejected_total", reason="queue_full")
+
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait=1.0)
+        first = await controller.acquire()
+        second = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        depth = sample("agent_admission_queue_depth")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        first.release()
+        (await second).release()
+        return depth
+
+    assert asyncio.run(run()) == 1
+    assert sample("agent_admission_queue_depth") == 0
+    assert sample("agent_admission_active") == 0
+    assert sample("agent_admission_queue_wait_seconds_count") == waits_before + 2
+    assert sample("agent_admission_rejected_total", reason="queue_full") == full_before + 1
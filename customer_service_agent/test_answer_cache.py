@@ -0,0 +1,33 @@
+"""
+Tests for the semantic answer cache.
+"""
+from src.agent.answer_cache import AnswerCache
+
+EVENTS = [{"type": "token", "content": "Dear Valued Client"}]
+
+
+def test_similar_question_on_same_route_hits():
+    cache = AnswerCache(threshold=0.95)
+    cache.store("legal_inquiry", [1.0, 0.0, 0.0], "gen-1", EVENTS)
+
+    assert cache.lookup("legal_inquiry", [0.99, 0.05, 0.0], "gen-1").events == EVENTS
+    assert cache.lookup("legal_inquiry", [0.0, 1.0, 0.0], "gen-1") is None
+    assert cache.lookup("general_inquiry", [1.0, 0.0, 0.0], "gen-1") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1}
+
+
+def test_generation_change_ttl_and_size_bound(monkeypatch):
+    cache = AnswerCache(max_size=2, ttl=60)
+    cache.store("legal_inquiry", [1.0, 0.0], "gen-1", EVENTS)
+    assert cache.lookup("legal_inquiry", [1.0, 0.0], "gen-2") is None
+    assert cache.stats()["size"] == 0
+
+    for n in range(3):
+        cache.store("legal_inquiry", [1.0, float(n)], "gen-2", EVENTS)
+    assert cache.stats()["size"] == 2
+
+    import src.agent.answer_cache as module
+    now = module.time.monotonic()
+    monkeypatch.setattr(module.time, "monotonic", lambda: now + 61)
+    assert cache.lookup("legal_inquiry", [1.0, 2.0], "gen-2") is None
+    assert cache.stats()["size"] == 0
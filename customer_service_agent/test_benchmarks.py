@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from benchmarks.load_test import summarize
+from benchmarks.stubs import StubConfig, create_stub_app, hash_embedding
+
+
+def test_hash_embedding_places_shared_words_close():
+    query = np.array(hash_embedding("PAYE remittance deadline", 256))
+    related = np.array(hash_embedding("The PAYE remittance deadline is the 10th", 256))
+    unrelated = np.array(hash_embedding("Shipping takes five business days", 256))
+    assert abs(np.linalg.norm(query) - 1) < 1e-5
+    assert query @ related > query @ unrelated
+
+
+def test_stub_streams_chat_with_inline_verdict():
+    client = TestClient(create_stub_app(StubConfig(chat_ttft=0, chat_tokens_per_second=0, completion_tokens=3)))
+    body = {
+        "model": "stub",
+        "stream": True,
+        "messages": [{"role": "system", "content": "Begin with [[SUFFICIENT]]"}, {"role": "user", "content": "Hi"}],
+    }
+    lines = [line for line in client.post("/v1/chat/completions", json=body).text.splitlines() if line.startswith("data: ")]
+    assert lines[-1] == "data: [DONE]"
+    content = "".join(json.loads(line[6:])["choices"][0]["delta"].get("content") or "" for line in lines[:-1])
+    assert content.startswith("[[SUFFICIENT]] ") and len(content.split()) == 4
+
+
+def test_stub_embeddings_match_hash_embedding():
+    client = TestClient(create_stub_app(StubConfig(embedding_latency=0, embedding_dim=32)))
+    data = client.post("/v1/embeddings", json={"input": ["tax levy"], "model": "stub"}).json()["data"]
+    assert data[0]["embedding"] == hash_embedding("tax levy", 32)
+
+
+def test_summarize_reports_per_route_percentiles_and_errors():
+    results = [
+        {"route": "legal_inquiry", "status": 200, "error": None, "ttft": 0.1 * i, "latency": 1.0 * i}
+        for i in range(1, 11)
+    ] + [{"route": None, "status": 503, "error": "HTTP 503", "ttft": None, "latency": 0.01}]
+
+    report = summarize(results, wall_seconds=5.0)
+
+    assert report["overall"]["requests"] == 11
+    assert report["overall"]["errors"] == 1
+    assert report["overall"]["throughput_rps"] == 2.0
+    assert report["overall"]["status_codes"] == {"200": 10, "503": 1}
+    legal = report["routes"]["legal_inquiry"]
+    assert legal["latency"]["p50"] == 5.5 and legal["latency"]["p99"] > legal["latency"]["p95"]
+    assert report["routes"]["unknown"]["error_rate"] == 1.0
+
+
+def test_retrieval_scores_first_relevant_rank():
+    from langchain_core.documents import Document
+    from benchmarks.retrieval import first_relevant_rank, score
+
+    hits = [
+        Document(page_content="a", metadata={"source": "data/docs/Act.pdf", "page": 3}),
+        Document(page_content="b", metadata={"source": "data/docs/Act.pdf", "page": 7}),
+        Document(page_content="c", metadata={"source": "data/docs/returns.txt"}),
+    ]
+    assert first_relevant_rank(hits, [{"source": "Act.pdf", "page": 7}]) == 2
+    assert first_relevant_rank(hits, [{"source": "returns.txt"}]) == 3
+    assert first_relevant_rank(hits, [{"source": "Act.pdf", "page": 9}]) is None
+
+    result = score([1, 2, None, 5], ks=[1, 3, 5])
+    assert result["recall"] == {"1": 0.25, "3": 0.5, "5": 0.75}
+    assert result["mrr"] == round((1 + 0.5 + 0.2) / 4, 4)
+
+
+def test_golden_set_ids_are_unique_and_point_at_docs():
+    import os
+    from benchmarks.retrieval import DEFAULT_GOLDEN, load_golden
+
+    golden = load_golden(DEFAULT_GOLDEN)
+    assert len({row["id"] for row in golden}) == len(golden)
+    sources = {item["source"] for row in golden for item in row["expected"]}
+    assert sources <= set(os.listdir(os.path.join("data", "docs")))
@@ -0,0 +1,12 @@
+from src.utils import clients
+
+
+def test_model_clients_share_one_connection_pool():
+    chat = clients.get_chat_model(temperature=0)
+    streaming_chat = clients.get_chat_model(temperature=0.3, streaming=True)
+    embeddings = clients.get_embeddings()
+
+    assert clients.get_chat_model(temperature=0) is chat
+    assert chat.http_async_client is streaming_chat.http_async_client is embeddings.http_async_client
+    assert chat.http_client is embeddings.http_client
+    assert clients.get_async_tavily_client()._client._transport is clients.get_async_transport()
@@ -0,0 +1,60 @@
+from langchain_core.documents import Document
+
+from src.agent.context import NO_DATA_MESSAGE, TRIMMED_MARKER, pack_documents, prepare_context
+from src.utils.tokens import count_tokens, truncate_tokens
+
+
+def _doc(text, score=None, source="act.pdf"):
+    metadata = {"source": source}
+    if score is not None:
+        metadata["score"] = score
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_pack_documents_keeps_retrieval_order_within_budget():
+    # Hybrid search ranked an exact statutory match (BM25 only, no vector score) first
+    lexical = _doc("lexical " * 50)
+    vector = _doc("vector " * 50, 0.9)
+    weak = _doc("weak " * 50, 0.1)
+    budget = count_tokens("Document 1 (Source: act.pdf):\n" + lexical.page_content) + 2
+
+    parts, used = pack_documents([lexical, vector, weak], budget, min_chunk_tokens=10)
+
+    assert used <= budget
+    assert len(parts) == 1
+    assert parts[0].startswith("Document 1 (Source: act.pdf):\nlexical")
+
+
+def test_pack_documents_trims_the_next_chunk_and_drops_the_rest():
+    best = _doc("best " * 20, 0.9)
+    middle = _doc("middle " * 200, 0.6)
+    worst = _doc("worst " * 20, 0.1)
+
+    parts, used = pack_documents([best, middle, worst], budget=120, min_chunk_tokens=10)
+
+    assert used <= 120
+    assert len(parts) == 2
+    assert parts[1].startswith("Document 2") and parts[1].endswith(TRIMMED_MARKER)
+    assert not any("worst" in part for part in parts)
+
+
+def test_pack_documents_drops_a_chunk_that_would_be_trimmed_too_short():
+    parts, _ = pack_documents([_doc("word " * 200, 0.9)], budget=30, min_chunk_tokens=64)
+    assert parts == []
+
+
+def test_prepare_context_always_includes_order_data():
+    context = prepare_context([{"result": "Order 42: shipped"}], [_doc("clause " * 500, 0.9)], budget=60)
+    assert context.startswith("ORDER DATA:\nOrder 42: shipped")
+    assert count_tokens(context) <= 60
+
+
+def test_prepare_context_without_data():
+    assert prepare_context([], []) == NO_DATA_MESSAGE
+
+
+def test_truncate_tokens_respects_limit_and_word_boundaries():
+    text = "alpha beta gamma delta " * 20
+    cut = truncate_tokens(text, 10)
+    assert count_tokens(cut) <= 10
+    assert text.startswith(cut) and not cut.endswith(" ")
@@ -0,0 +1,79 @@
+"""
+Tests for the query embedding cache.
+"""
+import asyncio
+import threading
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.database.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+def test_repeated_queries_hit_memory_tier():
+    embeddings = CountingEmbedding(size=8)
+    cached = CachedEmbeddings(embeddings, EmbeddingCache(max_size=10), model="m")
+
+    first = cached.embed_query("Education tax rate")
+    second = cached.embed_query("  education   TAX rate ")
+
+    assert second == first
+    assert embeddings.calls == 1
+    assert cached.cache.stats()["memory_hits"] == 1
+    assert cached.cache.stats()["misses"] == 1
+
+
+def test_lru_evicts_oldest_entry():
+    cache = EmbeddingCache(max_size=2)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    cache.get("m", "a")
+    cache.put("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(db_path=db_path).put("m", "refund policy", [0.5, 0.25])
+
+    cache = EmbeddingCache(db_path=db_path)
+    assert cache.get("m", "refund policy") == [0.5, 0.25]
+    assert cache.get("other-model", "refund policy") is None
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_async_queries_keep_disk_io_off_the_event_loop(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.sqlite3"))
+    disk_threads = []
+    for name in ("_get_disk", "_write_disk"):
+        method = getattr(cache, name)
+
+        def recording(*args, _method=method):
+            disk_threads.append(threading.get_ident())
+            return _method(*args)
+        setattr(cache, name, recording)
+
+    cached = CachedEmbeddings(CountingEmbedding(size=8), cache, model="m")
+
+    async def run():
+        first = await cached.aembed_query("refund policy")
+        second = await cached.aembed_query("refund policy")
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(run())
+
+    assert second == first
+    # One disk read for the miss and one write; the repeat is a memory hit
+    assert len(disk_threads) == 2
+    assert loop_thread not in disk_threads
+    assert EmbeddingCache(db_path=str(tmp_path / "cache.sqlite3")).get("m", "refund policy") == pytest.approx(first, rel=1e-6)
@@ -0,0 +1,89 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from langchain_core.documents import Document
+
+from src.agent.nodes import generate as generate_node
+from src.agent.nodes.generate import VerdictParser
+
+
+def _stream(chunks):
+    async def astream(inputs):
+        for chunk in chunks:
+            yield chunk
+    chain = MagicMock()
+    chain.astream = astream
+    return chain
+
+
+def _run(chunks, retry_count=0):
+    state = {
+        "question": "What is the levy?",
+        "documents": [Document(page_content="The levy is 5%.")],
+        "mongo_data": [],
+        "retry_count": retry_count,
+    }
+    written = []
+    with patch.object(generate_node, "inline_chain", _stream(chunks)), \
+            patch.object(generate_node, "get_stream_writer", return_value=written.append), \
+            patch.object(generate_node.settings, "GENERATION_SUFFICIENCY_MODE", "inline"):
+        result = asyncio.run(generate_node.generate(state))
+    return result, written
+
+
+def test_verdict_parser_handles_split_markers():
+    parser = VerdictParser()
+    assert parser.feed(" [[SUFF") == ""
+    assert parser.feed("ICIENT]] Dear") == "Dear"
+    assert parser.feed(" client") == " client"
+    assert parser.verdict is True
+
+    parser = VerdictParser()
+    assert parser.feed("Dear client") == "Dear client"
+    assert parser.verdict is None
+
+
+def test_sufficient_marker_is_stripped_from_stream():
+    result, written = _run(["[[SUFFICIENT]]\n", "The levy ", "is 5%."])
+
+    assert result == {"final_answer": "The levy is 5%.", "context_sufficient": True}
+    assert "".join(e["content"] for e in written if e["type"] == "token") == "The levy is 5%."
+
+
+def test_insufficient_marker_triggers_web_search_without_tokens():
+    result, written = _run(["[[INSUFF", "ICIENT]]", "ignored"])
+
+    assert result["needs_web_search"] is True
+    assert result["context_sufficient"] is False
+    assert not [e for e in written if e["type"] == "token"]
+
+
+def test_insufficient_verdict_closes_the_model_stream():
+    closed = []
+
+    async def astream(inputs):
+        try:
+            for chunk in ["[[INSUFFICIENT]]", "never", "read"]:
+                yield chunk
+        finally:
+            closed.append(True)
+
+    state = {
+        "question": "What is the levy?",
+        "documents": [Document(page_content="The levy is 5%.")],
+        "mongo_data": [],
+        "retry_count": 0,
+    }
+
+    async def run():
+        result = await generate_node.generate(state)
+        # Checked before the event loop can finalize an abandoned generator
+        return result, list(closed)
+
+    with patch.object(generate_node, "inline_chain", MagicMock(astream=astream)), \
+            patch.object(generate_node, "get_stream_writer", return_value=lambda event: None), \
+            patch.object(generate_node.settings, "GENERATION_SUFFICIENCY_MODE", "inline"):
+        result, closed_on_return = asyncio.run(run())
+
+    assert result["needs_web_search"] is True
+    assert closed_on_return == [True]
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils.governor import (
+    AsyncGovernedTransport,
+    GovernedTransport,
+    Priority,
+    UpstreamGovernor,
+    upstream_priority,
+)
+
+
+def _request(body=b"x" * 400, path="/v1/chat/completions"):
+    return httpx.Request("POST", f"http://upstream{path}", content=body)
+
+
+def test_429_halves_the_limit_and_saturated_success_grows_it_back():
+    governor = UpstreamGovernor(initial_concurrency=2)
+    transport = GovernedTransport(
+        httpx.MockTransport(lambda request: httpx.Response(429, headers={"retry-after": "0"})), governor
+    )
+    with httpx.Client(transport=transport) as client:
+        assert client.post("http://upstream/v1/chat/completions").status_code == 429
+    assert governor.limit == 1 and governor.in_flight == 0
+
+    ok = GovernedTransport(httpx.MockTransport(lambda request: httpx.Response(200, json={})), governor)
+    with httpx.Client(transport=ok) as client:
+        for _ in range(3):
+            client.post("http://upstream/v1/chat/completions")
+    # Only the first call saturated the limit of 1; later ones leave it unused
+    assert governor.limit == 2
+
+
+def test_retry_after_pauses_all_callers():
+    governor = UpstreamGovernor(max_wait=0.05)
+    transport = GovernedTransport(
+        httpx.MockTransport(lambda request: httpx.Response(429, headers={"retry-after": "30"})), governor
+    )
+    with httpx.Client(transport=transport) as client:
+        client.post("http://upstream/v1/chat/completions")
+        with pytest.raises(httpx.PoolTimeout):
+            client.post("http://upstream/v1/chat/completions")
+    assert governor.stats()["paused_for"] > 25
+    assert governor.stats()["waiting"] == 0
+
+
+def test_streamed_body_holds_the_slot_until_closed():
+    async def run():
+        governor = UpstreamGovernor(initial_concurrency=1, max_concurrency=1, max_wait=0.05)
+        transport = AsyncGovernedTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, content=b"data")), governor
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("POST", "http://upstream/v1/chat/completions") as response:
+                assert governor.in_flight == 1
+                with pytest.raises(httpx.PoolTimeout):
+                    await client.post("http://upstream/v1/chat/completions")
+                await response.aread()
+            assert governor.in_flight == 0
+            assert (await client.post("http://upstream/v1/chat/completions")).status_code == 200
+
+    asyncio.run(run())
+
+
+def test_waiters_are_admitted_by_priority():
+    async def run():
+        governor = UpstreamGovernor(initial_concurrency=1, latency_target=0)
+        held = await governor.aacquire(_request())
+        order = []
+
+        async def call(priority):
+            with upstream_priority(priority):
+                permit = await governor.aacquire(_request())
+            order.append(priority)
+            permit.release()
+
+        tasks = [asyncio.create_task(call(p)) for p in (Priority.BACKGROUND, Priority.STANDARD, Priority.INTERACTIVE)]
+        await asyncio.sleep(0.01)
+        assert governor.stats()["waiting"] == 3
+        held.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == [Priority.INTERACTIVE, Priority.STANDARD, Priority.BACKGROUND]
+
+
+def test_background_calls_use_only_their_share():
+    governor = UpstreamGovernor(initial_concurrency=4, background_share=0.5, max_wait=0.05)
+    with upstream_priority(Priority.BACKGROUND):
+        permits = [governor.acquire(_request()) for _ in range(2)]
+        with pytest.raises(httpx.PoolTimeout):
+            governor.acquire(_request())
+    # Interactive calls still get the rest of the limit
+    with upstream_priority(Priority.INTERACTIVE):
+        permits += [governor.acquire(_request()) for _ in range(2)]
+    assert governor.in_flight == 4
+    for permit in permits:
+        permit.release()
+
+
+def test_token_budget_charges_prompt_and_completion_estimates():
+    governor = UpstreamGovernor(tokens_per_minute=1000, completion_tokens=500, max_wait=0.05)
+    assert governor.estimate_tokens(_request(b"x" * 400)) == 600
+    assert governor.estimate_tokens(_request(b"x" * 400, path="/v1/embeddings")) == 100
+
+    governor.acquire(_request(b"x" * 400)).release()
+    with pytest.raises(httpx.PoolTimeout):
+        governor.acquire(_request(b"x" * 400))
@@ -0,0 +1,164 @@
+"""
+Tests for incremental ingestion with the content-hash manifest.
+Uses deterministic fake embeddings, so no embedding API is called.
+"""
+from unittest.mock import patch
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.database.vector_db import VectorDB
+from src.scripts.ingest import ingest
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def setup_dirs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "refunds.txt").write_text("Refunds are issued within 14 days of a return.")
+    (docs / "tax.md").write_text("The education tax levy applies to companies.")
+    embeddings = CountingEmbedding(size=8)
+    vdb = VectorDB(persist_directory=str(tmp_path / "index"), embedding_function=embeddings)
+    return docs, vdb, embeddings
+
+
+def test_rerun_is_idempotent(tmp_path):
+    docs, vdb, embeddings = setup_dirs(tmp_path)
+
+    ingest(vdb, docs_dir=str(docs))
+    assert embeddings.embedded == 2
+    generation = vdb.generation
+
+    plan = ingest(vdb, docs_dir=str(docs))
+    assert plan.add_ids == [] and plan.delete_ids == []
+    assert embeddings.embedded == 2
+    assert len(vdb.existing_ids()) == 2
+    assert vdb.generation == generation
+
+
+def test_changed_and_removed_files(tmp_path):
+    docs, vdb, embeddings = setup_dirs(tmp_path)
+    ingest(vdb, docs_dir=str(docs))
+    old_ids = vdb.existing_ids()
+
+    (docs / "tax.md").write_text("The education tax levy is 3 percent of assessable profit.")
+    (docs / "refunds.txt").unlink()
+    (docs / "privacy.txt").write_text("Personal data is processed lawfully.")
+
+    plan = ingest(vdb, docs_dir=str(docs))
+
+    assert sorted(plan.changed_files) == ["privacy.txt", "tax.md"]
+    assert plan.removed_files == ["refunds.txt"]
+    assert embeddings.embedded == 4
+    assert len(vdb.existing_ids()) == 2
+    assert not old_ids & vdb.existing_ids()
+
+    # A fresh process sees the same state and has nothing to do
+    reloaded = VectorDB(persist_directory=vdb.persist_directory, embedding_function=embeddings)
+    plan = ingest(reloaded, docs_dir=str(docs))
+    assert plan.add_ids == [] and plan.delete_ids == []
+
+
+def test_parallel_parse_matches_serial_and_caches_pages(tmp_path):
+    from src.scripts.parse import PageCache, load_files
+
+    files = {"Data-Privacy-Policy.pdf": "data/docs/Data-Privacy-Policy.pdf"}
+    digests = {"Data-Privacy-Policy.pdf": "digest"}
+    cache = PageCache(str(tmp_path / "pages"))
+
+    serial = load_files(files, digests, workers=1)
+    parallel = load_files(files, digests, workers=2, pages_per_task=3, page_cache=cache)
+    cached = load_files(files, digests, workers=1, page_cache=cache)
+
+    as_tuples = lambda docs: [(d.page_content, d.metadata) for d in docs]
+    assert serial["Data-Privacy-Policy.pdf"]
+    assert as_tuples(serial["Data-Privacy-Policy.pdf"]) == as_tuples(parallel["Data-Privacy-Policy.pdf"])
+    assert as_tuples(serial["Data-Privacy-Policy.pdf"]) == as_tuples(cached["Data-Privacy-Policy.pdf"])
+    assert cache.get("digest") is not None
+
+
+def test_batch_embedder_retries_and_resumes(tmp_path):
+    import asyncio
+    import numpy as np
+    from src.database.batch_embedder import BatchEmbedder, EmbeddingCheckpoint
+
+    class FlakyEmbedding(DeterministicFakeEmbedding):
+        batches: list = []
+
+        async def aembed_documents(self, texts):
+            self.batches.append(len(texts))
+            if len(self.batches) == 1:
+                raise asyncio.TimeoutError()
+            return self.embed_documents(texts)
+
+    texts = [f"chunk {n}" for n in range(20)]
+    ids = [f"id-{n}" for n in range(20)]
+    checkpoint = EmbeddingCheckpoint(str(tmp_path / "checkpoint.sqlite3"))
+    checkpoint.put_many(ids[:5], DeterministicFakeEmbedding(size=8).embed_documents(texts[:5]))
+
+    embeddings = FlakyEmbedding(size=8)
+    embedder = BatchEmbedder(
+        embeddings, max_in_flight=2, batch_size=8, min_batch_size=2, base_delay=0, checkpoint=checkpoint
+    )
+    vectors = asyncio.run(embedder.embed(texts, ids))
+
+    # Checkpointed vectors round-trip through float32
+    assert np.allclose(vectors, DeterministicFakeEmbedding(size=8).embed_documents(texts), atol=1e-6)
+    # The timeout halved the batch size and the 5 checkpointed chunks were skipped
+    assert embeddings.batches[0] == 8 and min(embeddings.batches[1:]) <= 4
+    assert sum(embeddings.batches[1:]) == 15
+    assert len(checkpoint.get_many(ids)) == 20
+
+
+def test_batch_embedder_splits_failed_batches_and_caps_retry_after():
+    import asyncio
+    import httpx
+    import openai
+    from src.database.batch_embedder import BatchEmbedder
+
+    response = httpx.Response(429, headers={"retry-after": "3600"}, request=httpx.Request("POST", "http://x"))
+
+    class RateLimitedEmbedding(DeterministicFakeEmbedding):
+        batches: list = []
+
+        async def aembed_documents(self, texts):
+            self.batches.append(len(texts))
+            if len(self.batches) == 1:
+                raise openai.RateLimitError("slow down", response=response, body=None)
+            return self.embed_documents(texts)
+
+    embeddings = RateLimitedEmbedding(size=8)
+    embedder = BatchEmbedder(embeddings, max_in_flight=1, batch_size=8, min_batch_size=2, max_delay=0.01)
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    texts = [f"chunk {n}" for n in range(8)]
+    with patch("src.database.batch_embedder.asyncio.sleep", sleep):
+        vectors = asyncio.run(embedder.embed(texts, [f"id-{n}" for n in range(8)]))
+
+    assert vectors == DeterministicFakeEmbedding(size=8).embed_documents(texts)
+    # The rejected batch of 8 is retried as two halves, after at most max_delay
+    assert embeddings.batches == [8, 4, 4]
+    assert delays == [0.01]
+
+
+def test_checkpoint_only_resumes_vectors_of_the_same_model(tmp_path):
+    from src.database.batch_embedder import EmbeddingCheckpoint
+
+    path = str(tmp_path / "checkpoint.sqlite3")
+    old = EmbeddingCheckpoint(path, model="text-embedding-3-small")
+    old.put_many(["id-1"], [[0.5, 0.25]])
+    old.close()
+
+    assert EmbeddingCheckpoint(path, model="text-embedding-3-large").get_many(["id-1"]) == {}
+    assert EmbeddingCheckpoint(path, model="text-embedding-3-small").get_many(["id-1"]) == {"id-1": [0.5, 0.25]}
@@ -95,3 +95,8 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\n❌ Test failed: {e}")
         sys.exit(1)
+
+def test_startup_loads_token_encoding_off_the_request_path():
+    """The tiktoken BPE file is fetched during startup, not by the first request."""
+    with patch("src.utils.tokens._get_encoding") as get_encoding, TestClient(app):
+        assert get_encoding.call_count == 1
@@ -0,0 +1,134 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agent import memory
+from src.agent.memory import compact_history, format_history, split_history, update_memory
+
+SESSION = {"configurable": {"thread_id": "session-1"}}
+
+
+def _messages(count, words=50):
+    return [
+        (HumanMessage if i % 2 == 0 else AIMessage)(content=" ".join([f"m{i}"] * words), id=f"id-{i}")
+        for i in range(count)
+    ]
+
+
+def test_split_history_keeps_the_newest_suffix_within_budget():
+    messages = _messages(6)
+    older, recent = split_history(messages, budget=2 * memory.message_tokens(messages[-1]))
+    assert recent == messages[-2:]
+    assert older == messages[:-2]
+
+
+def test_format_history_includes_summary_and_recent_turns():
+    messages = [HumanMessage(content="Where is order 42?"), AIMessage(content="It shipped.")]
+    history = format_history("Client asked about PAYE.", messages, budget=1000)
+    assert history.splitlines() == [
+        "Summary of earlier conversation: Client asked about PAYE.",
+        "Client: Where is order 42?",
+        "Assistant: It shipped.",
+    ]
+    assert format_history(None, [], budget=1000) == "None"
+
+
+def test_update_memory_is_a_no_op_without_a_session():
+    state = {"question": "Hi", "final_answer": "Hello", "chat_history": []}
+    assert asyncio.run(update_memory(state, {})) == {}
+
+
+def test_update_memory_appends_the_turn_under_budget():
+    state = {"question": "Hi", "final_answer": "Hello", "chat_history": []}
+    result = asyncio.run(update_memory(state, SESSION))
+    assert [m.content for m in result["chat_history"]] == ["Hi", "Hello"]
+    assert "summary" not in result
+
+
+def _session_app():
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.graph import END, START, StateGraph
+
+    from src.agent.state import AgentState
+
+    async def answer(state):
+        return {"final_answer": f"turn {len(state.get('chat_history') or []) // 2 + 1}"}
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("answer", answer)
+    workflow.add_node("memory", update_memory)
+    workflow.add_edge(START, "answer")
+    workflow.add_edge("answer", "memory")
+    workflow.add_edge("memory", END)
+    return workflow.compile(checkpointer=InMemorySaver())
+
+
+def test_update_memory_never_calls_the_model():
+    history = _messages(10, words=100)
+    state = {"question": "Next?", "final_answer": "Answer.", "chat_history": history}
+    with patch.object(memory.settings, "MEMORY_HISTORY_TOKENS", 10), \
+            patch.object(memory, "summary_prompt", None):
+        result = asyncio.run(update_memory(state, SESSION))
+    assert [m.content for m in result["chat_history"]] == ["Next?", "Answer."]
+    assert "summary" not in result
+
+
+def test_compact_history_folds_older_turns_after_the_turn():
+    app = _session_app()
+    summarizer = MagicMock()
+    summarizer.__or__ = lambda self, other: summarizer
+    summarizer.ainvoke = MagicMock(side_effect=lambda inputs: asyncio.sleep(0, result=" Folded. "))
+
+    async def run():
+        for n in range(5):
+            await app.ainvoke(memory.turn_input(" ".join([f"q{n}"] * 100)), SESSION)
+        with patch.object(memory.settings, "MEMORY_HISTORY_TOKENS", 400), \
+                patch.object(memory.settings, "MEMORY_RECENT_TOKENS", 150), \
+                patch.object(memory, "summary_prompt", summarizer):
+            compacted = await compact_history(app, SESSION)
+        return compacted, (await app.aget_state(SESSION)).values
+
+    compacted, values = asyncio.run(run())
+
+    assert compacted
+    assert values["summary"] == "Folded."
+    # The latest exchange stays verbatim
+    assert [m.content for m in values["chat_history"]][-1] == "turn 5"
+    assert len(values["chat_history"]) < 10
+
+
+def test_mongodb_sessions_fail_loudly_until_opened():
+    import pytest
+
+    with patch.object(memory.settings, "MEMORY_BACKEND", "mongodb"), \
+            patch.object(memory, "_checkpointer", None):
+        with pytest.raises(RuntimeError):
+            memory.get_checkpointer()
+
+
+def test_session_graph_carries_history_between_turns():
+    app = _session_app()
+
+    async def run():
+        first = await app.ainvoke(memory.turn_input("One"), SESSION)
+        second = await app.ainvoke(memory.turn_input("Two"), SESSION)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["final_answer"] == "turn 1"
+    assert second["final_answer"] == "turn 2"
+    assert [m.content for m in second["chat_history"]] == ["One", "turn 1", "Two", "turn 2"]
+
+
+def test_session_request_gets_503_without_session_memory():
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from src.agent import graph
+
+    with patch.object(memory.settings, "MEMORY_BACKEND", "mongodb"), \
+            patch.object(memory, "_checkpointer", None), \
+            patch.object(graph, "_session_graph", None):
+        response = TestClient(app).post("/ask", json={"question": "Hi", "session_id": "s-1"})
+    assert response.status_code == 503
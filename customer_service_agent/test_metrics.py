@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from src.utils.metrics import (
+    LLMStreamTimer,
+    NODE_DURATION,
+    REGISTRY,
+    record_retry,
+    start_request,
+    timed_node,
+    timed_step,
+)
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_nodes_and_steps_are_recorded_per_request_and_in_histograms():
+    @timed_step("test_lookup")
+    def lookup():
+        time.sleep(0.01)
+        return "order"
+
+    async def node(state, config=None):
+        # Steps on worker threads report to the same request
+        return {"result": await asyncio.to_thread(lookup), "config": config}
+
+    wrapped = timed_node("test_node", node)
+    before = _sample("agent_node_duration_seconds_count", node="test_node")
+
+    async def run():
+        timing = start_request()
+        result = await wrapped({}, config={"k": 1})
+        record_retry("test")
+        return timing, result
+
+    timing, result = asyncio.run(run())
+
+    assert result == {"result": "order", "config": {"k": 1}}
+    assert wrapped.__wrapped__ is node
+    assert _sample("agent_node_duration_seconds_count", node="test_node") == before + 1
+    summary = timing.summary()
+    assert summary["steps"]["test_lookup"] >= 10
+    assert summary["nodes"]["test_node"] >= summary["steps"]["test_lookup"]
+    assert summary["retries"] == 1
+
+
+def test_stream_timer_records_ttft_and_rate():
+    async def run():
+        timing = start_request()
+        timer = LLMStreamTimer("test_call")
+        await asyncio.sleep(0.02)
+        for _ in range(5):
+            timer.chunk()
+            await asyncio.sleep(0.005)
+        timer.finish()
+        return timing
+
+    timing = asyncio.run(run())
+
+    assert timing.ttft >= 0.02
+    assert _sample("agent_llm_time_to_first_token_seconds_count", call="test_call") == 1
+    assert _sample("agent_llm_tokens_per_second_count", call="test_call") == 1
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    from main import app
+
+    NODE_DURATION.labels("test_endpoint").observe(0.1)
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'agent_node_duration_seconds_count{node="test_endpoint"} 1.0' in response.text
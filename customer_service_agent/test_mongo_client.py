@@ -0,0 +1,41 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.agent.tools import aquery_order_tool
+from src.database import mongo_client
+from src.database.mongo_client import AsyncMongoDBClient, aquery_order
+
+
+def _fake_database(find_one):
+    collection = MagicMock()
+    collection.find_one = find_one
+    return {"orders": collection}
+
+
+def test_aquery_order_returns_document_with_string_id():
+    find_one = AsyncMock(return_value={"_id": 42, "order_id": "ORD-1", "status": "shipped"})
+    with patch.object(AsyncMongoDBClient, "get_database", return_value=_fake_database(find_one)):
+        order = asyncio.run(aquery_order("ORD-1"))
+
+    find_one.assert_awaited_once_with({"order_id": "ORD-1"})
+    assert order == {"_id": "42", "order_id": "ORD-1", "status": "shipped"}
+
+
+def test_aquery_order_tool_reports_missing_order():
+    find_one = AsyncMock(return_value=None)
+    with patch.object(AsyncMongoDBClient, "get_database", return_value=_fake_database(find_one)):
+        result = asyncio.run(aquery_order_tool(" ORD-404 "))
+
+    assert result == "Error: Order with ID 'ORD-404' not found."
+
+
+def test_async_client_uses_pool_settings():
+    with patch.object(mongo_client, "AsyncMongoClient") as client_cls, \
+            patch.object(AsyncMongoDBClient, "_instance", None):
+        client_cls.return_value.admin.command = AsyncMock(return_value={"ok": 1})
+        asyncio.run(AsyncMongoDBClient.connect())
+
+        kwargs = client_cls.call_args.kwargs
+        assert kwargs["maxPoolSize"] == mongo_client.settings.MONGO_MAX_POOL_SIZE
+        assert kwargs["serverSelectionTimeoutMS"] == mongo_client.settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+        client_cls.return_value.admin.command.assert_awaited_once_with("ping")
@@ -0,0 +1,62 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+
+from src.agent.intent_centroids import IntentCentroids, compute_centroids, save_centroids
+from src.agent.nodes import orchestrator
+from src.agent.nodes.orchestrator import match_keywords, route_question
+
+
+def test_keywords_match_whole_words_only():
+    # "act" in "contact" and "ship" in "relationship" used to route these
+    assert route_question("How do I contact support?")["route"] == "general_inquiry"
+    assert route_question("Tell me about our relationship manager")["route"] == "general_inquiry"
+
+    assert route_question("What does the Tax Act say about levies?")["route"] == "legal_inquiry"
+    assert route_question("Where are my orders?") == {
+        "route": "order_inquiry",
+        "intent": "check_order_status",
+        "needed_sources": ["mongo_db"],
+    }
+    assert {"terms", "terms of service"} <= match_keywords("Read the terms of service")
+
+
+def test_keywords_match_past_tense_and_ing_forms():
+    for question in ("I ordered a book last week", "It shipped on Monday", "I tracked it yesterday"):
+        assert route_question(question)["route"] == "order_inquiry", question
+
+    assert match_keywords("I ordered it and it was shipped") == {"order", "shipped"}
+    assert route_question("I tracked my order")["intent"] == "check_order_status"
+    for question in (
+        "I cancelled my order", "I want a cancellation of order ORD1234",
+        "I am cancelling my order", "Canceling my order", "My order was canceled",
+    ):
+        assert route_question(question)["intent"] == "cancel_order", question
+    # Suffixes still need a word boundary
+    assert route_question("I contacted the team")["route"] == "general_inquiry"
+
+
+def test_centroids_route_questions_keywords_cannot_place(tmp_path):
+    path = str(tmp_path / "legal_docs_index.centroids.npz")
+    labels, centroids = compute_centroids(
+        [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0.9, 0.1]],
+        ["order_inquiry", "order_inquiry", "legal_inquiry", "legal_inquiry"]
+    )
+    save_centroids(path, labels, centroids, {"order_inquiry": 2, "legal_inquiry": 2})
+
+    vector_db = MagicMock(centroids_path=path)
+    vector_db.embedding_function.aembed_query = AsyncMock(return_value=[0.95, 0.05, 0])
+
+    with patch("src.database.vector_db.VectorDB.get_instance", return_value=vector_db), \
+            patch.object(IntentCentroids, "_instances", {}):
+        result = asyncio.run(orchestrator.classify_question("My parcel never came"))
+        assert result["route"] == "order_inquiry"
+        assert result["needed_sources"] == ["mongo_db"]
+
+        # Keyword routing wins without an embedding call when it is unambiguous
+        vector_db.embedding_function.aembed_query.reset_mock()
+        assert asyncio.run(orchestrator.classify_question("What is the education levy?"))["route"] == "legal_inquiry"
+        vector_db.embedding_function.aembed_query.assert_not_called()
+
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0)
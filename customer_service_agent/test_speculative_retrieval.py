@@ -0,0 +1,37 @@
+import asyncio
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from src.agent.nodes import tool_node
+
+
+def _hits(query):
+    return [Document(id=f"{query}-{i}", page_content=f"{query} {i}") for i in range(2)]
+
+
+def test_slow_refinement_falls_back_to_raw_hits():
+    async def slow_refine(question):
+        await asyncio.sleep(5)
+        return "never used"
+
+    with patch.object(tool_node, "refine_query", slow_refine), \
+            patch.object(tool_node, "search_legal_docs", lambda q, limit: _hits(q)), \
+            patch.object(tool_node.settings, "REFINE_LATENCY_BUDGET", 0.05):
+        hits, query = asyncio.run(tool_node.search_knowledge_base("raw question"))
+
+    assert query == "raw question"
+    assert [doc.id for doc in hits] == ["raw question-0", "raw question-1"]
+
+
+def test_refined_and_raw_hits_are_merged():
+    async def refine(question):
+        return "refined"
+
+    with patch.object(tool_node, "refine_query", refine), \
+            patch.object(tool_node, "search_legal_docs", lambda q, limit: _hits(q)):
+        hits, query = asyncio.run(tool_node.search_knowledge_base("raw question"))
+
+    assert query == "refined"
+    assert {doc.id for doc in hits} == {"refined-0", "refined-1", "raw question-0", "raw question-1"}
+    assert hits[0].id == "refined-0"
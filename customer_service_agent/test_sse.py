@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from src.utils.sse import coalesce_tokens, sse_frame
+
+
+async def _stream(items):
+    for item in items:
+        if isinstance(item, float):
+            await asyncio.sleep(item)
+        else:
+            yield item
+
+
+def _collect(items, **kwargs):
+    async def run():
+        return [event async for event in coalesce_tokens(_stream(items), **kwargs)]
+    return asyncio.run(run())
+
+
+def _token(text):
+    return {"type": "token", "content": text}
+
+
+def test_tokens_are_merged_and_order_is_kept():
+    events = _collect(
+        [{"type": "status", "content": "s"}, _token("a"), _token("b"), {"type": "status", "content": "t"}, _token("c")],
+        window=1.0
+    )
+    assert events == [
+        {"type": "status", "content": "s"},
+        _token("ab"),
+        {"type": "status", "content": "t"},
+        _token("c"),
+    ]
+
+
+def test_flushes_on_window_and_size():
+    events = _collect([_token("a"), _token("b"), 0.1, _token("c")], window=0.02)
+    assert events == [_token("ab"), _token("c")]
+
+    events = _collect([_token("aa"), _token("bb"), _token("c")], window=1.0, max_chars=4)
+    assert events == [_token("aabb"), _token("c")]
+
+
+def test_frame_encoding():
+    frame = sse_frame(_token("ünï"))
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    assert json.loads(frame[6:]) == _token("ünï")
@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from src.agent import sufficiency
+from src.agent.sufficiency import score_gate
+from src.scripts.calibrate_sufficiency import fit_thresholds
+
+
+def _hit(score):
+    return Document(page_content="chunk", metadata={"retrieval": "vector_db_search", "score": score})
+
+
+def test_score_gate_decides_only_clear_cases():
+    with patch.object(sufficiency.settings, "SUFFICIENCY_HIGH_SCORE", 0.8), \
+            patch.object(sufficiency.settings, "SUFFICIENCY_LOW_SCORE", 0.4):
+        assert score_gate([], [_hit(0.5), _hit(0.9)]) is True
+        assert score_gate([], [_hit(0.2)]) is False
+        assert score_gate([], [_hit(0.6)]) is None
+        # Order data or web results always go to the LLM
+        assert score_gate([{"result": "x"}], [_hit(0.9)]) is None
+        assert score_gate([], [_hit(0.9), Document(page_content="web", metadata={"source": "web_search"})]) is None
+
+
+def test_fit_thresholds_leaves_ambiguous_band():
+    scores = [0.1, 0.15, 0.2, 0.25, 0.3, 0.5, 0.55, 0.6, 0.8, 0.85, 0.9, 0.92, 0.95]
+    labels = [False] * 5 + [True, False, True] + [True] * 5
+
+    result = fit_thresholds(scores, labels, precision=1.0, min_support=3)
+
+    assert result["high"] == 0.6
+    assert result["low"] == 0.4
+    assert result["errors"] == 0
+    assert result["coverage"] == round(11 / 13, 4)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from src.agent.nodes import tool_node
+
+
+def _runner(delay, result):
+    async def run(question):
+        await asyncio.sleep(delay)
+        return result
+    return run
+
+
+def test_sources_run_concurrently_and_merge_in_fixed_order():
+    runners = {
+        "mongo_db": _runner(0.2, {"mongo_data": [{"order_id": "1"}]}),
+        "vector_db": _runner(0.2, {"documents": [Document(page_content="kb")]}),
+        "web": _runner(0.05, {"documents": [Document(page_content="web")]}),
+    }
+    state = {"question": "q", "needed_sources": ["web", "vector_db", "mongo_db"]}
+
+    with patch.dict(tool_node.SOURCE_RUNNERS, runners):
+        started = time.monotonic()
+        updates = asyncio.run(tool_node.tool_node(state))
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 0.4
+    assert updates["mongo_data"] == [{"order_id": "1"}]
+    assert [doc.page_content for doc in updates["documents"]] == ["kb", "web"]
+
+
+def test_slow_source_times_out_without_blocking_others():
+    runners = {
+        "vector_db": _runner(5, {"documents": [Document(page_content="kb")]}),
+        "web": _runner(0, {"documents": [Document(page_content="web")]}),
+    }
+    state = {"question": "q", "needed_sources": ["vector_db", "web"]}
+
+    with patch.dict(tool_node.SOURCE_RUNNERS, runners), \
+            patch.object(tool_node.settings, "SOURCE_TIMEOUTS", {"vector_db": 0.05, "web": 1.0}):
+        updates = asyncio.run(tool_node.tool_node(state))
+
+    first, second = updates["documents"]
+    assert first.metadata["source"] == "error"
+    assert "timed out" in first.page_content
+    assert second.page_content == "web"
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock, patch
+
+from src.utils.langfuse_logger import LangfuseTracer
+
+
+def _tracer(sample_rate=0.05):
+    with patch.object(LangfuseTracer, "_create_handler", return_value=MagicMock()):
+        return LangfuseTracer(sample_rate=sample_rate, slow_request_seconds=5.0)
+
+
+def test_only_sampled_requests_get_the_shared_handler():
+    tracer = _tracer(sample_rate=0.0)
+    assert not tracer.sample()
+    assert tracer.callbacks(False) == []
+
+    tracer = _tracer(sample_rate=1.0)
+    assert tracer.sample()
+    assert tracer.callbacks(True) == [tracer.handler]
+
+
+def test_errors_and_slow_requests_outside_the_sample_are_summarised():
+    tracer = _tracer()
+    trace = tracer.handler.langfuse.trace
+
+    tracer.record_request(False, 0.5, "q")
+    tracer.record_request(True, 60.0, "q", error="boom")
+    trace.assert_not_called()
+
+    tracer.record_request(False, 0.5, "q", route="legal_inquiry", error="boom")
+    tracer.record_request(False, 6.0, "q")
+    assert [call.kwargs["tags"] for call in trace.call_args_list] == [["error"], ["slow"]]
+    assert trace.call_args_list[0].kwargs["metadata"]["route"] == "legal_inquiry"
@@ -0,0 +1,194 @@
+"""
+Tests for the shared VectorDB instance and FAISS hot reload.
+Uses deterministic fake embeddings, so no embedding API is called.
+"""
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.database.vector_db import VectorDB
+
+
+def make_db(path):
+    return VectorDB(persist_directory=str(path), embedding_function=DeterministicFakeEmbedding(size=16))
+
+
+def test_get_instance_is_shared(monkeypatch, tmp_path):
+    monkeypatch.setattr(VectorDB, "_instances", {})
+    monkeypatch.setattr(VectorDB, "__init__", lambda self, index_name="legal_docs_index": None)
+
+    assert VectorDB.get_instance() is VectorDB.get_instance()
+    assert VectorDB.get_instance("other_index") is not VectorDB.get_instance()
+
+
+def test_reader_picks_up_new_generation(tmp_path):
+    writer = make_db(tmp_path)
+    writer.add_documents([Document(page_content="education tax rate", metadata={"source": "a.txt"})])
+
+    reader = make_db(tmp_path)
+    assert reader.generation == writer.generation
+    assert not reader.reload_if_changed()
+    old_store = reader.vector_store
+
+    writer.add_documents([Document(page_content="refund policy", metadata={"source": "b.txt"})])
+
+    assert reader.reload_if_changed()
+    assert reader.generation == writer.generation
+    assert reader.vector_store is not old_store
+    assert len(reader.vector_store.index_to_docstore_id) == 2
+    # The previous generation is left intact for in-flight searches
+    assert len(old_store.index_to_docstore_id) == 1
+
+
+def test_reader_keeps_matching_files_until_it_reloads(tmp_path):
+    writer = make_db(tmp_path)
+    writer.add_documents(
+        [Document(page_content=f"levy section {n}", metadata={"n": n}) for n in range(3)],
+        ids=["a", "b", "c"]
+    )
+    reader = make_db(tmp_path)
+    # Touch the docstore from a fresh thread only after the writer has saved again
+    writer.apply_changes([], delete_ids=["a", "b"])
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(1) as pool:
+        hits = pool.submit(reader.search, "levy section", 3, "vector").result()
+    assert {hit.id for hit in hits} == {"a", "b", "c"}
+    assert len(reader.vector_store.docstore.lexical_search("levy", limit=3)) == 3
+
+    assert reader.reload_if_changed()
+    assert {hit.id for hit in reader.search("levy section", limit=3, mode="vector")} == {"c"}
+
+    # Only the last two generations are kept on disk
+    writer.add_documents([Document(page_content="refund", metadata={})], ids=["d"])
+    assert len(list(tmp_path.glob("*.faiss"))) == 2
+    assert len(list(tmp_path.glob("*.docs.sqlite3"))) == 2
+
+
+def test_failed_reload_keeps_current_store(tmp_path, monkeypatch):
+    writer = make_db(tmp_path)
+    writer.add_documents([Document(page_content="levy", metadata={"source": "a.txt"})])
+    reader = make_db(tmp_path)
+    store = reader.vector_store
+
+    writer.add_documents([Document(page_content="PAYE", metadata={"source": "b.txt"})])
+    monkeypatch.setattr(reader, "_load_store", lambda **kwargs: (_ for _ in ()).throw(IOError("partial write")))
+
+    assert not reader.reload_if_changed()
+    assert reader.vector_store is store
+    assert reader.search("levy", limit=1)
+
+
+def test_ann_index_types_support_incremental_changes(tmp_path):
+    import pytest
+    from src.database.faiss_index import IndexConfig, index_type
+
+    docs = [Document(page_content=f"section {n} levy", metadata={"n": n}) for n in range(60)]
+    ids = [f"id-{n}" for n in range(60)]
+
+    for spec in ("hnsw:m=8,ef_search=32", "ivf:nlist=2,nprobe=2"):
+        config = IndexConfig.parse(spec)
+        vdb = VectorDB(
+            persist_directory=str(tmp_path / config.type),
+            embedding_function=DeterministicFakeEmbedding(size=16),
+            index_config=config
+        )
+        vdb.add_documents(docs, ids=ids)
+        vdb.apply_changes(docs[:1], ids=["new"], delete_ids=ids[:10])
+
+        reloaded = VectorDB(
+            persist_directory=vdb.persist_directory,
+            embedding_function=DeterministicFakeEmbedding(size=16),
+            index_config=config
+        )
+        assert index_type(reloaded.vector_store.index) == config.type
+        assert reloaded.existing_ids() == set(ids[10:]) | {"new"}
+        assert reloaded.vector_store.index.ntotal == 51
+        top = reloaded.search("section 42 levy", limit=1)
+        assert top[0].metadata["n"] == 42
+
+    with pytest.raises(ValueError):
+        IndexConfig.parse("lsh")
+
+
+def test_serving_load_is_memory_mapped_without_pickle(tmp_path):
+    from src.database.docstore import SQLiteDocstore
+
+    writer = make_db(tmp_path)
+    writer.add_documents([Document(page_content="education tax rate", metadata={"source": "a.txt", "page": 3})])
+    assert not list(tmp_path.glob("*.pkl"))
+
+    reader = make_db(tmp_path)
+    assert isinstance(reader.vector_store.docstore, SQLiteDocstore)
+    hit = reader.search("education tax rate", limit=1)[0]
+    assert hit.page_content == "education tax rate"
+    assert hit.metadata["source"] == "a.txt" and hit.metadata["page"] == 3
+    # Retrieval scores ride along on a copy, never on the stored chunk
+    assert "score" in hit.metadata or "bm25" in hit.metadata
+    assert "bm25" not in reader.vector_store.docstore.search(hit.id).metadata
+
+    # Writing through a read-only load switches to an in-memory copy first
+    reader.add_documents([Document(page_content="refund policy", metadata={"source": "b.txt"})])
+    assert len(make_db(tmp_path).existing_ids()) == 2
+
+
+def test_hybrid_search_fuses_and_takes_lexical_fast_path(tmp_path, monkeypatch):
+    from src.config import settings
+    from src.database.lexical import reciprocal_rank_fusion
+
+    writer = make_db(tmp_path)
+    writer.add_documents([
+        Document(page_content="PAYE must be remitted by the 10th day of the following month.", metadata={"n": 0}),
+        Document(page_content="Companies income tax (CIT) returns are due six months after year end.", metadata={"n": 1}),
+        Document(page_content="Refunds are processed within fourteen days.", metadata={"n": 2}),
+    ])
+    reader = make_db(tmp_path)
+
+    calls = []
+    monkeypatch.setattr(reader.vector_store, "similarity_search_with_score", lambda q, k: calls.append(q) or [])
+
+    # Every term matched in a high-scoring chunk: no embedding call
+    monkeypatch.setattr(settings, "LEXICAL_STRONG_SCORE", 0.1)
+    hits = reader.search("When is PAYE remitted?", limit=2, mode="hybrid")
+    assert hits[0].metadata["n"] == 0
+    assert calls == []
+
+    # Weak lexical match: vector search runs and results are fused
+    monkeypatch.setattr(settings, "LEXICAL_STRONG_SCORE", 1000.0)
+    hits = reader.search("CIT filing deadline", limit=2, mode="hybrid")
+    assert hits[0].metadata["n"] == 1
+    assert calls == ["CIT filing deadline"]
+
+    assert [k for k, _ in reciprocal_rank_fusion([["a", "b"], ["b", "c"]])] == ["b", "a", "c"]
+
+
+def test_scores_are_cosine_for_non_unit_embeddings(tmp_path):
+    import numpy as np
+    import pytest
+    from langchain_core.embeddings import Embeddings
+
+    vectors = {"levy": [30.0, 40.0, 0.0], "refund": [0.0, 0.5, 0.0], "query": [0.0, 2.0, 2.0]}
+
+    class ScaledEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            return [vectors[t] for t in texts]
+
+        def embed_query(self, text):
+            return vectors[text]
+
+    def cosine(a, b):
+        a, b = np.array(a), np.array(b)
+        return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+    for spec in ("flat", "hnsw"):
+        from src.database.faiss_index import IndexConfig
+        vdb = VectorDB(
+            persist_directory=str(tmp_path / spec),
+            embedding_function=ScaledEmbeddings(),
+            index_config=IndexConfig.parse(spec)
+        )
+        vdb.add_documents([Document(page_content="levy"), Document(page_content="refund")])
+
+        hits = vdb.search("query", limit=2, mode="vector")
+        scores = {hit.page_content: hit.metadata["score"] for hit in hits}
+        assert scores["refund"] == pytest.approx(cosine(vectors["refund"], vectors["query"]), abs=1e-5)
+        assert scores["levy"] == pytest.approx(cosine(vectors["levy"], vectors["query"]), abs=1e-5)